@@ -0,0 +1,57 @@
+"""Add ingest summary columns (counts, content hash) to datasets and completion_datasets
+
+Revision ID: 005
+Revises: 8f0c7993b1d5
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '8f0c7993b1d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('datasets') as batch_op:
+        batch_op.add_column(sa.Column('prompt_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    with op.batch_alter_table('completion_datasets') as batch_op:
+        batch_op.add_column(sa.Column('prompt_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('completion_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    # Backfill counts for existing rows; content_hash stays NULL until the row is rewritten
+    conn = op.get_bind()
+    conn.execute(sa.text("""
+        UPDATE datasets
+        SET prompt_count = (SELECT count(*) FROM json_object_keys(prompts))
+        WHERE prompt_count IS NULL
+    """))
+    conn.execute(sa.text("""
+        UPDATE completion_datasets cd
+        SET prompt_count = counts.prompt_count,
+            completion_count = counts.completion_count
+        FROM (
+            SELECT id,
+                   (SELECT count(*) FROM json_each(completions)) AS prompt_count,
+                   (SELECT COALESCE(sum(json_array_length(value)), 0) FROM json_each(completions)) AS completion_count
+            FROM completion_datasets
+        ) AS counts
+        WHERE cd.id = counts.id AND cd.prompt_count IS NULL
+    """))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('completion_datasets') as batch_op:
+        batch_op.drop_column('content_hash')
+        batch_op.drop_column('completion_count')
+        batch_op.drop_column('prompt_count')
+
+    with op.batch_alter_table('datasets') as batch_op:
+        batch_op.drop_column('content_hash')
+        batch_op.drop_column('prompt_count')
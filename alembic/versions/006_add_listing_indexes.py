@@ -0,0 +1,37 @@
+"""Add composite indexes backing keyset pagination of list endpoints
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_datasets_user_id_created_at_id", "datasets", "user_id, created_at, id"),
+    ("ix_completion_datasets_dataset_id_created_at_id", "completion_datasets", "dataset_id, created_at, id"),
+    ("ix_comparisons_created_at_id", "comparisons", "created_at, id"),
+    ("ix_analysis_jobs_completion_dataset_id_created_at", "analysis_jobs", "completion_dataset_id, created_at"),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY avoids locking large tables for writes; it cannot run inside a transaction.
+    # IF NOT EXISTS covers databases where create_all() already built the indexes.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(sa.text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _table, _columns in INDEXES:
+            op.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
@@ -0,0 +1,39 @@
+"""Add completion_datasets.size_bytes and analysis_jobs.priority for queue routing
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('completion_datasets') as batch_op:
+        batch_op.add_column(sa.Column('size_bytes', sa.BigInteger(), nullable=True))
+
+    with op.batch_alter_table('analysis_jobs') as batch_op:
+        batch_op.add_column(sa.Column('priority', sa.Integer(), nullable=True))
+
+    # Backfill from the stored JSON text; close to, but not exactly, the canonical encoding size
+    conn = op.get_bind()
+    conn.execute(sa.text("""
+        UPDATE completion_datasets
+        SET size_bytes = octet_length(completions::text)
+        WHERE size_bytes IS NULL
+    """))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('analysis_jobs') as batch_op:
+        batch_op.drop_column('priority')
+
+    with op.batch_alter_table('completion_datasets') as batch_op:
+        batch_op.drop_column('size_bytes')
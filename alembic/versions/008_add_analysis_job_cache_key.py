@@ -0,0 +1,34 @@
+"""Add analysis_jobs.cache_key for job deduplication and result reuse
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('analysis_jobs') as batch_op:
+        batch_op.add_column(sa.Column('cache_key', sa.String(length=64), nullable=True))
+
+    op.create_index('ix_analysis_jobs_cache_key_status', 'analysis_jobs', ['cache_key', 'status'])
+    op.create_index(
+        'uq_analysis_jobs_active_cache_key', 'analysis_jobs', ['cache_key'], unique=True,
+        postgresql_where=sa.text("status IN ('pending', 'running')")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_analysis_jobs_active_cache_key', table_name='analysis_jobs')
+    op.drop_index('ix_analysis_jobs_cache_key_status', table_name='analysis_jobs')
+
+    with op.batch_alter_table('analysis_jobs') as batch_op:
+        batch_op.drop_column('cache_key')
@@ -0,0 +1,32 @@
+"""Add result_blobs: compressed storage for large result sections and shard partials
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'result_blobs',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('codec', sa.String(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('raw_bytes', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('result_blobs')
@@ -0,0 +1,32 @@
+"""Add comparison_alignment_rows: persisted per-prompt alignment index of comparisons
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing comparisons are indexed on first access to /comparisons/{id}/rows
+    op.create_table(
+        'comparison_alignment_rows',
+        sa.Column('comparison_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('prompt_id', sa.String(), nullable=False),
+        sa.Column('presence', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['comparison_id'], ['comparisons.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('comparison_id', 'prompt_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('comparison_alignment_rows')
@@ -0,0 +1,51 @@
+"""Add precomputed explorer columns and search/sort indexes to comparison_alignment_rows
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Rows indexed before this revision are rebuilt on first access (see services/alignment.py)
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.batch_alter_table('comparison_alignment_rows') as batch_op:
+        batch_op.add_column(sa.Column('prompt_text', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('max_abs_z', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('len_diff', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('stats', sa.JSON(), nullable=True))
+
+    op.create_index(
+        'ix_comparison_alignment_rows_max_abs_z', 'comparison_alignment_rows',
+        ['comparison_id', 'max_abs_z', 'prompt_id']
+    )
+    op.create_index(
+        'ix_comparison_alignment_rows_len_diff', 'comparison_alignment_rows',
+        ['comparison_id', 'len_diff', 'prompt_id']
+    )
+    op.create_index(
+        'ix_comparison_alignment_rows_prompt_text_trgm', 'comparison_alignment_rows', ['prompt_text'],
+        postgresql_using='gin', postgresql_ops={'prompt_text': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comparison_alignment_rows_prompt_text_trgm', table_name='comparison_alignment_rows')
+    op.drop_index('ix_comparison_alignment_rows_len_diff', table_name='comparison_alignment_rows')
+    op.drop_index('ix_comparison_alignment_rows_max_abs_z', table_name='comparison_alignment_rows')
+
+    with op.batch_alter_table('comparison_alignment_rows') as batch_op:
+        batch_op.drop_column('stats')
+        batch_op.drop_column('len_diff')
+        batch_op.drop_column('max_abs_z')
+        batch_op.drop_column('prompt_text')
@@ -0,0 +1,66 @@
+"""Add search_entries: full-text search index of prompts and completion outputs
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'search_entries',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('dataset_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('completion_dataset_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('prompt_id', sa.String(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=True),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True),
+        sa.ForeignKeyConstraint(['dataset_id'], ['datasets.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['completion_dataset_id'], ['completion_datasets.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # Backfill existing datasets before building the indexes ('english' is the default SEARCH_TEXT_CONFIG).
+    # Only the first 100,000 characters are vectorized (SEARCH_VECTOR_MAX_CHARS): Postgres
+    # rejects a tsvector over 1 MB
+    op.execute("""
+        INSERT INTO search_entries (dataset_id, completion_dataset_id, prompt_id, position, text, search_vector)
+        SELECT d.id, NULL, p.key, NULL, p.value, to_tsvector('english', left(p.value, 100000))
+        FROM datasets d
+        CROSS JOIN LATERAL json_each_text(d.prompts) AS p(key, value)
+        WHERE json_typeof(d.prompts) = 'object' AND p.value IS NOT NULL
+    """)
+    op.execute("""
+        INSERT INTO search_entries (dataset_id, completion_dataset_id, prompt_id, position, text, search_vector)
+        SELECT c.dataset_id, c.id, e.key, o.ordinality - 1, o.value, to_tsvector('english', left(o.value, 100000))
+        FROM completion_datasets c
+        CROSS JOIN LATERAL json_each(c.completions) AS e(key, value)
+        CROSS JOIN LATERAL json_array_elements_text(e.value) WITH ORDINALITY AS o(value, ordinality)
+        WHERE json_typeof(c.completions) = 'object' AND json_typeof(e.value) = 'array' AND o.value IS NOT NULL
+    """)
+
+    op.create_index(
+        'ix_search_entries_dataset_id_completion_dataset_id', 'search_entries',
+        ['dataset_id', 'completion_dataset_id']
+    )
+    op.create_index(
+        'ix_search_entries_search_vector', 'search_entries', ['search_vector'],
+        postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_search_entries_search_vector', table_name='search_entries')
+    op.drop_index('ix_search_entries_dataset_id_completion_dataset_id', table_name='search_entries')
+    op.drop_table('search_entries')
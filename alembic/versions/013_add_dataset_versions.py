@@ -0,0 +1,28 @@
+"""Add dataset/completion dataset versions and the versions a comparison was computed from
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('datasets', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    op.add_column('completion_datasets', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    # NULL for existing comparisons: treated as computed from version 1 of every member dataset
+    op.add_column('comparisons', sa.Column('dataset_versions', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('comparisons', 'dataset_versions')
+    op.drop_column('completion_datasets', 'version')
+    op.drop_column('datasets', 'version')
@@ -0,0 +1,58 @@
+"""Add dataset names, q-values and query indexes to comparison_metrics
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('comparison_metrics') as batch_op:
+        batch_op.add_column(sa.Column('dataset_a', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('dataset_b', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('q_value_holm', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('q_value_bh', sa.Float(), nullable=True))
+
+    op.create_index(
+        'ix_comparison_metrics_name_significance', 'comparison_metrics',
+        ['metric_name', 'statistical_significance']
+    )
+    op.create_index('ix_comparison_metrics_comparison_id', 'comparison_metrics', ['comparison_id'])
+
+    # Backfill from the test rows stored in existing comparisons' results
+    op.execute("""
+        INSERT INTO comparison_metrics (
+            id, comparison_id, metric_name, dataset_a, dataset_b, dataset_a_value, dataset_b_value,
+            statistical_significance, q_value_holm, q_value_bh, effect_size,
+            confidence_interval_lower, confidence_interval_upper
+        )
+        SELECT gen_random_uuid(), c.id, m->>'name', m->>'dataset_a', m->>'dataset_b',
+               (m->>'dataset_a_value')::float, (m->>'dataset_b_value')::float,
+               (m->>'statistical_significance')::float, (m->>'q_value_holm')::float, (m->>'q_value_bh')::float,
+               (m->>'effect_size')::float,
+               (m->>'confidence_interval_lower')::float, (m->>'confidence_interval_upper')::float
+        FROM comparisons c
+        CROSS JOIN LATERAL json_array_elements(c.statistical_results->'metrics') AS m
+        WHERE json_typeof(c.statistical_results->'metrics') = 'array'
+          AND NOT EXISTS (SELECT 1 FROM comparison_metrics e WHERE e.comparison_id = c.id)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comparison_metrics_comparison_id', table_name='comparison_metrics')
+    op.drop_index('ix_comparison_metrics_name_significance', table_name='comparison_metrics')
+
+    with op.batch_alter_table('comparison_metrics') as batch_op:
+        batch_op.drop_column('q_value_bh')
+        batch_op.drop_column('q_value_holm')
+        batch_op.drop_column('dataset_b')
+        batch_op.drop_column('dataset_a')
@@ -0,0 +1,40 @@
+"""Add prompt_id range indexes to search_entries for sharded analysis reads
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    (
+        "ix_search_entries_prompts_dataset_id_prompt_id", "search_entries",
+        "dataset_id, prompt_id", "WHERE completion_dataset_id IS NULL"
+    ),
+    (
+        "ix_search_entries_completion_dataset_id_prompt_id", "search_entries",
+        "completion_dataset_id, prompt_id, position", ""
+    ),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY avoids locking search_entries for writes; it cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.execute(sa.text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns}) {where}"))
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _table, _columns, _where in INDEXES:
+            op.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
@@ -0,0 +1,34 @@
+"""Add analysis_jobs.source_job_id for jobs that wait on an identical in-flight job
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '016'
+down_revision = '015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('analysis_jobs') as batch_op:
+        batch_op.add_column(sa.Column('source_job_id', postgresql.UUID(as_uuid=True), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_analysis_jobs_source_job_id', 'analysis_jobs', ['source_job_id'], ['id'], ondelete='SET NULL'
+        )
+
+    op.create_index('ix_analysis_jobs_source_job_id', 'analysis_jobs', ['source_job_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_analysis_jobs_source_job_id', table_name='analysis_jobs')
+
+    with op.batch_alter_table('analysis_jobs') as batch_op:
+        batch_op.drop_constraint('fk_analysis_jobs_source_job_id', type_='foreignkey')
+        batch_op.drop_column('source_job_id')
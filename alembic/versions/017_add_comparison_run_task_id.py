@@ -0,0 +1,23 @@
+"""Add comparisons.run_task_id, the task that started the current run
+
+Revision ID: 017
+Revises: 016
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '017'
+down_revision = '016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('comparisons', sa.Column('run_task_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('comparisons', 'run_task_id')
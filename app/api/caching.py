@@ -0,0 +1,52 @@
+"""
+HTTP validator helpers: strong ETags and conditional GET handling.
+
+Endpoints compute the ETag from cheap scalar columns (content hash, status, timestamps)
+before touching any payload column, so a matching If-None-Match is answered with 304
+without loading or serializing blobs.
+"""
+import hashlib
+from typing import Any, Dict, Optional
+from fastapi import Request
+from fastapi.responses import Response
+
+# Finished artifacts never change under the same URL + validator
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# In-progress resources must be revalidated on every use
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def make_etag(request: Request, *parts: Any) -> str:
+    """
+    Build a strong ETag from the resource version parts.
+
+    The query string and Accept header are folded in because projections, pages and
+    negotiated formats are distinct representations of the same resource.
+    """
+    digest = hashlib.sha256()
+    for part in (*parts, request.url.query, request.headers.get("accept", "")):
+        digest.update(str(part).encode())
+        digest.update(b"\x00")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """True when the request's If-None-Match matches etag (weak comparison per RFC 9110)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+def cache_headers(etag: Optional[str], immutable: bool) -> Dict[str, str]:
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL}
+    if etag:
+        headers["ETag"] = etag
+    return headers
+
+
+def not_modified_response(etag: str, immutable: bool) -> Response:
+    return Response(status_code=304, headers={**cache_headers(etag, immutable), "Vary": "Accept"})
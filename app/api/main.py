@@ -1,7 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .routes import completions, datasets, analysis, comparisons
-from ..core.database import engine, Base
+from ..core.database import engine, async_engine, Base
+from ..core.concurrency import shutdown_executors
+from ..services.dataset_cache import dataset_cache
+from .responses import ORJSONResponse
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -12,7 +15,8 @@ app = FastAPI(
     description="Observability & Analytics Infrastructure for AI Systems",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -22,6 +26,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include routers
@@ -31,6 +36,13 @@ app.include_router(analysis.router)
 app.include_router(comparisons.router)
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Release the executor processes and async connection pool."""
+    shutdown_executors()
+    await async_engine.dispose()
+
+
 @app.get("/")
 def read_root():
     """Root endpoint with API information."""
@@ -45,7 +57,7 @@ def read_root():
 @app.get("/health")
 def health_check():
     """Health check endpoint."""
-    return {"status": "healthy"}
+    return {"status": "healthy", "dataset_cache": dataset_cache.stats()}
 
 
 if __name__ == "__main__":
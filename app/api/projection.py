@@ -0,0 +1,20 @@
+from fastapi import HTTPException, status
+from typing import Optional, Sequence, Tuple
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str], default: Sequence[str]) -> Tuple[str, ...]:
+    """Parse a comma-separated `fields=` query parameter into a validated projection."""
+    if not fields:
+        return tuple(default)
+
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {unknown}. Allowed fields: {list(allowed)}"
+        )
+    # Always include the id so clients can address the resource
+    if "id" not in requested:
+        requested = ("id",) + requested
+    return requested
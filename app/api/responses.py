@@ -0,0 +1,175 @@
+"""
+Response classes and Accept-header negotiation for heavy endpoints.
+
+JSON is rendered with orjson (native UUID/datetime/NumPy support). Clients may opt into
+MessagePack or Arrow IPC by sending the matching media type in `Accept`.
+"""
+import uuid
+from datetime import datetime, date
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
+from fastapi import HTTPException, Request, status
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency
+    pa = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _to_builtin(obj: Any) -> Any:
+    """Fallback conversion for values the encoders do not handle natively."""
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def dumps_json(content: Any) -> bytes:
+    return orjson.dumps(content, default=_to_builtin, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """Default JSON response rendered with orjson."""
+    media_type = JSON_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_to_builtin, use_bin_type=True)
+
+
+class ArrowIPCResponse(Response):
+    """Arrow IPC stream of a list of records (or of a page's `items`)."""
+    media_type = ARROW_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        # Round-trip through orjson so UUIDs/datetimes become plain strings Arrow can type
+        records = orjson.loads(dumps_json(_tabular_records(content)))
+        try:
+            table = pa.Table.from_pylist(records)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Nested values whose types differ across rows (e.g. free-form metadata) have no
+            # single Arrow type: send those columns as JSON strings instead
+            table = pa.Table.from_pylist(_nested_columns_as_json(records))
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+def _nested_columns_as_json(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy of `records` with every column holding a dict or list value encoded as JSON text."""
+    nested = {
+        key for record in records for key, value in record.items() if isinstance(value, (dict, list))
+    }
+    return [
+        {
+            key: dumps_json(value).decode() if key in nested and value is not None else value
+            for key, value in record.items()
+        }
+        for record in records
+    ]
+
+
+def _tabular_records(content: Any) -> Optional[List[Dict[str, Any]]]:
+    if isinstance(content, list):
+        return content
+    if isinstance(content, dict) and isinstance(content.get("items"), list):
+        return content["items"]
+    return None
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float]]:
+    """Parse an Accept header into (media_type, q) pairs, highest preference first."""
+    parsed = []
+    for position, part in enumerate(accept.split(",")):
+        fields = [f.strip() for f in part.split(";")]
+        if not fields[0]:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        parsed.append((fields[0].lower(), q, position))
+    parsed.sort(key=lambda item: (-item[1], item[2]))
+    return [(media_type, q) for media_type, q, _ in parsed if q > 0]
+
+
+def negotiate_media_type(request: Request, content: Any) -> str:
+    """Pick the response media type for `content` from the request's Accept header."""
+    for media_type, _q in _parse_accept(request.headers.get("accept", "")):
+        if media_type == MSGPACK_MEDIA_TYPE and msgpack is not None:
+            return MSGPACK_MEDIA_TYPE
+        if media_type == ARROW_MEDIA_TYPE and pa is not None and _tabular_records(content) is not None:
+            return ARROW_MEDIA_TYPE
+        if media_type in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            return JSON_MEDIA_TYPE
+    if request.headers.get("accept"):
+        # Only unsupported types were listed (e.g. Arrow for a non-tabular payload)
+        accepted = [m for m, _ in _parse_accept(request.headers["accept"])]
+        if accepted and all(m in (MSGPACK_MEDIA_TYPE, ARROW_MEDIA_TYPE) for m in accepted):
+            raise HTTPException(
+                status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                detail=f"Cannot render this resource as {accepted}"
+            )
+    return JSON_MEDIA_TYPE
+
+
+RESPONSE_CLASSES = {
+    JSON_MEDIA_TYPE: ORJSONResponse,
+    MSGPACK_MEDIA_TYPE: MsgPackResponse,
+    ARROW_MEDIA_TYPE: ArrowIPCResponse,
+}
+
+
+def negotiated_response(
+    request: Request,
+    content: Any,
+    status_code: int = status.HTTP_200_OK,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Render plain (already dumped) content in the client's preferred format."""
+    media_type = negotiate_media_type(request, content)
+    response_headers = {"Vary": "Accept", **(headers or {})}
+    try:
+        return RESPONSE_CLASSES[media_type](content=content, status_code=status_code, headers=response_headers)
+    except Exception as e:
+        # Scalar columns mixing types (e.g. numbers and strings) cannot be typed by Arrow either
+        if media_type != ARROW_MEDIA_TYPE or not isinstance(e, (pa.ArrowInvalid, pa.ArrowTypeError)):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail=f"Cannot render this resource as {ARROW_MEDIA_TYPE}: {e}"
+        )
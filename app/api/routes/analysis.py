@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request, WebSocket
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 import uuid
-from ...core.database import get_db
+from ...core.database import get_db, get_async_db
+from ...core.events import TERMINAL_EVENTS
 from ...services.analysis_service import AnalysisService
 from ...schemas.analysis import AnalysisJobCreate, AnalysisJobResponse
-from ...workers.analysis_worker import run_analysis_task, celery_app
+from ...workers.analysis_worker import run_analysis_task, dispatch_analysis, celery_app
+from ..responses import negotiated_response, ORJSONResponse
+from ..caching import make_etag, is_not_modified, cache_headers, not_modified_response
+from ..streaming import sse_event_response, websocket_events, status_snapshot
+from ...services.progress import load_progress
 
 router = APIRouter(prefix="/api/v1/analysis", tags=["analysis"])
 
@@ -15,15 +22,22 @@ def create_analysis_job(
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
-    """Create and start a new analysis job."""
+    """
+    Create and start a new analysis job.
+
+    If an identical analysis (same prompt and completion content) is already running, that
+    job is returned; if one has completed, its results are returned immediately unless
+    `force` is set.
+    """
     try:
         service = AnalysisService(db)
-        job = service.create_analysis_job(job_data)
+        job, created = service.get_or_create_analysis_job(job_data)
         
-        # Queue the analysis task via Celery if available; otherwise, run in a background task
-        if celery_app:
-            celery_app.send_task("app.workers.analysis_worker.run_analysis_task", args=[str(job.id)])
-        else:
+        # Queue the analysis task via Celery if available; otherwise, run in a background task.
+        # A reused job is already running or finished.
+        if created and celery_app:
+            dispatch_analysis(job)
+        elif created:
             background_tasks.add_task(run_analysis_task, str(job.id))
         
         return job
@@ -42,6 +56,7 @@ def create_analysis_job(
 @router.get("/{job_id}/status", response_model=AnalysisJobResponse)
 def get_analysis_job_status(
     job_id: uuid.UUID,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Get the status of an analysis job."""
@@ -54,17 +69,101 @@ def get_analysis_job_status(
             detail="Analysis job not found"
         )
     
-    return job
+    return negotiated_response(request, AnalysisJobResponse.model_validate(job).model_dump())
+
+
+def _snapshot_loader(db: AsyncSession, job_id: uuid.UUID):
+    async def load():
+        job = await db.run_sync(lambda s: AnalysisService(s).get_analysis_job(job_id, include_results=False))
+        # Release the connection; the stream itself may stay open for minutes
+        await db.close()
+        if not job:
+            return None
+        progress = await run_in_threadpool(load_progress, "analysis", job_id)
+        return status_snapshot(job_id, job.status, completed_at=job.completed_at, progress=progress)
+    return load
+
+
+@router.get("/{job_id}/progress")
+def get_analysis_progress(
+    job_id: uuid.UUID,
+    db: Session = Depends(get_db)
+):
+    """
+    Current stage, percent done and per-stage timings (seconds) of a analysis job.
+
+    `progress` is null before the run starts or once the record has expired.
+    """
+    service = AnalysisService(db)
+    job = service.get_analysis_job(job_id, include_results=False)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Analysis job not found")
+    return {"status": job.status, "progress": load_progress("analysis", job_id)}
+
+
+@router.get("/{job_id}/events")
+async def stream_analysis_events(
+    job_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Server-Sent Events stream of a job's status and progress.
+
+    Sends the current status first, then progress events as the worker publishes them,
+    and ends after the terminal ("completed", "partial", "cancelled" or "failed") event.
+    """
+    return await sse_event_response("analysis", job_id, _snapshot_loader(db, job_id), "Analysis job not found")
+
+
+@router.websocket("/{job_id}/ws")
+async def analysis_events_websocket(
+    websocket: WebSocket,
+    job_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """WebSocket variant of /events: one JSON message per event."""
+    await websocket_events(websocket, "analysis", job_id, _snapshot_loader(db, job_id))
+
+
+@router.post("/{job_id}/cancel", status_code=status.HTTP_202_ACCEPTED)
+def cancel_analysis_job(
+    job_id: uuid.UUID,
+    db: Session = Depends(get_db)
+):
+    """
+    Cancel a pending or running analysis job.
+
+    A running job stops at its next checkpoint and keeps the metric sections finished so
+    far (`missing_sections` lists the rest); watch /events for "cancelled".
+    """
+    service = AnalysisService(db)
+    job = service.get_analysis_job(job_id, include_results=False)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Analysis job not found")
+    if job.status in TERMINAL_EVENTS:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Analysis job already finished with status: {job.status}"
+        )
+    job = service.cancel_analysis_job(job_id)
+    return {"job_id": job.id, "status": job.status}
 
 
 @router.get("/{job_id}/results")
 def get_analysis_results(
     job_id: uuid.UUID,
+    request: Request,
     db: Session = Depends(get_db)
 ):
-    """Get the results of a completed analysis job."""
+    """
+    Get the results of a finished analysis job.
+
+    Partial and cancelled jobs return the sections they finished, with the rest listed in
+    `results.missing_sections`. Finished results never change, so they are served as immutable with a strong ETag and
+    a matching If-None-Match is answered with 304 before the results blob is loaded.
+    """
     service = AnalysisService(db)
-    job = service.get_analysis_job(job_id)
+    job = service.get_analysis_job(job_id, include_results=False)
     
     if not job:
         raise HTTPException(
@@ -72,19 +171,23 @@ def get_analysis_results(
             detail="Analysis job not found"
         )
     
-    if job.status != "completed":
+    if job.status not in ("completed", "partial", "cancelled"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Analysis job is not completed. Current status: {job.status}"
         )
     
-    return {
+    etag = make_etag(request, job.id, job.status, job.completed_at)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, immutable=True)
+
+    return negotiated_response(request, {
         "job_id": job.id,
         "status": job.status,
-        "results": job.results,
+        "results": service.hydrate_results(job).results,
         "created_at": job.created_at,
         "completed_at": job.completed_at
-    }
+    }, headers=cache_headers(etag, immutable=True))
 
 
 @router.post("/run-sync")
@@ -92,19 +195,24 @@ def run_analysis_sync(
     job_data: AnalysisJobCreate,
     db: Session = Depends(get_db)
 ):
-    """Run analysis synchronously (for testing/development)."""
+    """Run analysis synchronously (for testing/development). Identical finished analyses are reused."""
     try:
         service = AnalysisService(db)
-        job = service.create_analysis_job(job_data)
+        job, created = service.get_or_create_analysis_job(job_data)
         
         # Run analysis synchronously
-        results = service.run_analysis(job.id)
+        if created:
+            results = service.run_analysis(job.id)
+        else:
+            results = job.results
+        job_status = service.get_analysis_job(job.id, include_results=False).status
         
-        return {
+        # Rendered directly so NumPy values in fresh results skip jsonable_encoder
+        return ORJSONResponse({
             "job_id": job.id,
-            "status": "completed",
+            "status": job_status,
             "results": results
-        }
+        })
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
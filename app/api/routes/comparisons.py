@@ -1,32 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, WebSocket
 from fastapi.responses import Response
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import List, Dict, Any, Optional
 import uuid
-from ...core.database import get_db
+from ...core.database import get_db, get_async_db
+from ...core.events import TERMINAL_EVENTS
 from ...services.comparison_service import ComparisonService
 from ...services.export_service import ExportService
-from ...schemas.comparison import ComparisonCreate, ComparisonResponse
+from ...services.pagination import next_cursor
+from ...services.search_service import SearchService
+from ...workers.comparison_worker import dispatch_comparison
+from ..responses import negotiated_response
+from ..caching import make_etag, is_not_modified, cache_headers, not_modified_response
+from ..streaming import sse_event_response, websocket_events, status_snapshot
+from ...services.progress import load_progress
+from ...schemas.comparison import (
+    ComparisonCreate, ComparisonResponse, AlignedRowPage, ComparisonMetricRow, ComparisonMetricPage
+)
 from ...schemas.export import ExportRequest
+from ...schemas.search import SearchResults
 
 router = APIRouter(prefix="/api/v1/comparisons", tags=["comparisons"])
 
+# Terminal statuses after which a comparison's results are no longer written
+FINISHED_STATUSES = TERMINAL_EVENTS
 
-def _run_comparison_analysis_task(comparison_id: str):
-    """Background task to run comparison analysis."""
-    from ...core.database import SessionLocal
-    
-    db = SessionLocal()
-    try:
-        service = ComparisonService(db)
-        service.run_comparison_analysis(uuid.UUID(comparison_id))
-    except Exception as e:
-        print(f"Error running comparison analysis: {e}")
-    finally:
-        db.close()
 
-
-def _normalize_comp(c: Any) -> Dict[str, Any]:
+def _normalize_comp(c: Any, stale_datasets: Optional[List[str]] = None) -> Dict[str, Any]:
     """Convert ORM to response dict with safe defaults to avoid 500s from nulls/legacy rows."""
     return {
         "id": getattr(c, "id"),
@@ -38,21 +40,22 @@ def _normalize_comp(c: Any) -> Dict[str, Any]:
         "statistical_results": getattr(c, "statistical_results", None) or {},
         "automated_insights": getattr(c, "automated_insights", None) or [],
         "status": getattr(c, "status", None) or "pending",
+        "dataset_versions": getattr(c, "dataset_versions", None) or {},
+        "stale_datasets": stale_datasets or [],
     }
 
 
 @router.post("/create", response_model=ComparisonResponse, status_code=status.HTTP_201_CREATED)
 def create_comparison(
     payload: ComparisonCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     try:
         service = ComparisonService(db)
         comp = service.create_comparison(payload)
         
-        # Trigger analysis in background
-        background_tasks.add_task(_run_comparison_analysis_task, str(comp.id))
+        # Run the analysis on the worker pool, never in the API process
+        dispatch_comparison(comp.id)
         
         return _normalize_comp(comp)
     except ValueError as e:
@@ -63,25 +66,275 @@ def create_comparison(
 
 @router.get("/", response_model=List[ComparisonResponse])
 def list_comparisons(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    skip: int = Query(0, ge=0, description="Deprecated: prefer cursor"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header value from the previous page"),
     db: Session = Depends(get_db)
 ):
     service = ComparisonService(db)
-    comps = service.list_comparisons(skip=skip, limit=limit)
-    return [_normalize_comp(c) for c in comps]
+    try:
+        comps = service.list_comparisons(skip=skip, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    cursor_out = next_cursor(comps, limit)
+    return negotiated_response(
+        request,
+        [_normalize_comp(c) for c in comps],
+        headers={"X-Next-Cursor": cursor_out} if cursor_out else None
+    )
+
+
+@router.get("/metrics", response_model=ComparisonMetricPage)
+def query_comparison_metrics(
+    request: Request,
+    metric_name: Optional[str] = Query(None, description='Metric display name, e.g. "Completion Length"'),
+    max_p: Optional[float] = Query(None, ge=0, le=1, description="Only rows with p-value at most this"),
+    max_q: Optional[float] = Query(None, ge=0, le=1, description="Only rows with corrected p-value (q) at most this"),
+    correction: str = Query("bh", pattern="^(bh|holm)$", description="Correction max_q applies to"),
+    min_abs_effect: Optional[float] = Query(None, ge=0, description="Only rows with |effect size| at least this"),
+    dataset: Optional[str] = Query(None, description="Completion dataset name on either side of the pair"),
+    comparison_id: Optional[uuid.UUID] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """
+    Filter test rows across all comparisons, smallest p-value first.
+
+    Reads the comparison_metrics rows written when each comparison run finishes, so
+    queries like "every Completion Length test with p < 0.01" never load the comparisons'
+    statistical_results.
+    """
+    service = ComparisonService(db)
+    try:
+        rows, cursor_out = service.query_metrics(
+            metric_name=metric_name, max_p=max_p, max_q=max_q, correction=correction,
+            min_abs_effect=min_abs_effect, dataset=dataset, comparison_id=comparison_id,
+            cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    items = [
+        ComparisonMetricRow(
+            comparison_id=row.comparison_id,
+            comparison_name=comparison_name,
+            metric_name=row.metric_name,
+            dataset_a=row.dataset_a,
+            dataset_b=row.dataset_b,
+            dataset_a_value=row.dataset_a_value,
+            dataset_b_value=row.dataset_b_value,
+            statistical_significance=row.statistical_significance,
+            q_value_holm=row.q_value_holm,
+            q_value_bh=row.q_value_bh,
+            effect_size=row.effect_size,
+            confidence_interval_lower=row.confidence_interval_lower,
+            confidence_interval_upper=row.confidence_interval_upper,
+        )
+        for row, comparison_name in rows
+    ]
+    page = ComparisonMetricPage(items=items, next_cursor=cursor_out)
+    return negotiated_response(request, page.model_dump())
 
 
 @router.get("/{comparison_id}", response_model=ComparisonResponse)
 def get_comparison(
+    comparison_id: uuid.UUID,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Get a comparison. Finished comparisons get a strong ETag over their status and dataset
+    versions; they must still be revalidated, since a member dataset can be appended to
+    (listed in stale_datasets) and the comparison refreshed. Pending/running ones get no
+    ETag because their results are still being written.
+    """
+    service = ComparisonService(db)
+    comp = service.get_comparison(comparison_id, include_results=False)
+    if not comp:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comparison not found")
+
+    finished = comp.status in FINISHED_STATUSES
+    stale = service.stale_datasets(comp) if finished else []
+    etag = make_etag(request, comp.id, comp.status, sorted((comp.dataset_versions or {}).items()), stale) if finished else None
+    if etag and is_not_modified(request, etag):
+        return not_modified_response(etag, immutable=False)
+
+    return negotiated_response(request, _normalize_comp(comp, stale), headers=cache_headers(etag, immutable=False))
+
+
+@router.get("/{comparison_id}/rows", response_model=AlignedRowPage)
+def get_comparison_rows(
+    comparison_id: uuid.UUID,
+    request: Request,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    match: Optional[str] = Query(None, pattern="^(matched|unmatched)$", description="Only prompts present in every dataset, or only the rest"),
+    q: Optional[str] = Query(None, max_length=200, description="Case-insensitive substring of the prompt text"),
+    min_z: Optional[float] = Query(None, ge=0, description="Only outliers: some dataset's length |z-score| at least this"),
+    min_len_diff: Optional[float] = Query(None, ge=0, description="Minimum length difference (chars) of the first two datasets"),
+    sort: str = Query("prompt_id", pattern="^(prompt_id|z|len_diff)$", description="prompt_id, or z/len_diff largest first"),
+    db: Session = Depends(get_db)
+):
+    """
+    Page through all of a comparison's aligned rows, filtered and sorted server-side.
+
+    statistical_results.alignment only holds a preview of the rows; this endpoint reads the
+    persisted alignment index, whose precomputed lengths, z-scores and length differences
+    back the filters and sorts, so comparisons of any size can be explored page by page.
+    Each row carries those values in `stats`.
+    """
+    service = ComparisonService(db)
+    comp = service.get_comparison(comparison_id, include_results=False)
+    if not comp:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comparison not found")
+
+    try:
+        rows, cursor_out = service.get_alignment_rows(
+            comp, cursor=cursor, limit=limit, match=match,
+            q=q, min_z=min_z, min_len_diff=min_len_diff, sort=sort
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    page = AlignedRowPage(items=rows, next_cursor=cursor_out)
+    return negotiated_response(request, page.model_dump())
+
+
+@router.get("/{comparison_id}/search", response_model=SearchResults)
+def search_comparison(
+    comparison_id: uuid.UUID,
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Words, \"quoted phrases\", OR and -exclusions"),
+    kind: Optional[str] = Query(None, pattern="^(prompt|completion)$", description="Only prompts, or only completions"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over a comparison's prompts and the outputs of its completion datasets."""
+    comp = ComparisonService(db).get_comparison(comparison_id, include_results=False)
+    if not comp:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comparison not found")
+
+    hits, next_offset = SearchService(db).search(
+        q,
+        uuid.UUID(comp.datasets[0]),
+        completion_dataset_ids=[uuid.UUID(id_str) for id_str in comp.datasets[1:]],
+        kind=kind,
+        limit=limit,
+        offset=offset
+    )
+    results = SearchResults(items=hits, next_offset=next_offset)
+    return negotiated_response(request, results.model_dump())
+
+
+def _snapshot_loader(db: AsyncSession, comparison_id: uuid.UUID):
+    async def load():
+        comp = await db.run_sync(lambda s: ComparisonService(s).get_comparison(comparison_id, include_results=False))
+        # Release the connection; the stream itself may stay open for minutes
+        await db.close()
+        if not comp:
+            return None
+        progress = await run_in_threadpool(load_progress, "comparison", comparison_id)
+        return status_snapshot(comparison_id, comp.status or "pending", progress=progress)
+    return load
+
+
+@router.get("/{comparison_id}/progress")
+def get_comparison_progress(
     comparison_id: uuid.UUID,
     db: Session = Depends(get_db)
 ):
+    """
+    Current stage, percent done and per-stage timings (seconds) of a comparison.
+
+    `progress` is null before the run starts or once the record has expired.
+    """
     service = ComparisonService(db)
-    comp = service.get_comparison(comparison_id)
+    comp = service.get_comparison(comparison_id, include_results=False)
     if not comp:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comparison not found")
-    return _normalize_comp(comp)
+    return {"status": comp.status, "progress": load_progress("comparison", comparison_id)}
+
+
+@router.get("/{comparison_id}/events")
+async def stream_comparison_events(
+    comparison_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Server-Sent Events stream of a comparison's status and progress.
+
+    Sends the current status first, then progress events as the analysis runs, and ends
+    after the terminal ("completed", "partial", "cancelled" or "failed") event; clients then
+    fetch the comparison once.
+    """
+    return await sse_event_response(
+        "comparison", comparison_id, _snapshot_loader(db, comparison_id), "Comparison not found"
+    )
+
+
+@router.websocket("/{comparison_id}/ws")
+async def comparison_events_websocket(
+    websocket: WebSocket,
+    comparison_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """WebSocket variant of /events: one JSON message per event."""
+    await websocket_events(websocket, "comparison", comparison_id, _snapshot_loader(db, comparison_id))
+
+
+@router.post("/{comparison_id}/refresh", status_code=status.HTTP_202_ACCEPTED)
+def refresh_comparison(
+    comparison_id: uuid.UUID,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """
+    Rerun a finished comparison against the current versions of its datasets.
+
+    Only the alignment rows and the pairwise tests involving the changed datasets are
+    recomputed; watch /events for the run. Returns 200 with no changed_datasets (and
+    queues nothing) when no dataset was appended to since the results were computed.
+    """
+    service = ComparisonService(db)
+    comp = service.get_comparison(comparison_id, include_results=False)
+    if not comp:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comparison not found")
+    if comp.status not in FINISHED_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Comparison has not finished: {comp.status}"
+        )
+    comp, stale = service.refresh_comparison(comparison_id)
+    if not stale:
+        response.status_code = status.HTTP_200_OK
+    elif comp.status == "pending":
+        dispatch_comparison(comp.id)
+    return {"comparison_id": comp.id, "status": comp.status, "changed_datasets": stale}
+
+
+@router.post("/{comparison_id}/cancel", status_code=status.HTTP_202_ACCEPTED)
+def cancel_comparison(
+    comparison_id: uuid.UUID,
+    db: Session = Depends(get_db)
+):
+    """
+    Cancel a pending or running comparison.
+
+    A running comparison stops at its next stage boundary and keeps the result sections
+    finished so far (`missing_sections` lists the rest); watch /events for "cancelled".
+    """
+    service = ComparisonService(db)
+    comp = service.get_comparison(comparison_id, include_results=False)
+    if not comp:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comparison not found")
+    if comp.status in FINISHED_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Comparison already finished with status: {comp.status}"
+        )
+    comp = service.cancel_comparison(comparison_id)
+    return {"comparison_id": comp.id, "status": comp.status}
 
 
 @router.delete("/{comparison_id}", status_code=status.HTTP_204_NO_CONTENT)
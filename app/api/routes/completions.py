@@ -1,22 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import uuid
-import csv
-import io
 from ...core.database import get_db
+from ...core.concurrency import run_cpu_bound
 from ...services.dataset_service import DatasetService
-from ...schemas.completion import CompletionDatasetCreate, CompletionDatasetResponse
+from ...services.pagination import next_cursor, DEFAULT_PAGE_SIZE
+from ...services.ingest import parse_completion_dataset_body, parse_completions_csv, count_completions
+from ...schemas.completion import (
+    CompletionDatasetCreate, CompletionDatasetAppend, CompletionDatasetResponse, CompletionDatasetSummary, CompletionDatasetView,
+    CompletionItemPage, CompletionItem, COMPLETION_DATASET_FIELDS, COMPLETION_DATASET_SUMMARY_FIELDS
+)
+from ..projection import parse_fields
+from ..responses import negotiated_response
+from ..caching import make_etag, is_not_modified, cache_headers, not_modified_response
 
 router = APIRouter(prefix="/api/v1/datasets", tags=["completions"])
 
 
-@router.get("/{dataset_id}/completions", response_model=List[CompletionDatasetResponse])
+def _completion_etag(request: Request, completion_dataset) -> Optional[str]:
+    """Strong ETag for a completion dataset's current content; None for legacy rows without a content hash."""
+    if not completion_dataset.content_hash:
+        return None
+    return make_etag(request, completion_dataset.id, completion_dataset.content_hash)
+
+
+@router.get("/{dataset_id}/completions", response_model=List[CompletionDatasetView], response_model_exclude_unset=True)
 def get_completion_datasets(
     dataset_id: uuid.UUID,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; without limit or cursor every completion dataset is returned"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header value from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; defaults to summary fields (no completions)"),
     db: Session = Depends(get_db)
 ):
-    """Get all completion datasets for a given prompt dataset."""
+    """
+    Get the completion datasets for a prompt dataset, newest first.
+
+    Paged only when limit or cursor is given (pages default to DEFAULT_PAGE_SIZE); the next
+    page cursor is returned in X-Next-Cursor. Without either, the full list is returned as before.
+    """
+    projection = parse_fields(fields, COMPLETION_DATASET_FIELDS, COMPLETION_DATASET_SUMMARY_FIELDS)
     service = DatasetService(db)
     
     # Verify the dataset exists
@@ -27,8 +52,22 @@ def get_completion_datasets(
             detail="Dataset not found"
         )
     
-    completion_datasets = service.get_completion_datasets(dataset_id)
-    return [CompletionDatasetResponse.from_orm_with_alias(o) for o in completion_datasets]
+    page_size = limit or (DEFAULT_PAGE_SIZE if cursor else None)
+    try:
+        completion_datasets = service.get_completion_datasets(
+            dataset_id, include_completions="completions" in projection, limit=page_size, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    cursor_out = next_cursor(completion_datasets, page_size) if page_size else None
+    return negotiated_response(
+        request,
+        [CompletionDatasetView.from_orm_fields(o, projection).model_dump(exclude_unset=True) for o in completion_datasets],
+        headers={"X-Next-Cursor": cursor_out} if cursor_out else None
+    )
 
 
 @router.post("/{dataset_id}/completions/upload", response_model=CompletionDatasetResponse, status_code=status.HTTP_201_CREATED)
@@ -38,77 +77,44 @@ async def upload_completion_dataset(
     name: str = Form(...),
     db: Session = Depends(get_db)
 ):
-    """Upload an completion dataset from CSV file."""
+    """
+    Upload an completion dataset from CSV file.
+
+    CSV parsing runs in the CPU executor; hashing, search indexing and the insert run in
+    the threadpool, so a large upload does not stall other requests on this worker.
+    """
+    # Validate file type
+    if not file.filename.lower().endswith('.csv'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be a CSV file"
+        )
+
+    content = await file.read()
     try:
-        # Validate file type
-        if not file.filename.lower().endswith('.csv'):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File must be a CSV file"
-            )
-        
-        # Read and parse CSV
-        content = await file.read()
-        csv_content = content.decode('utf-8')
-        
-        # Parse CSV data
-        completions = {}
-        reader = csv.DictReader(io.StringIO(csv_content))
-        
-        # Validate required columns
-        if 'prompt_id' not in reader.fieldnames:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="CSV must have 'prompt_id' column"
-            )
-        
-        # Check for completion text column (accept both old and new names)
-        completion_col = None
-        if 'completion_text' in reader.fieldnames:
-            completion_col = 'completion_text'
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="CSV must have 'completion_text' column"
-            )
-        
-        for row in reader:
-            prompt_id = row.get('prompt_id', '').strip()
-            completion_text = row.get(completion_col, '').strip()
-            
-            if not prompt_id or not completion_text:
-                continue  # Skip empty rows
-            
-            # Handle multiple completions per prompt_id
-            if prompt_id not in completions:
-                completions[prompt_id] = []
-            completions[prompt_id].append(completion_text)
-        
-        if not completions:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No valid completion data found in CSV"
-            )
-        
-        # Create completion dataset using existing service
-        completion_dataset_create = CompletionDatasetCreate(
-            name=name,
-            completions=completions,
-            metadata={
-                "source_file": file.filename,
-                "total_completions": sum(len(completion_list) for completion_list in completions.values()),
-                "unique_inputs": len(completions)
-            }
-        )
-        
-        service = DatasetService(db)
-        db_completion = service.create_completion_dataset(dataset_id, completion_dataset_create)
-        return CompletionDatasetResponse.from_orm_with_alias(db_completion)
-        
-    except UnicodeDecodeError:
+        completions = await run_cpu_bound(parse_completions_csv, content)
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File encoding error. Please ensure the CSV is UTF-8 encoded"
+            detail=str(e)
+        )
+
+    # Already checked by the parser, so skip re-validating every completion
+    completion_dataset_create = CompletionDatasetCreate.model_construct(
+        name=name,
+        completions=completions,
+        metadata={
+            "source_file": file.filename,
+            "total_completions": count_completions(completions),
+            "unique_inputs": len(completions)
+        }
+    )
+
+    try:
+        return await run_in_threadpool(
+            lambda: CompletionDatasetResponse.from_orm_with_alias(
+                DatasetService(db).create_completion_dataset(dataset_id, completion_dataset_create)
+            )
         )
     except ValueError as e:
         raise HTTPException(
@@ -145,14 +151,97 @@ def create_completion_dataset(
         )
 
 
-@router.get("/{dataset_id}/completions/{completion_id}", response_model=CompletionDatasetResponse)
+@router.post("/{dataset_id}/completions/bulk", response_model=CompletionDatasetSummary, status_code=status.HTTP_201_CREATED)
+async def create_completion_dataset_bulk(
+    dataset_id: uuid.UUID,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Create a completion dataset from a raw JSON body shaped like CompletionDatasetCreate.
+
+    Fast path for large payloads: the body is parsed once in the CPU executor and checked in
+    bulk instead of per-item Pydantic validation, the create (hashing, search indexing, insert)
+    runs in the threadpool off the event loop, and only a summary is returned instead of
+    echoing completions.
+    """
+    try:
+        body = await run_cpu_bound(parse_completion_dataset_body, await request.body())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    completion_dataset_create = CompletionDatasetCreate.model_construct(**body)
+
+    try:
+        return await run_in_threadpool(
+            lambda: CompletionDatasetSummary.from_orm_summary(
+                DatasetService(db).create_completion_dataset(dataset_id, completion_dataset_create)
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.post("/{dataset_id}/completions/{completion_id}/append", response_model=CompletionDatasetSummary)
+def append_completions(
+    dataset_id: uuid.UUID,
+    completion_id: uuid.UUID,
+    payload: CompletionDatasetAppend,
+    db: Session = Depends(get_db)
+):
+    """
+    Add completions for prompts the completion dataset does not cover yet.
+
+    Bumps the dataset's version; comparisons including it report it in stale_datasets
+    until they are refreshed (POST /api/v1/comparisons/{id}/refresh).
+    """
+    service = DatasetService(db)
+    completion_dataset = service.get_completion_dataset(completion_id)
+    if not completion_dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Completion dataset not found"
+        )
+    if completion_dataset.dataset_id != dataset_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Completion dataset does not belong to the specified dataset"
+        )
+
+    try:
+        return CompletionDatasetSummary.from_orm_summary(service.append_completions(completion_id, payload.completions))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.get("/{dataset_id}/completions/{completion_id}", response_model=CompletionDatasetView, response_model_exclude_unset=True)
 def get_completion_dataset(
     dataset_id: uuid.UUID,
     completion_id: uuid.UUID,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; defaults to all fields"),
     db: Session = Depends(get_db)
 ):
-    """Get a specific completion dataset."""
+    """
+    Get a specific completion dataset. Served with a strong ETag derived from the content hash,
+    to be revalidated on use since completion datasets can grow (POST .../append).
+    """
+    projection = parse_fields(fields, COMPLETION_DATASET_FIELDS, COMPLETION_DATASET_FIELDS)
     service = DatasetService(db)
+    # Scalar columns only; completions are loaded lazily below if the projection needs them
     completion_dataset = service.get_completion_dataset(completion_id)
     
     if not completion_dataset:
@@ -167,4 +256,49 @@ def get_completion_dataset(
             detail="Completion dataset does not belong to the specified dataset"
         )
     
-    return CompletionDatasetResponse.from_orm_with_alias(completion_dataset)
\ No newline at end of file
+    etag = _completion_etag(request, completion_dataset)
+    if etag and is_not_modified(request, etag):
+        return not_modified_response(etag, immutable=False)
+
+    return negotiated_response(
+        request,
+        CompletionDatasetView.from_orm_fields(completion_dataset, projection).model_dump(exclude_unset=True),
+        headers=cache_headers(etag, immutable=False)
+    )
+
+
+@router.get("/{dataset_id}/completions/{completion_id}/items", response_model=CompletionItemPage)
+def get_completion_items(
+    dataset_id: uuid.UUID,
+    completion_id: uuid.UUID,
+    request: Request,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Page through a completion dataset's entries ordered by prompt_id."""
+    service = DatasetService(db)
+    completion_dataset = service.get_completion_dataset(completion_id)
+
+    if not completion_dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Completion dataset not found"
+        )
+
+    if completion_dataset.dataset_id != dataset_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Completion dataset does not belong to the specified dataset"
+        )
+
+    etag = _completion_etag(request, completion_dataset)
+    if etag and is_not_modified(request, etag):
+        return not_modified_response(etag, immutable=False)
+
+    entries, next_cursor = service.get_completion_page(completion_id, cursor=cursor, limit=limit)
+    page = CompletionItemPage(
+        items=[CompletionItem(prompt_id=prompt_id, completions=values) for prompt_id, values in entries],
+        next_cursor=next_cursor
+    )
+    return negotiated_response(request, page.model_dump(), headers=cache_headers(etag, immutable=False))
\ No newline at end of file
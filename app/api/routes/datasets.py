@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import uuid
-import csv
-import io
 from ...core.database import get_db
+from ...core.concurrency import run_cpu_bound
 from ...services.dataset_service import DatasetService
-from ...schemas.dataset import DatasetCreate, DatasetResponse
+from ...services.pagination import next_cursor
+from ...services.search_service import SearchService
+from ...services.ingest import parse_dataset_body, parse_prompts_csv
+from ...schemas.dataset import (
+    DatasetCreate, DatasetAppend, DatasetResponse, DatasetSummary, DatasetView, PromptPage, PromptItem,
+    DATASET_FIELDS, DATASET_SUMMARY_FIELDS
+)
+from ...schemas.search import SearchResults
+from ..projection import parse_fields
+from ..responses import negotiated_response
+from ..caching import make_etag, is_not_modified, cache_headers, not_modified_response
 
 router = APIRouter(prefix="/api/v1/datasets", tags=["datasets"])
 
@@ -20,63 +30,43 @@ async def upload_dataset(
     name: str = Form(...),
     db: Session = Depends(get_db)
 ):
-    """Upload a dataset from CSV file."""
-    try:
-        # Validate file type
-        if not file.filename.lower().endswith('.csv'):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File must be a CSV file"
-            )
-        
-        # Read and parse CSV
-        content = await file.read()
-        csv_content = content.decode('utf-8')
-        
-        # Parse CSV data
-        prompts = {}
-        reader = csv.DictReader(io.StringIO(csv_content))
-        
-        # Validate required columns
-        if 'prompt_id' not in reader.fieldnames or 'prompt_text' not in reader.fieldnames:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="CSV must have 'prompt_id' and 'prompt_text' columns"
-            )
-        
-        for row in reader:
-            prompt_id = row.get('prompt_id', '').strip()
-            prompt_text = row.get('prompt_text', '').strip()
-            
-            if not prompt_id or not prompt_text:
-                continue  # Skip empty rows
-                
-            prompts[prompt_id] = prompt_text
-        
-        if not prompts:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No valid prompt data found in CSV"
-            )
-        
-        # Create dataset using existing service
-        dataset_create = DatasetCreate(
-            name=name,
-            prompts=prompts,
-            metadata={
-                "source_file": file.filename,
-                "total_inputs": len(prompts)
-            }
+    """
+    Upload a dataset from CSV file.
+
+    CSV parsing runs in the CPU executor; hashing, search indexing and the insert run in
+    the threadpool, so a large upload does not stall other requests on this worker.
+    """
+    # Validate file type
+    if not file.filename.lower().endswith('.csv'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be a CSV file"
         )
-        
-        service = DatasetService(db)
-        db_dataset = service.create_dataset(dataset_create, MOCK_USER_ID)
-        return DatasetResponse.from_orm_with_alias(db_dataset)
-        
-    except UnicodeDecodeError:
+
+    content = await file.read()
+    try:
+        prompts = await run_cpu_bound(parse_prompts_csv, content)
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File encoding error. Please ensure the CSV is UTF-8 encoded"
+            detail=str(e)
+        )
+
+    # Already checked by the parser, so skip re-validating every prompt
+    dataset_create = DatasetCreate.model_construct(
+        name=name,
+        prompts=prompts,
+        metadata={
+            "source_file": file.filename,
+            "total_inputs": len(prompts)
+        }
+    )
+
+    try:
+        return await run_in_threadpool(
+            lambda: DatasetResponse.from_orm_with_alias(
+                DatasetService(db).create_dataset(dataset_create, MOCK_USER_ID)
+            )
         )
     except Exception as e:
         raise HTTPException(
@@ -102,25 +92,87 @@ def create_dataset(
         )
 
 
-@router.get("/", response_model=List[DatasetResponse])
+@router.post("/bulk", response_model=DatasetSummary, status_code=status.HTTP_201_CREATED)
+async def create_dataset_bulk(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Create a dataset from a raw JSON body shaped like DatasetCreate.
+
+    Fast path for large payloads: the body is parsed once in the CPU executor and checked in
+    bulk instead of per-item Pydantic validation, the create (hashing, search indexing, insert)
+    runs in the threadpool off the event loop, and only a summary is returned instead of
+    echoing prompts.
+    """
+    try:
+        body = await run_cpu_bound(parse_dataset_body, await request.body())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    dataset_create = DatasetCreate.model_construct(**body)
+
+    try:
+        return await run_in_threadpool(
+            lambda: DatasetSummary.from_orm_summary(
+                DatasetService(db).create_dataset(dataset_create, MOCK_USER_ID)
+            )
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.get("/", response_model=List[DatasetView], response_model_exclude_unset=True)
 def get_datasets(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    skip: int = Query(0, ge=0, description="Deprecated: prefer cursor"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header value from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; defaults to summary fields (no prompts)"),
     db: Session = Depends(get_db)
 ):
-    """Get all datasets for the current user."""
+    """Get the current user's datasets, newest first. The next page cursor is returned in X-Next-Cursor."""
+    projection = parse_fields(fields, DATASET_FIELDS, DATASET_SUMMARY_FIELDS)
     service = DatasetService(db)
-    datasets = service.get_datasets(MOCK_USER_ID, skip=skip, limit=limit)
-    return [DatasetResponse.from_orm_with_alias(d) for d in datasets]
+    try:
+        datasets = service.get_datasets(
+            MOCK_USER_ID, skip=skip, limit=limit, include_prompts="prompts" in projection, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    cursor_out = next_cursor(datasets, limit)
+    return negotiated_response(
+        request,
+        [DatasetView.from_orm_fields(d, projection).model_dump(exclude_unset=True) for d in datasets],
+        headers={"X-Next-Cursor": cursor_out} if cursor_out else None
+    )
 
 
-@router.get("/{dataset_id}", response_model=DatasetResponse)
+@router.get("/{dataset_id}", response_model=DatasetView, response_model_exclude_unset=True)
 def get_dataset(
     dataset_id: uuid.UUID,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; defaults to all fields"),
     db: Session = Depends(get_db)
 ):
-    """Get a specific dataset by ID."""
+    """
+    Get a specific dataset by ID.
+
+    The response carries a strong ETag derived from the content hash, and a matching
+    If-None-Match is answered with 304 before the prompts are loaded. Datasets can grow
+    (POST /append), so clients revalidate instead of caching the response as immutable.
+    """
+    projection = parse_fields(fields, DATASET_FIELDS, DATASET_FIELDS)
     service = DatasetService(db)
+    # Scalar columns only; prompts are loaded lazily below if the projection needs them
     dataset = service.get_dataset(dataset_id)
     
     if not dataset:
@@ -128,5 +180,93 @@ def get_dataset(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Dataset not found"
         )
-    
-    return DatasetResponse.from_orm_with_alias(dataset)
\ No newline at end of file
+
+    # Legacy rows without a content hash are served uncached
+    etag = make_etag(request, dataset.id, dataset.content_hash) if dataset.content_hash else None
+    if etag and is_not_modified(request, etag):
+        return not_modified_response(etag, immutable=False)
+
+    return negotiated_response(
+        request,
+        DatasetView.from_orm_fields(dataset, projection).model_dump(exclude_unset=True),
+        headers=cache_headers(etag, immutable=False)
+    )
+
+
+@router.post("/{dataset_id}/append", response_model=DatasetSummary)
+def append_prompts(
+    dataset_id: uuid.UUID,
+    payload: DatasetAppend,
+    db: Session = Depends(get_db)
+):
+    """
+    Add new prompts to a dataset.
+
+    Bumps the dataset's version; comparisons of the dataset report it in stale_datasets
+    until they are refreshed (POST /api/v1/comparisons/{id}/refresh).
+    """
+    service = DatasetService(db)
+    if not service.get_dataset(dataset_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset not found"
+        )
+
+    try:
+        return DatasetSummary.from_orm_summary(service.append_prompts(dataset_id, payload.prompts))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.get("/{dataset_id}/search", response_model=SearchResults)
+def search_dataset(
+    dataset_id: uuid.UUID,
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Words, \"quoted phrases\", OR and -exclusions"),
+    kind: Optional[str] = Query(None, pattern="^(prompt|completion)$", description="Only prompts, or only completions"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over a dataset's prompts and the outputs of all its completion datasets."""
+    if not DatasetService(db).get_dataset(dataset_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset not found"
+        )
+
+    hits, next_offset = SearchService(db).search(q, dataset_id, kind=kind, limit=limit, offset=offset)
+    results = SearchResults(items=hits, next_offset=next_offset)
+    return negotiated_response(request, results.model_dump())
+
+
+@router.get("/{dataset_id}/prompts", response_model=PromptPage)
+def get_dataset_prompts(
+    dataset_id: uuid.UUID,
+    request: Request,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Page through a dataset's prompts ordered by prompt_id."""
+    service = DatasetService(db)
+    dataset = service.get_dataset(dataset_id)
+    if not dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset not found"
+        )
+
+    etag = make_etag(request, dataset.id, dataset.content_hash) if dataset.content_hash else None
+    if etag and is_not_modified(request, etag):
+        return not_modified_response(etag, immutable=False)
+
+    entries, next_cursor = service.get_prompt_page(dataset_id, cursor=cursor, limit=limit)
+    page = PromptPage(
+        items=[PromptItem(prompt_id=prompt_id, prompt_text=text) for prompt_id, text in entries],
+        next_cursor=next_cursor
+    )
+    return negotiated_response(request, page.model_dump(), headers=cache_headers(etag, immutable=False))
\ No newline at end of file
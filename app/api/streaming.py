@@ -0,0 +1,84 @@
+"""
+SSE and WebSocket relays for resource events (see app.core.events).
+
+Both transports send a status snapshot first, then every published event, and finish
+after a terminal ("completed"/"partial"/"cancelled"/"failed") event. The subscription is opened before the
+snapshot is loaded so nothing published in between is missed.
+"""
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from ..core.events import Subscription, TERMINAL_EVENTS
+from .responses import dumps_json
+
+# Comment lines keep idle connections open through proxies
+KEEPALIVE_SECONDS = 15
+
+SnapshotLoader = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+
+def format_sse(event: Dict[str, Any]) -> bytes:
+    return b"event: " + event["event"].encode() + b"\ndata: " + dumps_json(event) + b"\n\n"
+
+
+async def sse_event_response(kind: str, resource_id: Any, load_snapshot: SnapshotLoader, not_found: str) -> StreamingResponse:
+    """Stream a resource's events as text/event-stream. 404s before streaming if the resource is missing."""
+    stack = AsyncExitStack()
+    events = await stack.enter_async_context(Subscription(kind, resource_id))
+    try:
+        snapshot = await load_snapshot()
+    except BaseException:
+        await stack.aclose()
+        raise
+    if snapshot is None:
+        await stack.aclose()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+
+    async def body():
+        async with stack:
+            yield format_sse(snapshot)
+            if snapshot["event"] in TERMINAL_EVENTS:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.__anext__(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                except StopAsyncIteration:
+                    return
+                yield format_sse(event)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def websocket_events(websocket: WebSocket, kind: str, resource_id: Any, load_snapshot: SnapshotLoader) -> None:
+    """Relay a resource's events as JSON text frames, closing after the terminal event."""
+    await websocket.accept()
+    try:
+        async with Subscription(kind, resource_id) as events:
+            snapshot = await load_snapshot()
+            if snapshot is None:
+                await websocket.close(code=4404, reason="Not found")
+                return
+            await websocket.send_text(dumps_json(snapshot).decode())
+            if snapshot["event"] not in TERMINAL_EVENTS:
+                async for event in events:
+                    await websocket.send_text(dumps_json(event).decode())
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+def status_snapshot(resource_id: Any, status_value: str, **data: Any) -> Dict[str, Any]:
+    """Initial event describing the current state; terminal states use the terminal event name."""
+    event = status_value if status_value in TERMINAL_EVENTS else "status"
+    return {"event": event, "resource_id": str(resource_id), "status": status_value, **data}
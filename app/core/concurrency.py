@@ -0,0 +1,70 @@
+"""
+Bounded process pools: one for CPU-heavy request work (JSON/CSV parsing, validation) and,
+in local mode, one for background analysis tasks.
+
+Running these on the event loop would stall every other request on the worker; a thread
+pool would still contend for the GIL, so work is sent to a small process pool instead.
+Functions and arguments must be picklable (module-level functions over bytes/dicts).
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+from .config import settings
+
+_executor: Optional[ProcessPoolExecutor] = None
+_task_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_cpu_executor() -> ProcessPoolExecutor:
+    """Create the process pool on first use so importing the app does not fork."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.CPU_EXECUTOR_WORKERS)
+    return _executor
+
+
+async def run_cpu_bound(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run func(*args, **kwargs) in the CPU executor without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), partial(func, *args, **kwargs))
+
+
+def get_task_executor() -> ProcessPoolExecutor:
+    """
+    Process pool for background tasks in local mode (no Celery), so long-running analyses
+    neither compete with request handling nor die with the request process's event loop.
+    Events published in the pool are relayed to SSE/WebSocket subscribers in this process.
+    """
+    global _task_executor
+    if _task_executor is None:
+        from .events import start_event_relay
+
+        events_queue = multiprocessing.Queue()
+        start_event_relay(events_queue)
+        _task_executor = ProcessPoolExecutor(
+            max_workers=settings.LOCAL_TASK_WORKERS,
+            initializer=_init_task_process,
+            initargs=(events_queue,)
+        )
+    return _task_executor
+
+
+def _init_task_process(events_queue) -> None:
+    from .database import engine
+    from .events import set_event_forwarder
+
+    # Forked children must not reuse the parent's pooled connections
+    engine.dispose(close=False)
+    set_event_forwarder(events_queue)
+
+
+def shutdown_executors() -> None:
+    global _executor, _task_executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    if _task_executor is not None:
+        _task_executor.shutdown(wait=False, cancel_futures=True)
+        _task_executor = None
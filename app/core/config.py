@@ -23,6 +23,22 @@ class Settings(BaseSettings):
 
     # Application
     debug: bool = True
+    # Processes used for CPU-heavy request parsing (see app.core.concurrency)
+    CPU_EXECUTOR_WORKERS: int = 2
+    # Processes running comparisons when Celery is disabled (local mode)
+    LOCAL_TASK_WORKERS: int = 2
+    # Prompt ids per shard task when an analysis job is fanned out over Celery workers
+    ANALYSIS_SHARD_SIZE: int = 5000
+    # Analysis jobs within both limits go to the interactive queue, everything else to bulk
+    INTERACTIVE_MAX_COMPLETIONS: int = 10_000
+    INTERACTIVE_MAX_BYTES: int = 10 * 1024 * 1024
+    # Approximate memory budget of each process's decoded-dataset cache (see services/dataset_cache.py)
+    DATASET_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    # Result sections at least this large (JSON bytes) are stored compressed in result_blobs
+    RESULT_BLOB_MIN_BYTES: int = 16 * 1024
+    RESULT_BLOB_COMPRESSION_LEVEL: int = 6
+    # Postgres text search configuration of the search index (stemming, stop words)
+    SEARCH_TEXT_CONFIG: str = "english"
     secret_key: str = "your-secret-key-here"
 
     class Config:
@@ -1,11 +1,34 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+import orjson
 from .config import settings
 
 engine = create_engine(settings.SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _async_database_url(url: str) -> str:
+    return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+
+def _json_serializer(value) -> str:
+    # Large JSON columns are encoded while the event loop waits; orjson keeps that short
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+# Async engine for routes running on the event loop (async def handlers). Sync services are
+# reused through AsyncSession.run_sync, so models and queries are shared with the sync path.
+async_engine = create_async_engine(
+    _async_database_url(settings.SQLALCHEMY_DATABASE_URL),
+    json_serializer=_json_serializer,
+    pool_pre_ping=True
+)
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -14,4 +37,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,152 @@
+"""
+Progress/status event bus for analysis jobs and comparisons.
+
+Workers publish events on a per-resource Redis pub/sub channel; the API relays them to
+clients over SSE/WebSocket. In local mode (no Redis) an in-process broker is used; tasks
+running in the local process pool forward their events to the API process over a
+multiprocessing queue (see core/concurrency.py).
+
+Event payloads are flat dicts: {"event": <name>, "resource_id": ..., "ts": ..., **data}.
+"completed", "partial", "cancelled" and "failed" are terminal; a Subscription stops after
+yielding one.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import orjson
+from .config import settings
+from .redis import redis_client
+
+# Final statuses of a job/comparison; each is also published as the event of that name
+TERMINAL_EVENTS = ("completed", "partial", "cancelled", "failed")
+
+# channel -> {(loop, queue)} for local-mode subscribers
+_local_subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+_local_lock = threading.Lock()
+# Callbacks run for every locally delivered event (e.g. the local progress store)
+_local_listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+# Set in local-mode task processes: events are forwarded to the API process through it
+_forward_queue = None
+
+
+def channel_name(kind: str, resource_id: Any) -> str:
+    return f"oedipus:events:{kind}:{resource_id}"
+
+
+def publish_event(kind: str, resource_id: Any, event: str, **data: Any) -> None:
+    """
+    Publish an event for a resource. Never raises: progress reporting must not fail the job.
+    """
+    payload = {"event": event, "resource_id": str(resource_id), "ts": time.time(), **data}
+    channel = channel_name(kind, resource_id)
+    try:
+        if redis_client is not None:
+            redis_client.publish(channel, orjson.dumps(payload))
+            return
+        if _forward_queue is not None:
+            _forward_queue.put((channel, payload))
+            return
+        _deliver_local(channel, payload)
+    except Exception as e:
+        print(f"Failed to publish {event} event on {channel}: {e}")
+
+
+def _deliver_local(channel: str, payload: Dict[str, Any]) -> None:
+    for listener in _local_listeners:
+        listener(channel, payload)
+    with _local_lock:
+        subscribers = list(_local_subscribers.get(channel, ()))
+    for loop, queue in subscribers:
+        loop.call_soon_threadsafe(queue.put_nowait, payload)
+
+
+def add_local_listener(listener: Callable[[str, Dict[str, Any]], None]) -> None:
+    """Register a callback for events delivered in this process (local mode only)."""
+    _local_listeners.append(listener)
+
+
+def set_event_forwarder(queue) -> None:
+    """Called in local-mode task processes: publish by forwarding to the API process."""
+    global _forward_queue
+    _forward_queue = queue
+
+
+def start_event_relay(queue) -> None:
+    """Deliver events forwarded by local-mode task processes in this (the API) process."""
+    def relay():
+        while True:
+            channel, payload = queue.get()
+            try:
+                _deliver_local(channel, payload)
+            except Exception as e:
+                print(f"Failed to relay event on {channel}: {e}")
+
+    threading.Thread(target=relay, name="event-relay", daemon=True).start()
+
+
+class Subscription:
+    """
+    Async iterator over a resource's events, registered on entry.
+
+    Registering before the caller reads the current state from the database means no
+    event published in between is lost:
+
+        async with Subscription("analysis", job_id) as events:
+            snapshot = load_status()
+            async for event in events:
+                ...
+    """
+
+    def __init__(self, kind: str, resource_id: Any):
+        self.channel = channel_name(kind, resource_id)
+        self._done = False
+        self._queue: Optional[asyncio.Queue] = None
+        self._entry = None
+        self._client = None
+        self._pubsub = None
+
+    async def __aenter__(self) -> "Subscription":
+        if redis_client is not None:
+            import redis.asyncio as aioredis
+
+            self._client = aioredis.from_url(settings.REDIS_URL)
+            self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(self.channel)
+        else:
+            self._queue = asyncio.Queue()
+            self._entry = (asyncio.get_running_loop(), self._queue)
+            with _local_lock:
+                _local_subscribers.setdefault(self.channel, set()).add(self._entry)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.aclose()
+            await self._client.aclose()
+        if self._entry is not None:
+            with _local_lock:
+                subscribers = _local_subscribers.get(self.channel)
+                if subscribers is not None:
+                    subscribers.discard(self._entry)
+                    if not subscribers:
+                        del _local_subscribers[self.channel]
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        if self._done:
+            raise StopAsyncIteration
+        if self._pubsub is not None:
+            while True:
+                message = await self._pubsub.get_message(timeout=None)
+                if message and message.get("type") == "message":
+                    event = orjson.loads(message["data"])
+                    break
+        else:
+            event = await self._queue.get()
+        self._done = event.get("event") in TERMINAL_EVENTS
+        return event
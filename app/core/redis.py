@@ -1,4 +1,5 @@
 import redis
 from .config import settings
 
-redis_client = redis.from_url(settings.redis_url, decode_responses=True)
\ No newline at end of file
+# None in local mode (no Redis configured); callers fall back to in-process alternatives
+redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True) if settings.REDIS_URL else None
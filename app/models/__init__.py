@@ -3,4 +3,7 @@ from .dataset import Dataset  # noqa: F401
 from .completion import CompletionDataset  # noqa: F401
 from .analysis import AnalysisJob  # noqa: F401
 from .comparison import Comparison  # noqa: F401
-from .comparison_metric import ComparisonMetric  # noqa: F401
\ No newline at end of file
+from .comparison_metric import ComparisonMetric  # noqa: F401
+from .result_blob import ResultBlob  # noqa: F401
+from .comparison_alignment import ComparisonAlignmentRow  # noqa: F401
+from .search_entry import SearchEntry  # noqa: F401
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, String, DateTime, JSON, ForeignKey, Integer, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -8,10 +8,30 @@ from ..core.database import Base
 
 class AnalysisJob(Base):
     __tablename__ = "analysis_jobs"
+    __table_args__ = (
+        # Supports per-dataset job lookups ordered by recency
+        Index("ix_analysis_jobs_completion_dataset_id_created_at", "completion_dataset_id", "created_at"),
+        # Finds finished jobs with identical inputs
+        Index("ix_analysis_jobs_cache_key_status", "cache_key", "status"),
+        # At most one in-flight job per cache key; duplicates attach to it instead
+        Index(
+            "uq_analysis_jobs_active_cache_key", "cache_key", unique=True,
+            postgresql_where=text("status IN ('pending', 'running')"),
+            sqlite_where=text("status IN ('pending', 'running')")
+        ),
+        # Finds the jobs waiting on a job for another dataset with identical inputs
+        Index("ix_analysis_jobs_source_job_id", "source_job_id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     completion_dataset_id = Column(UUID(as_uuid=True), ForeignKey("completion_datasets.id"), nullable=False)
-    status = Column(String, nullable=False, default="pending")  # pending/running/completed/failed
+    status = Column(String, nullable=False, default="pending")  # pending/running/cancelling/completed/partial/cancelled/failed
+    priority = Column(Integer, nullable=True)  # 0-9, higher runs first within the job's queue
+    # sha256 of (prompts hash, completions hash, metric set, engine version); NULL for legacy datasets
+    cache_key = Column(String(64), nullable=True)
+    # Set on a job that takes its results from an in-flight job for identical content instead
+    # of running; it ends with that job's status and results
+    source_job_id = Column(UUID(as_uuid=True), ForeignKey("analysis_jobs.id", ondelete="SET NULL"), nullable=True)
     results = Column(JSON, default=dict)  # computed metrics
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
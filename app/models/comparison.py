@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, JSON
+from sqlalchemy import Column, String, DateTime, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 import uuid
@@ -7,6 +7,10 @@ from ..core.database import Base
 
 class Comparison(Base):
     __tablename__ = "comparisons"
+    __table_args__ = (
+        # Supports keyset pagination of the comparison listing
+        Index("ix_comparisons_created_at_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False)
@@ -16,8 +20,12 @@ class Comparison(Base):
     datasets = Column(JSON)  # References to existing datasets (UUIDs as strings)
     alignment_key = Column(String, default="prompt_id")
     comparison_config = Column(JSON)  # User preferences, thresholds
+    # Dataset id -> version the alignment index and results were computed from
+    dataset_versions = Column(JSON, nullable=True)
 
     # Results
     statistical_results = Column(JSON)  # Test outcomes, p-values, effect sizes (also holds alignment summary in Phase 1)
     automated_insights = Column(JSON)  # List[str]
-    status = Column(String, default="pending")  # pending/running/completed/failed
\ No newline at end of file
+    status = Column(String, default="pending")  # pending/running/cancelling/completed/partial/cancelled/failed
+    # Celery task id of the current/last run; a redelivery of that task may take over a "running" comparison
+    run_task_id = Column(String, nullable=True)
\ No newline at end of file
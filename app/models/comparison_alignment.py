@@ -0,0 +1,40 @@
+from sqlalchemy import Column, String, Text, BigInteger, Float, JSON, ForeignKey, Index, DDL, event
+from sqlalchemy.dialects.postgresql import UUID
+from ..core.database import Base
+
+
+class ComparisonAlignmentRow(Base):
+    """
+    One prompt of a comparison's alignment index; the primary key orders a comparison's rows by prompt_id.
+
+    The explorer's derived columns are precomputed (see services/alignment.py) so sorting,
+    outlier filtering and text search of the rows run in the database.
+    """
+    __tablename__ = "comparison_alignment_rows"
+    __table_args__ = (
+        # Keyset pagination of rows sorted by outlier score or length difference
+        Index("ix_comparison_alignment_rows_max_abs_z", "comparison_id", "max_abs_z", "prompt_id"),
+        Index("ix_comparison_alignment_rows_len_diff", "comparison_id", "len_diff", "prompt_id"),
+        # Trigram index so case-insensitive substring search (ILIKE '%...%') avoids a scan
+        Index(
+            "ix_comparison_alignment_rows_prompt_text_trgm", "prompt_text",
+            postgresql_using="gin", postgresql_ops={"prompt_text": "gin_trgm_ops"}
+        ),
+    )
+
+    comparison_id = Column(UUID(as_uuid=True), ForeignKey("comparisons.id", ondelete="CASCADE"), primary_key=True)
+    prompt_id = Column(String, primary_key=True)
+    # Bit i is set when the comparison's i-th completion dataset (datasets[1 + i]) has completions for the prompt
+    presence = Column(BigInteger, nullable=False)
+    prompt_text = Column(Text, nullable=True)
+    max_abs_z = Column(Float, nullable=True)  # largest |length z-score| across the datasets
+    len_diff = Column(Float, nullable=True)  # |length difference| of the first two datasets' outputs
+    stats = Column(JSON, nullable=True)  # per-dataset lists: lengths, counts, z
+
+
+# The trigram operator class needs the extension when create_all() builds the table
+event.listen(
+    ComparisonAlignmentRow.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
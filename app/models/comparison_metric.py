@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Float, ForeignKey
+from sqlalchemy import Column, String, DateTime, Float, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -6,16 +6,30 @@ from ..core.database import Base
 
 
 class ComparisonMetric(Base):
+    """
+    One test row of a comparison's statistical_results["metrics"], written when the run
+    finishes so metrics can be filtered across comparisons without loading the results.
+    """
     __tablename__ = "comparison_metrics"
+    __table_args__ = (
+        # Cross-comparison queries: a metric's rows by p-value (e.g. Completion Length with p < 0.01)
+        Index("ix_comparison_metrics_name_significance", "metric_name", "statistical_significance"),
+        Index("ix_comparison_metrics_comparison_id", "comparison_id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     comparison_id = Column(UUID(as_uuid=True), ForeignKey("comparisons.id"))
     metric_name = Column(String)  # entropy, token_count, custom_score
+    # Names of the compared completion datasets
+    dataset_a = Column(String, nullable=True)
+    dataset_b = Column(String, nullable=True)
     dataset_a_value = Column(Float)
     dataset_b_value = Column(Float)
     statistical_significance = Column(Float)  # p-value
+    q_value_holm = Column(Float, nullable=True)
+    q_value_bh = Column(Float, nullable=True)
     effect_size = Column(Float)
     confidence_interval_lower = Column(Float)
     confidence_interval_upper = Column(Float)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
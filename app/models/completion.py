@@ -1,20 +1,32 @@
-from sqlalchemy import Column, String, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, String, DateTime, JSON, ForeignKey, Integer, BigInteger, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 import uuid
 from ..core.database import Base
 
 
 class CompletionDataset(Base):
     __tablename__ = "completion_datasets"
+    __table_args__ = (
+        # Supports keyset pagination of a dataset's completion datasets
+        Index("ix_completion_datasets_dataset_id_created_at_id", "dataset_id", "created_at", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False)
     dataset_id = Column(UUID(as_uuid=True), ForeignKey("datasets.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    completions = Column(JSON, nullable=False)  # mapping (dataset_name, prompt_id) -> [output_strings]
+    # Deferred so listings never pull the blob; use undefer(CompletionDataset.completions) when it is needed
+    completions = deferred(Column(JSON, nullable=False))  # mapping (dataset_name, prompt_id) -> [output_strings]
     user_metadata = Column('metadata', JSON, default=dict)
+
+    # Summary columns recorded at ingest so callers never need the completions blob for counts
+    prompt_count = Column(Integer, nullable=True)  # number of prompt_ids with completions
+    completion_count = Column(Integer, nullable=True)
+    content_hash = Column(String(64), nullable=True)  # sha256 of canonical completions JSON
+    size_bytes = Column(BigInteger, nullable=True)  # byte size of canonical completions JSON
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # incremented by every append
     
     # Relationship
     dataset = relationship("Dataset", backref="completion_datasets")
\ No newline at end of file
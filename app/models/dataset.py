@@ -1,16 +1,27 @@
-from sqlalchemy import Column, String, DateTime, JSON
+from sqlalchemy import Column, String, DateTime, JSON, Integer, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
+from sqlalchemy.orm import deferred
 import uuid
 from ..core.database import Base
 
 
 class Dataset(Base):
     __tablename__ = "datasets"
+    __table_args__ = (
+        # Supports keyset pagination of a user's datasets
+        Index("ix_datasets_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False)
     user_id = Column(UUID(as_uuid=True), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    prompts = Column(JSON, nullable=False)  # mapping inputId -> input_string
-    user_metadata = Column('metadata', JSON, default=dict)  # user-defined metadata
\ No newline at end of file
+    # Deferred so listings never pull the blob; use undefer(Dataset.prompts) when it is needed
+    prompts = deferred(Column(JSON, nullable=False))  # mapping inputId -> input_string
+    user_metadata = Column('metadata', JSON, default=dict)  # user-defined metadata
+
+    # Summary columns recorded at ingest so callers never need the prompts blob for counts
+    prompt_count = Column(Integer, nullable=True)
+    content_hash = Column(String(64), nullable=True)  # sha256 of canonical prompts JSON
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # incremented by every append
\ No newline at end of file
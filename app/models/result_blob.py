@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, DateTime, Integer, LargeBinary
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+
+class ResultBlob(Base):
+    __tablename__ = "result_blobs"
+
+    # sha256 of the encoded value (content-addressed), or a caller-chosen name for scratch data
+    key = Column(String(64), primary_key=True)
+    kind = Column(String, nullable=False)  # result section name, or "shard" for shard partials
+    codec = Column(String, nullable=False, default="zlib+json")
+    data = Column(LargeBinary, nullable=False)
+    raw_bytes = Column(Integer, nullable=False)  # size of the uncompressed JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
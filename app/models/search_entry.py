@@ -0,0 +1,35 @@
+from sqlalchemy import Column, String, Text, Integer, BigInteger, ForeignKey, Index, text as sql_text
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from ..core.database import Base
+
+
+class SearchEntry(Base):
+    """
+    One searchable text of a dataset: a prompt, or one output of a completion dataset.
+
+    Written at ingest (see services/search_service.py) so full-text search never has to
+    expand the prompts/completions JSON blobs. Sharded analyses read their prompt-id
+    ranges from these rows for the same reason.
+    """
+    __tablename__ = "search_entries"
+    __table_args__ = (
+        # Scopes searches to a dataset and, for comparisons, to its completion datasets
+        Index("ix_search_entries_dataset_id_completion_dataset_id", "dataset_id", "completion_dataset_id"),
+        Index("ix_search_entries_search_vector", "search_vector", postgresql_using="gin"),
+        # Prompt-id ranges read by sharded analyses (DatasetService.get_prompt_range/get_completion_range)
+        Index(
+            "ix_search_entries_prompts_dataset_id_prompt_id", "dataset_id", "prompt_id",
+            postgresql_where=sql_text("completion_dataset_id IS NULL")
+        ),
+        Index("ix_search_entries_completion_dataset_id_prompt_id", "completion_dataset_id", "prompt_id", "position"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    dataset_id = Column(UUID(as_uuid=True), ForeignKey("datasets.id", ondelete="CASCADE"), nullable=False)
+    # NULL for prompts
+    completion_dataset_id = Column(UUID(as_uuid=True), ForeignKey("completion_datasets.id", ondelete="CASCADE"), nullable=True)
+    prompt_id = Column(String, nullable=False)
+    position = Column(Integer, nullable=True)  # index of the output in its prompt's list; NULL for prompts
+    text = Column(Text, nullable=False)
+    # to_tsvector(SEARCH_TEXT_CONFIG, text) on Postgres; unused (NULL) elsewhere
+    search_vector = Column(TSVECTOR().with_variant(Text, "sqlite"), nullable=True)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional
 from datetime import datetime
 import uuid
@@ -6,12 +6,19 @@ import uuid
 
 class AnalysisJobCreate(BaseModel):
     completion_dataset_id: uuid.UUID
+    # 0-9, higher runs first among jobs waiting on the same queue
+    priority: Optional[int] = Field(default=None, ge=0, le=9)
+    # Recompute even if a finished job with identical inputs exists
+    force: bool = False
 
 
 class AnalysisJobResponse(BaseModel):
     id: uuid.UUID
     completion_dataset_id: uuid.UUID
     status: str
+    priority: Optional[int] = None
+    # The job for identical content this one waits on, if it was not run itself
+    source_job_id: Optional[uuid.UUID] = None
     results: Dict[str, Any]
     created_at: datetime
     completed_at: Optional[datetime]
@@ -9,7 +9,10 @@ import uuid
 class ComparisonCreate(BaseModel):
     name: str
     dataset_id: uuid.UUID
-    completion_dataset_ids: List[uuid.UUID] = Field(..., min_items=2, description="At least two completion datasets to compare")
+    # At most 63: alignment rows record which datasets cover a prompt as a signed 64-bit bitmask
+    completion_dataset_ids: List[uuid.UUID] = Field(
+        ..., min_items=2, max_items=63, description="Two to 63 completion datasets to compare"
+    )
     alignment_key: str = "prompt_id"
     comparison_config: Optional[Dict[str, Any]] = {}
 
@@ -29,5 +32,53 @@ class ComparisonResponse(BaseModel):
     automated_insights: List[str] = Field(default_factory=list)
     status: str = "pending"
 
+    # Dataset id -> version the results were computed from; stale_datasets were appended to since
+    dataset_versions: Dict[str, int] = Field(default_factory=dict)
+    stale_datasets: List[uuid.UUID] = Field(default_factory=list)
+
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class AlignedRowStats(BaseModel):
+    # Keyed by completion dataset name; lengths are of each dataset's first output
+    lengths: Dict[str, Optional[int]]
+    counts: Dict[str, int]
+    zScores: Dict[str, Optional[float]]
+    maxAbsZ: Optional[float] = None
+    lenDiff: Optional[float] = None  # first two datasets
+
+
+class AlignedRow(BaseModel):
+    inputId: str
+    inputText: str
+    # Completion dataset name -> outputs, or None when the dataset has none for the prompt
+    completions: Dict[str, Optional[List[str]]]
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+    stats: Optional[AlignedRowStats] = None
+
+
+class AlignedRowPage(BaseModel):
+    items: List[AlignedRow]
+    next_cursor: Optional[str] = None
+
+
+class ComparisonMetricRow(BaseModel):
+    # A test row of a comparison's statistical_results["metrics"], from comparison_metrics
+    comparison_id: uuid.UUID
+    comparison_name: str
+    metric_name: str
+    dataset_a: Optional[str] = None
+    dataset_b: Optional[str] = None
+    dataset_a_value: Optional[float] = None
+    dataset_b_value: Optional[float] = None
+    statistical_significance: float
+    q_value_holm: Optional[float] = None
+    q_value_bh: Optional[float] = None
+    effect_size: Optional[float] = None
+    confidence_interval_lower: Optional[float] = None
+    confidence_interval_upper: Optional[float] = None
+
+
+class ComparisonMetricPage(BaseModel):
+    items: List[ComparisonMetricRow]
+    next_cursor: Optional[str] = None
@@ -10,6 +10,10 @@ class CompletionDatasetCreate(BaseModel):
     metadata: Optional[Dict[str, Any]] = {}
 
 
+class CompletionDatasetAppend(BaseModel):
+    completions: Dict[str, List[str]]  # prompt_id -> [output_strings] for prompts without completions yet
+
+
 class CompletionDatasetResponse(BaseModel):
     id: uuid.UUID
     name: str
@@ -31,4 +35,71 @@ class CompletionDatasetResponse(BaseModel):
         )
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class CompletionDatasetSummary(BaseModel):
+    """Lightweight completion dataset view that never carries the completions payload."""
+    id: uuid.UUID
+    name: str
+    dataset_id: uuid.UUID
+    created_at: datetime
+    prompt_count: int
+    completion_count: int
+    content_hash: str
+    size_bytes: Optional[int] = None
+    version: int = 1
+
+    @classmethod
+    def from_orm_summary(cls, obj: "CompletionDataset"):
+        return cls(
+            id=obj.id,
+            name=obj.name,
+            dataset_id=obj.dataset_id,
+            created_at=obj.created_at,
+            prompt_count=obj.prompt_count,
+            completion_count=obj.completion_count,
+            content_hash=obj.content_hash,
+            size_bytes=obj.size_bytes,
+            version=obj.version or 1
+        )
+
+
+# Fields a completion dataset listing may project; the default omits the completions payload
+COMPLETION_DATASET_FIELDS = (
+    "id", "name", "dataset_id", "created_at", "metadata", "prompt_count", "completion_count", "content_hash", "size_bytes",
+    "version", "completions"
+)
+COMPLETION_DATASET_SUMMARY_FIELDS = COMPLETION_DATASET_FIELDS[:-1]
+
+
+class CompletionDatasetView(BaseModel):
+    """Field projection of a completion dataset; serialize with exclude_unset so only requested fields appear."""
+    id: Optional[uuid.UUID] = None
+    name: Optional[str] = None
+    dataset_id: Optional[uuid.UUID] = None
+    created_at: Optional[datetime] = None
+    metadata: Optional[Dict[str, Any]] = None
+    prompt_count: Optional[int] = None
+    completion_count: Optional[int] = None
+    content_hash: Optional[str] = None
+    size_bytes: Optional[int] = None
+    version: Optional[int] = None
+    completions: Optional[Dict[str, List[str]]] = None
+
+    @classmethod
+    def from_orm_fields(cls, obj: "CompletionDataset", fields):
+        return cls(**{
+            field: (getattr(obj, 'user_metadata', {}) or {}) if field == "metadata" else getattr(obj, field)
+            for field in fields
+        })
+
+
+class CompletionItem(BaseModel):
+    prompt_id: str
+    completions: List[str]
+
+
+class CompletionItemPage(BaseModel):
+    items: List[CompletionItem]
+    next_cursor: Optional[str] = None
\ No newline at end of file
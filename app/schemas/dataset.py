@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from datetime import datetime
 import uuid
 
@@ -10,6 +10,10 @@ class DatasetCreate(BaseModel):
     metadata: Optional[Dict[str, Any]] = {}
 
 
+class DatasetAppend(BaseModel):
+    prompts: Dict[str, str]  # new inputId -> input_string; ids must not exist yet
+
+
 class DatasetResponse(BaseModel):
     id: uuid.UUID
     name: str
@@ -31,4 +35,60 @@ class DatasetResponse(BaseModel):
         )
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class DatasetSummary(BaseModel):
+    """Lightweight dataset view that never carries the prompts payload."""
+    id: uuid.UUID
+    name: str
+    created_at: datetime
+    prompt_count: int
+    content_hash: str
+    version: int = 1
+
+    @classmethod
+    def from_orm_summary(cls, obj: "Dataset"):
+        return cls(
+            id=obj.id,
+            name=obj.name,
+            created_at=obj.created_at,
+            prompt_count=obj.prompt_count,
+            content_hash=obj.content_hash,
+            version=obj.version or 1
+        )
+
+
+# Fields a dataset listing may project; the default omits the prompts payload
+DATASET_FIELDS = ("id", "name", "user_id", "created_at", "metadata", "prompt_count", "content_hash", "version", "prompts")
+DATASET_SUMMARY_FIELDS = DATASET_FIELDS[:-1]
+
+
+class DatasetView(BaseModel):
+    """Field projection of a dataset; serialize with exclude_unset so only requested fields appear."""
+    id: Optional[uuid.UUID] = None
+    name: Optional[str] = None
+    user_id: Optional[uuid.UUID] = None
+    created_at: Optional[datetime] = None
+    metadata: Optional[Dict[str, Any]] = None
+    prompt_count: Optional[int] = None
+    content_hash: Optional[str] = None
+    version: Optional[int] = None
+    prompts: Optional[Dict[str, str]] = None
+
+    @classmethod
+    def from_orm_fields(cls, obj: "Dataset", fields):
+        return cls(**{
+            field: (getattr(obj, 'user_metadata', {}) or {}) if field == "metadata" else getattr(obj, field)
+            for field in fields
+        })
+
+
+class PromptItem(BaseModel):
+    prompt_id: str
+    prompt_text: str
+
+
+class PromptPage(BaseModel):
+    items: List[PromptItem]
+    next_cursor: Optional[str] = None
\ No newline at end of file
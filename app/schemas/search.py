@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List, Optional
+import uuid
+
+
+class SearchHit(BaseModel):
+    prompt_id: str
+    kind: str  # "prompt" or "completion"
+    # Set for completions: the completion dataset and the output's index in the prompt's list
+    completion_dataset_id: Optional[uuid.UUID] = None
+    position: Optional[int] = None
+    text: str
+    rank: Optional[float] = None  # relevance on Postgres; None for the substring fallback
+
+
+class SearchResults(BaseModel):
+    items: List[SearchHit]
+    next_offset: Optional[int] = None
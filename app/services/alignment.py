@@ -0,0 +1,191 @@
+"""
+Alignment of a prompt dataset across the completion datasets of a comparison.
+
+compute_alignment builds the per-prompt index persisted in comparison_alignment_rows,
+together with the explorer's derived columns, so sorting and filtering run in the
+database instead of on a downloaded table:
+- lengths/counts: character length of each dataset's first output and its number of outputs
+- z: each length's z-score against that dataset's lengths over the whole comparison
+- max_abs_z: the largest |z| of the row (a row is an outlier at threshold t if max_abs_z >= t)
+- len_diff: |length difference| between the first two datasets (None if either is missing)
+
+The summary records the length moments the z-scores were computed against, so a refresh
+after an append can index only the new or changed rows while those moments still hold
+(see moments_drifted).
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..models.completion import CompletionDataset
+
+# Aligned rows and unmatched prompt ids kept inline in statistical_results["alignment"]
+ALIGNMENT_PREVIEW_ROWS = 200
+# Bump when the persisted index gains columns; older comparisons are re-indexed on access
+ALIGNMENT_INDEX_VERSION = 2
+# Largest z-score error (in standard deviations) a refresh accepts before re-indexing every row
+ALIGNMENT_Z_DRIFT_TOLERANCE = 0.05
+
+
+def _first_length(outputs: Optional[List[str]]) -> Optional[int]:
+    if isinstance(outputs, list) and outputs and isinstance(outputs[0], str):
+        return len(outputs[0])
+    return None
+
+
+def _moments(values: List[Optional[int]]) -> Tuple[Optional[float], float]:
+    present = np.array([v for v in values if v is not None], dtype=float)
+    if not present.size:
+        return None, 1.0
+    return float(present.mean()), float(present.std()) or 1.0
+
+
+def aligned_row(prompt_id: str, prompt_text: str, completions: List[CompletionDataset]) -> Dict[str, Any]:
+    """A row in the Feature 1 alignedRows shape: outputs and metadata keyed by dataset name."""
+    row_outputs: Dict[str, Any] = {}
+    row_meta: Dict[str, Any] = {}
+    for o in completions:
+        row_outputs[o.name] = (o.completions or {}).get(prompt_id, None)
+        row_meta[o.name] = {}
+    return {
+        "inputId": prompt_id,
+        "inputText": prompt_text,
+        "completions": row_outputs,
+        "metadata": row_meta,
+    }
+
+
+def row_stats(stats: Dict[str, List[Any]], max_abs_z: float, len_diff: Optional[float], names: List[str]) -> Dict[str, Any]:
+    """Stored positional stats of an index row, keyed by dataset name for the API."""
+    return {
+        "lengths": dict(zip(names, stats["lengths"])),
+        "counts": dict(zip(names, stats["counts"])),
+        "zScores": dict(zip(names, stats["z"])),
+        "maxAbsZ": max_abs_z,
+        "lenDiff": len_diff,
+    }
+
+
+def length_moments(prompt_ids: List[str], completions: List[CompletionDataset]) -> List[Tuple[Optional[float], float]]:
+    """(mean, std) of each completion dataset's first-output lengths over prompt_ids."""
+    return [
+        _moments([_first_length((o.completions or {}).get(prompt_id)) for prompt_id in prompt_ids])
+        for o in completions
+    ]
+
+
+def moments_drifted(
+    reference: List[List[Optional[float]]], current: List[Tuple[Optional[float], float]], tolerance: float
+) -> bool:
+    """
+    True when z-scores against `reference` moments would be off by more than about
+    `tolerance` standard deviations (for rows within one standard deviation of the mean).
+    """
+    if len(reference) != len(current):
+        return True
+    for (ref_mean, ref_std), (mean, std) in zip(reference, current):
+        if ref_mean is None or mean is None:
+            if ref_mean is not mean:
+                return True
+            continue
+        if abs(mean - ref_mean) / ref_std + abs(std - ref_std) / ref_std > tolerance:
+            return True
+    return False
+
+
+def index_entries(
+    prompts: Dict[str, str],
+    prompt_ids: List[str],
+    completions: List[CompletionDataset],
+    moments: List[Tuple[Optional[float], float]]
+) -> List[Dict[str, Any]]:
+    """
+    comparison_alignment_rows entries of prompt_ids, with z-scores against `moments`.
+
+    Bit i of "presence" is set when completions[i] has outputs for the prompt.
+    """
+    outputs = [o.completions or {} for o in completions]
+    entries: List[Dict[str, Any]] = []
+    for prompt_id in prompt_ids:
+        presence = 0
+        counts = []
+        row_lengths = []
+        for bit, ds_outputs in enumerate(outputs):
+            values = ds_outputs.get(prompt_id)
+            if values is not None:
+                presence |= 1 << bit
+            counts.append(len(values) if isinstance(values, list) else 0)
+            row_lengths.append(_first_length(values))
+        z_scores = [
+            None if length is None or mean is None else (length - mean) / std
+            for length, (mean, std) in zip(row_lengths, moments)
+        ]
+        len_diff = None
+        if len(row_lengths) >= 2 and row_lengths[0] is not None and row_lengths[1] is not None:
+            len_diff = float(abs(row_lengths[0] - row_lengths[1]))
+        entries.append({
+            "prompt_id": prompt_id,
+            "presence": presence,
+            "prompt_text": prompts[prompt_id],
+            "max_abs_z": max((abs(z) for z in z_scores if z is not None), default=0.0),
+            "len_diff": len_diff,
+            "stats": {"lengths": row_lengths, "counts": counts, "z": z_scores},
+        })
+    return entries
+
+
+def alignment_summary(
+    preview_rows: List[Dict[str, Any]],
+    unmatched_preview: List[str],
+    total_inputs: int,
+    matched_inputs: int,
+    moments: List[Tuple[Optional[float], float]]
+) -> Dict[str, Any]:
+    """statistical_results["alignment"]: coverage stats plus previews of the rows and unmatched prompt ids."""
+    coverage = (matched_inputs / total_inputs * 100.0) if total_inputs else 0.0
+    return {
+        "alignedRows": preview_rows,
+        "unmatchedInputs": unmatched_preview,
+        "unmatchedCount": total_inputs - matched_inputs,
+        "coverageStats": {
+            "totalInputs": total_inputs,
+            "matchedInputs": matched_inputs,
+            "coveragePercentage": round(coverage, 2),
+        },
+        # Every row is in comparison_alignment_rows; page them with GET /comparisons/{id}/rows
+        "indexed": True,
+        "indexVersion": ALIGNMENT_INDEX_VERSION,
+        # Reference moments of the stored z-scores, per completion dataset
+        "lengthMoments": [list(m) for m in moments],
+    }
+
+
+def compute_alignment(
+    prompts: Dict[str, str], completions: List[CompletionDataset]
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Align the prompts across the completion datasets.
+
+    Returns (summary, index). The index has one entry per prompt, ordered by prompt_id,
+    with the comparison_alignment_rows columns (see index_entries). The summary (stored in
+    statistical_results["alignment"]) holds the coverage stats and only a preview of the
+    rows and unmatched prompt ids.
+    """
+    full_mask = (1 << len(completions)) - 1
+    prompt_ids = sorted(prompts)
+    moments = length_moments(prompt_ids, completions)
+    index = index_entries(prompts, prompt_ids, completions, moments)
+
+    preview_rows: List[Dict[str, Any]] = []
+    unmatched_preview: List[str] = []
+    matched_inputs = 0
+    for entry in index:
+        prompt_id = entry["prompt_id"]
+        if entry["presence"] == full_mask:
+            matched_inputs += 1
+            if len(preview_rows) < ALIGNMENT_PREVIEW_ROWS:
+                preview_rows.append(aligned_row(prompt_id, prompts[prompt_id], completions))
+        elif len(unmatched_preview) < ALIGNMENT_PREVIEW_ROWS:
+            unmatched_preview.append(prompt_id)
+
+    return alignment_summary(preview_rows, unmatched_preview, len(prompts), matched_inputs, moments), index
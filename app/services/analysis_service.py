@@ -1,22 +1,48 @@
-from sqlalchemy.orm import Session
-from typing import Dict, Any
+from sqlalchemy.orm import Session, defer
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple, Type
+import hashlib
 import uuid
 from datetime import datetime
 from ..models.analysis import AnalysisJob
 from ..models.completion import CompletionDataset
 from ..schemas.analysis import AnalysisJobCreate
+from ..core.events import publish_event, TERMINAL_EVENTS
+from .dataset_service import DatasetService
+from .progress import ProgressTracker, JobCancelled, increment_progress_counter
+from .result_store import ResultStore
 from .metrics.entropy import calculate_input_entropy, calculate_response_entropy
 from .metrics.information_gain import calculate_mutual_information
 from .metrics.empowerment import calculate_output_diversity_metrics
 from .metrics.basic_metrics import calculate_character_metrics, calculate_token_metrics
+from .metrics.accumulators import MetricAccumulator, reduce_partition, finalize_results
+
+# Metric groups computed for an analysis job, in order; also the job's progress stages
+METRIC_STAGES = ["information_theory", "diversity", "character_metrics", "token_metrics", "summary"]
+# Progress stages of a sharded (map, reduce by partition, merge) analysis run
+SHARD_STAGES = ["planning", "shards", "reduce", "merge"]
+# Bump whenever a metric implementation changes its output, so stored results are not reused
+ENGINE_VERSION = "1"
+ACTIVE_STATUSES = ("pending", "running")
+# A running job asked to stop; it becomes "cancelled" at its next stage boundary
+CANCELLING = "cancelling"
 
 
 class AnalysisService:
     def __init__(self, db: Session):
         self.db = db
     
-    def create_analysis_job(self, job_data: AnalysisJobCreate) -> AnalysisJob:
-        """Create a new analysis job."""
+    def get_or_create_analysis_job(self, job_data: AnalysisJobCreate) -> Tuple[AnalysisJob, bool]:
+        """
+        Create an analysis job unless an equivalent one makes it unnecessary.
+
+        Jobs are keyed by analysis_cache_key. A request matching an in-flight job attaches to
+        it, or for another dataset gets a pending job linked to it that ends with its results;
+        one matching a completed job gets its stored results at once (as a completed job for
+        the requested dataset) unless job_data.force is set. Returns (job, created): only a
+        created job still has to be run.
+        """
         # Verify the completion dataset exists
         completion_dataset = self.db.query(CompletionDataset).filter(
             CompletionDataset.id == job_data.completion_dataset_id
@@ -24,77 +50,397 @@ class AnalysisService:
         
         if not completion_dataset:
             raise ValueError(f"Completion dataset {job_data.completion_dataset_id} not found")
+
+        cache_key = self.analysis_cache_key(completion_dataset)
+        if cache_key is not None:
+            existing = self._find_reusable_job(cache_key, include_completed=not job_data.force)
+            if existing is not None:
+                return self._reuse_job(existing, completion_dataset.id), False
         
         db_job = AnalysisJob(
             completion_dataset_id=job_data.completion_dataset_id,
-            status="pending"
+            status="pending",
+            priority=job_data.priority,
+            cache_key=cache_key
+        )
+        self.db.add(db_job)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # A concurrent duplicate created the in-flight job first; attach to it
+            self.db.rollback()
+            existing = self._find_reusable_job(cache_key, include_completed=False)
+            if existing is None:
+                raise
+            return existing, False
+        self.db.refresh(db_job)
+        return db_job, True
+
+    def analysis_cache_key(self, completion_dataset: CompletionDataset) -> Optional[str]:
+        """Identity of a job's inputs and computation; None if a content hash is missing."""
+        prompts_hash = completion_dataset.dataset.content_hash
+        completions_hash = completion_dataset.content_hash
+        if prompts_hash is None or completions_hash is None:
+            return None
+        parts = [prompts_hash, completions_hash, ",".join(METRIC_STAGES), ENGINE_VERSION]
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    def _find_reusable_job(self, cache_key: str, include_completed: bool) -> Optional[AnalysisJob]:
+        statuses = ACTIVE_STATUSES + ("completed",) if include_completed else ACTIVE_STATUSES
+        jobs = (
+            self.db.query(AnalysisJob)
+            .options(defer(AnalysisJob.results))
+            .filter(AnalysisJob.cache_key == cache_key, AnalysisJob.status.in_(statuses))
+            .all()
+        )
+        # Prefer an in-flight job, then the most recently completed one
+        active = [job for job in jobs if job.status in ACTIVE_STATUSES]
+        if active:
+            return active[0]
+        return max(jobs, key=lambda job: job.completed_at, default=None)
+
+    def _reuse_job(self, job: AnalysisJob, completion_dataset_id: uuid.UUID) -> AnalysisJob:
+        if job.completion_dataset_id == completion_dataset_id:
+            return self.hydrate_results(job)
+        if job.status in ACTIVE_STATUSES:
+            return self._link_job(job, completion_dataset_id)
+        # Identical content under another completion dataset: record a finished job for this one
+        db_job = AnalysisJob(
+            completion_dataset_id=completion_dataset_id,
+            status="completed",
+            priority=job.priority,
+            cache_key=job.cache_key,
+            results=job.results,  # blob references stay valid: blobs are content-addressed
+            completed_at=datetime.utcnow()
         )
         self.db.add(db_job)
         self.db.commit()
         self.db.refresh(db_job)
-        return db_job
-    
-    def get_analysis_job(self, job_id: uuid.UUID) -> AnalysisJob:
-        """Get an analysis job by ID."""
-        return self.db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+        return self.hydrate_results(db_job)
+
+    def _link_job(self, source: AnalysisJob, completion_dataset_id: uuid.UUID) -> AnalysisJob:
+        """
+        A pending job for completion_dataset_id that waits on the in-flight source job instead
+        of running; _settle_linked_jobs gives it the source's status and results when that
+        ends. It has no cache_key until then, since only one in-flight job may hold the key.
+        """
+        linked = (
+            self.db.query(AnalysisJob)
+            .filter(
+                AnalysisJob.source_job_id == source.id,
+                AnalysisJob.completion_dataset_id == completion_dataset_id,
+                AnalysisJob.status == "pending"
+            )
+            .first()
+        )
+        if linked is None:
+            linked = AnalysisJob(
+                completion_dataset_id=completion_dataset_id,
+                status="pending",
+                priority=source.priority,
+                source_job_id=source.id
+            )
+            self.db.add(linked)
+            self.db.commit()
+            # The source may have ended before the link was committed
+            source_status = self.db.query(AnalysisJob.status).filter(AnalysisJob.id == source.id).scalar()
+            if source_status in TERMINAL_EVENTS:
+                self._settle_linked_jobs(source.id)
+            self.db.refresh(linked)
+        return self.hydrate_results(linked)
+
+    def _settle_linked_jobs(self, source_id: uuid.UUID) -> None:
+        """End the jobs still waiting on a finished source job with its status and results."""
+        source = self.db.query(AnalysisJob).filter(AnalysisJob.id == source_id).first()
+        linked_ids = [
+            job_id for (job_id,) in self.db.query(AnalysisJob.id).filter(
+                AnalysisJob.source_job_id == source_id, AnalysisJob.status == "pending"
+            )
+        ]
+        if source is None or source.status not in TERMINAL_EVENTS or not linked_ids:
+            return
+        settled = [
+            job_id for job_id in linked_ids
+            if self._transition(
+                job_id, "pending", source.status,
+                results=source.results,  # blob references, as in _reuse_job
+                cache_key=source.cache_key if source.status == "completed" else None,
+                completed_at=datetime.utcnow()
+            )
+        ]
+        for job_id in settled:
+            publish_event("analysis", job_id, source.status, status=source.status)
+
+    def get_analysis_job(self, job_id: uuid.UUID, include_results: bool = True) -> AnalysisJob:
+        """
+        Get an analysis job by ID, with any results sections stored as blobs loaded back in.
+
+        Without include_results the results column is loaded lazily on access, as stored.
+        """
+        query = self.db.query(AnalysisJob)
+        if not include_results:
+            query = query.options(defer(AnalysisJob.results))
+        job = query.filter(AnalysisJob.id == job_id).first()
+        if job and include_results:
+            self.hydrate_results(job)
+        return job
+
+    def hydrate_results(self, job: AnalysisJob) -> AnalysisJob:
+        """Load a job's blob-stored results sections into job.results (see services/result_store.py)."""
+        # Set as the loaded value, so the hydrated sections are never written back inline
+        set_committed_value(job, "results", ResultStore(self.db).hydrate(job.results))
+        return job
     
     def update_job_status(self, job_id: uuid.UUID, status: str, results: Dict[str, Any] = None):
         """Update analysis job status and results."""
-        job = self.get_analysis_job(job_id)
+        job = self.get_analysis_job(job_id, include_results=False)
         if job:
+            # Packing commits the blobs first, so do it before touching the job
+            stored_results = ResultStore(self.db).pack(results) if results else None
             job.status = status
-            if results:
-                job.results = results
-            if status in ["completed", "failed"]:
+            if stored_results:
+                job.results = stored_results
+            if status in TERMINAL_EVENTS:
                 job.completed_at = datetime.utcnow()
             self.db.commit()
+            event = status if status in TERMINAL_EVENTS else "status"
+            publish_event("analysis", job_id, event, status=status)
+            if status in TERMINAL_EVENTS:
+                self._settle_linked_jobs(job_id)
+
+    def cancel_analysis_job(self, job_id: uuid.UUID) -> Optional[AnalysisJob]:
+        """
+        Ask a job to stop. A pending job is cancelled at once; a running one is marked
+        "cancelling" and stops at its next checkpoint, keeping the metric sections it finished.
+        Finished jobs are left unchanged.
+        """
+        if self._transition(job_id, "pending", "cancelled", completed_at=datetime.utcnow()):
+            publish_event("analysis", job_id, "cancelled", status="cancelled")
+            self._settle_linked_jobs(job_id)
+        elif self._transition(job_id, "running", CANCELLING):
+            publish_event("analysis", job_id, "status", status=CANCELLING)
+        return self.get_analysis_job(job_id, include_results=False)
+
+    def _transition(self, job_id: uuid.UUID, from_status: str, to_status: str, **values: Any) -> bool:
+        """Compare-and-set the status, so concurrent workers and cancels cannot overwrite each other."""
+        updated = (
+            self.db.query(AnalysisJob)
+            .filter(AnalysisJob.id == job_id, AnalysisJob.status == from_status)
+            .update({"status": to_status, **values}, synchronize_session=False)
+        )
+        self.db.commit()
+        return updated == 1
+
+    def _stop_requested(self, job_id: uuid.UUID) -> bool:
+        return self.db.query(AnalysisJob.status).filter(AnalysisJob.id == job_id).scalar() == CANCELLING
+
+    def _claim_job(self, job_id: uuid.UUID) -> bool:
+        """Move a pending job to running; False if it was cancelled or already picked up."""
+        if not self._transition(job_id, "pending", "running"):
+            return False
+        publish_event("analysis", job_id, "status", status="running")
+        return True
+
+    def _finish_incomplete(self, job_id: uuid.UUID, status: str, results: Dict[str, Any]) -> None:
+        """Persist the finished metric sections of an interrupted run as a cancelled/partial job."""
+        self.db.rollback()
+        missing = [stage for stage in METRIC_STAGES if stage not in results]
+        self.update_job_status(job_id, status, {**results, "missing_sections": missing})
     
-    def run_analysis(self, job_id: uuid.UUID) -> Dict[str, Any]:
-        """Run the complete analysis for a job."""
+    def run_analysis(self, job_id: uuid.UUID, deadline_errors: Tuple[Type[BaseException], ...] = ()) -> Dict[str, Any]:
+        """
+        Run the complete analysis for a job.
+
+        Stops with status "cancelled" when cancel_analysis_job is called. An exception in
+        deadline_errors (e.g. a soft time limit) stops it with status "partial". Either way the
+        metric sections finished so far are stored.
+        """
         job = self.get_analysis_job(job_id)
         if not job:
             raise ValueError(f"Analysis job {job_id} not found")
         
-        # Update status to running
-        self.update_job_status(job_id, "running")
+        # Update status to running; a cancelled or already started job is left alone
+        if not self._claim_job(job_id):
+            return self.get_analysis_job(job_id).results
+        progress = ProgressTracker("analysis", job_id, METRIC_STAGES, should_cancel=lambda: self._stop_requested(job_id))
+        results: Dict[str, Any] = {}
         
         try:
             # Get the completion dataset and related prompt dataset
-            completion_dataset = job.completion_dataset
-            prompt_dataset = completion_dataset.dataset
+            datasets = DatasetService(self.db)
+            completion_dataset = datasets.load_completion_datasets([job.completion_dataset_id])[0]
+            prompt_dataset = datasets.load_dataset(completion_dataset.dataset_id)
             
             # Run all analyses
-            results = self.compute_all_metrics(
+            self.compute_all_metrics(
                 prompt_dataset.prompts,
-                completion_dataset.completions
+                completion_dataset.completions,
+                on_stage=progress.start,
+                into=results
             )
             
             # Update job with results
+            progress.finish()
             self.update_job_status(job_id, "completed", results)
             return results
+
+        except JobCancelled:
+            progress.finish(success=False, message="Cancelled")
+            self._finish_incomplete(job_id, "cancelled", results)
+            return results
+
+        except deadline_errors:
+            progress.finish(success=False, message="Stopped at the time limit")
+            self._finish_incomplete(job_id, "partial", results)
+            return results
             
         except Exception as e:
             # Update job status to failed
+            progress.finish(success=False)
             error_results = {"error": str(e)}
             self.update_job_status(job_id, "failed", error_results)
             raise
     
-    def compute_all_metrics(self, prompts: Dict[str, str], completions: Dict[str, list]) -> Dict[str, Any]:
-        """Compute all available metrics for the given prompts and completions."""
-        results = {}
-        
-        # Information-theoretic metrics
-        results["information_theory"] = calculate_mutual_information(prompts, completions)
-        
-        # Output diversity metrics
-        results["diversity"] = calculate_output_diversity_metrics(prompts, completions)
-        
-        # Basic metrics
-        results["character_metrics"] = calculate_character_metrics(completions)
-        results["token_metrics"] = calculate_token_metrics(completions)
-        
-        # Summary statistics
-        results["summary"] = self._compute_summary_stats(prompts, completions)
+    def plan_analysis_shards(self, job_id: uuid.UUID, shard_size: int) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Start a sharded run: mark the job running and split its prompt_ids into ranges.
+
+        Each range is analysed by compute_shard, which splits its keyed counts into one
+        partition per shard; reduce_shard_partition combines one partition of every shard and
+        merge_shards the totals and partition sums, which gives the same results as
+        run_analysis. Returns [] if the job was cancelled or already started.
+        """
+        job = self.get_analysis_job(job_id, include_results=False)
+        if not job:
+            raise ValueError(f"Analysis job {job_id} not found")
+
+        if not self._claim_job(job_id):
+            return []
+        progress = ProgressTracker("analysis", job_id, SHARD_STAGES)
+        progress.start("planning")
+        try:
+            bounds = DatasetService(self.db).get_prompt_shard_bounds(job.completion_dataset.dataset_id, shard_size)
+        except Exception as e:
+            self.fail_analysis(job_id, e)
+            raise
+        progress.start("shards", message=f"0/{len(bounds)} shards")
+        return bounds
+
+    def compute_shard(
+        self, job_id: uuid.UUID, after: Optional[str], upto: Optional[str], partitions: int
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Partial metric state for prompt_ids in (after, upto]: the accumulator's totals and its
+        keyed counts split into `partitions` parts (see metrics/accumulators.py).
+        """
+        job = self.get_analysis_job(job_id, include_results=False)
+        if not job:
+            raise ValueError(f"Analysis job {job_id} not found")
+        # Checkpoint: shards still queued after a cancel return at once (failing the chord)
+        if job.status == CANCELLING:
+            raise JobCancelled(f"analysis {job_id} cancelled")
+
+        datasets = DatasetService(self.db)
+        prompts = datasets.get_prompt_range(job.completion_dataset.dataset_id, after, upto)
+        completions = datasets.get_completion_range(job.completion_dataset_id, after, upto)
+        accumulator = MetricAccumulator().add(prompts, completions)
+        return accumulator.totals(), accumulator.split(partitions)
+
+    def record_shard_done(self, job_id: uuid.UUID, total: int) -> None:
+        """Advance the shards stage; shards finish in any order on any worker."""
+        done = increment_progress_counter("analysis", job_id, "shards_done")
+        ProgressTracker.resume("analysis", job_id, SHARD_STAGES).step(done, total, f"{done}/{total} shards")
+
+    def start_reduce(self, job_id: uuid.UUID, partitions: int) -> bool:
+        """Enter the reduce stage once every shard is done; False if the job is being cancelled."""
+        progress = ProgressTracker.resume("analysis", job_id, SHARD_STAGES)
+        progress.should_cancel = lambda: self._stop_requested(job_id)
+        try:
+            progress.start("reduce", message=f"0/{partitions} partitions")
+        except JobCancelled:
+            self.fail_analysis(job_id, "cancelled", progress)
+            return False
+        return True
+
+    def reduce_shard_partition(self, job_id: uuid.UUID, parts: Iterable[Dict[str, Any]], total: int) -> Dict[str, Any]:
+        """Sums of one partition over every shard (reduce_partition); advances the reduce stage."""
+        reduced = reduce_partition(parts)
+        done = increment_progress_counter("analysis", job_id, "partitions_done")
+        ProgressTracker.resume("analysis", job_id, SHARD_STAGES).step(done, total, f"{done}/{total} partitions")
+        return reduced
+
+    def merge_shards(
+        self, job_id: uuid.UUID, totals: Iterable[Dict[str, Any]], reduced: Iterable[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Finalize the metrics from the shard totals and partition sums and complete the job."""
+        progress = ProgressTracker.resume("analysis", job_id, SHARD_STAGES)
+        progress.should_cancel = lambda: self._stop_requested(job_id)
+        try:
+            progress.start("merge")
+        except JobCancelled:
+            self.fail_analysis(job_id, "cancelled", progress)
+            return {}
+        try:
+            totals = list(totals)
+            # Prompt ids with an empty completion list have no completion rows to read in a
+            # shard; the dataset's own count of its prompt ids covers them
+            key_count = self.get_analysis_job(job_id, include_results=False).completion_dataset.prompt_count
+            if key_count is not None and totals:
+                totals = [{**t, "completion_key_count": 0} for t in totals]
+                totals[0]["completion_key_count"] = key_count
+            results = finalize_results(totals, reduced)
+        except Exception as e:
+            self.fail_analysis(job_id, e, progress)
+            raise
+        progress.finish()
+        self.update_job_status(job_id, "completed", results)
+        return results
+
+    def fail_analysis(self, job_id: uuid.UUID, error: Any, progress: Optional[ProgressTracker] = None) -> None:
+        """
+        Mark a sharded job failed, e.g. when one of its shard tasks gave up; a job that was
+        being cancelled becomes "cancelled" instead. Shard results cannot be finalized
+        separately, so nothing partial is kept.
+        """
+        if progress is None:
+            progress = ProgressTracker.resume("analysis", job_id, SHARD_STAGES)
+        if self._stop_requested(job_id):
+            progress.finish(success=False, message="Cancelled")
+            self.update_job_status(job_id, "cancelled")
+            return
+        progress.finish(success=False)
+        self.update_job_status(job_id, "failed", {"error": str(error)})
+
+    def compute_all_metrics(
+        self,
+        prompts: Dict[str, str],
+        completions: Dict[str, list],
+        on_stage: Optional[Callable[[str], None]] = None,
+        into: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Compute all available metrics for the given prompts and completions.
+
+        on_stage(stage) is called as each metric group (see METRIC_STAGES) starts. Groups are
+        stored in `into` (when given) as they finish, so an interrupted caller keeps them.
+        """
+        stages = {
+            # Information-theoretic metrics
+            "information_theory": lambda: calculate_mutual_information(prompts, completions),
+            # Output diversity metrics
+            "diversity": lambda: calculate_output_diversity_metrics(prompts, completions),
+            # Basic metrics
+            "character_metrics": lambda: calculate_character_metrics(completions),
+            "token_metrics": lambda: calculate_token_metrics(completions),
+            # Summary statistics
+            "summary": lambda: self._compute_summary_stats(prompts, completions),
+        }
+
+        results = into if into is not None else {}
+        for stage in METRIC_STAGES:
+            if on_stage:
+                on_stage(stage)
+            results[stage] = stages[stage]()
         
         return results
     
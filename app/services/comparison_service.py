@@ -1,15 +1,43 @@
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from sqlalchemy import and_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, defer
+from typing import List, Dict, Any, Optional, Set, Tuple, Type
 import uuid
-import asyncio
-import time
 from datetime import datetime
+import numpy as np
 from ..models.dataset import Dataset
 from ..models.completion import CompletionDataset
 from ..models.comparison import Comparison
+from ..models.comparison_alignment import ComparisonAlignmentRow
+from ..models.comparison_metric import ComparisonMetric
 from ..schemas.comparison import ComparisonCreate
-from .metrics.statistical_tests import run_statistical_tests, calculate_summary_statistics
+from .metrics.statistical_tests import run_statistical_tests, calculate_summary_statistics, calculate_dataset_metrics
+from .metrics.paired_tests import run_paired_tests
+from .metrics.overlap import calculate_overlap
+from .metrics.sampling import sample_prompts, add_mean_intervals, PREVIEW_SAMPLE_SIZE
+from .metrics.pairwise import add_corrected_p_values, pairwise_matrices, CORRECTIONS, DEFAULT_CORRECTION
+from .insights import generate_insights
 from .metrics.basic_metrics import calculate_character_metrics, calculate_token_metrics
+from .pagination import apply_keyset, encode_sort_cursor, decode_sort_cursor
+from .alignment import (
+    compute_alignment, aligned_row, row_stats, alignment_summary, index_entries, length_moments, moments_drifted,
+    ALIGNMENT_INDEX_VERSION, ALIGNMENT_PREVIEW_ROWS, ALIGNMENT_Z_DRIFT_TOLERANCE,
+)
+from .dataset_service import DatasetService
+from .dataset_cache import dataset_cache
+from ..core.events import publish_event, TERMINAL_EVENTS
+from .progress import ProgressTracker, JobCancelled
+
+# Stages reported while a comparison runs, in order
+COMPARISON_STAGES = ["loading", "statistical_analysis", "overlap", "insights", "visualization"]
+# Result sections written by a run, in the order they are computed
+RESULT_SECTIONS = ["metrics", "pairwise", "overlap", "insights", "insight_details", "summary_statistics"]
+# A running comparison asked to stop; it becomes "cancelled" at its next stage boundary
+CANCELLING = "cancelling"
+ALIGNMENT_INSERT_BATCH = 10_000
+# /rows sort options -> comparison_alignment_rows column (sorted descending)
+ROW_SORT_COLUMNS = {"z": "max_abs_z", "len_diff": "len_diff"}
 
 
 class ComparisonService:
@@ -17,17 +45,14 @@ class ComparisonService:
         self.db = db
 
     def create_comparison(self, payload: ComparisonCreate) -> Comparison:
+        datasets = DatasetService(self.db)
         # Validate base dataset
-        dataset: Dataset | None = self.db.query(Dataset).filter(Dataset.id == payload.dataset_id).first()
+        dataset: Dataset | None = datasets.load_dataset(payload.dataset_id)
         if not dataset:
             raise ValueError(f"Dataset {payload.dataset_id} not found")
 
         # Validate completion datasets
-        completions: List[CompletionDataset] = (
-            self.db.query(CompletionDataset)
-            .filter(CompletionDataset.id.in_(payload.completion_dataset_ids))
-            .all()
-        )
+        completions: List[CompletionDataset] = datasets.load_completion_datasets(payload.completion_dataset_ids)
         if len(completions) != len(set(payload.completion_dataset_ids)):
             found_ids = {str(o.id) for o in completions}
             missing = [str(i) for i in payload.completion_dataset_ids if str(i) not in found_ids]
@@ -38,10 +63,13 @@ class ComparisonService:
             if o.dataset_id != payload.dataset_id:
                 raise ValueError("All completion datasets must belong to the specified dataset")
 
-        # Alignment result per Feature 1 spec
-        alignment_result = self._compute_alignment_result(dataset.prompts, completions)
+        # Alignment result per Feature 1 spec, in the order the datasets were given
+        by_id = {o.id: o for o in completions}
+        completions = [by_id[i] for i in payload.completion_dataset_ids]
+        alignment_result, alignment_index = compute_alignment(dataset.prompts, completions)
 
         comp = Comparison(
+            id=uuid.uuid4(),
             name=payload.name,
             datasets=[str(payload.dataset_id)] + [str(i) for i in payload.completion_dataset_ids],
             alignment_key=payload.alignment_key,
@@ -49,194 +77,641 @@ class ComparisonService:
             statistical_results={"alignment": alignment_result},
             automated_insights=[],
             status="pending",
+            dataset_versions=self._current_versions(dataset, completions),
         )
         self.db.add(comp)
+        self.db.flush()
+        self._store_alignment_index(comp.id, alignment_index)
         self.db.commit()
         self.db.refresh(comp)
         return comp
 
-    def run_comparison_analysis(self, comparison_id: uuid.UUID) -> Comparison:
-        """Run the statistical analysis for a comparison."""
+    def run_comparison_analysis(
+        self,
+        comparison_id: uuid.UUID,
+        rerun: bool = False,
+        transient_errors: Tuple[Type[BaseException], ...] = (),
+        deadline_errors: Tuple[Type[BaseException], ...] = (),
+        task_id: Optional[str] = None
+    ) -> Comparison:
+        """
+        Run the statistical analysis for a comparison.
+
+        Stage progress goes to the progress store (see services/progress.py); the comparison
+        row itself is only written when the run starts, after a preview and when it finishes.
+
+        rerun also restarts a comparison left running/failed by an earlier attempt (task
+        retries). task_id is recorded as the run's owner: the same task id, redelivered after
+        its worker died, takes over the "running" comparison it left behind. Exceptions in transient_errors propagate without marking the comparison
+        failed, so the caller can retry it. A cancel_comparison call stops the run with status
+        "cancelled", and an exception in deadline_errors (e.g. a soft time limit) with status
+        "partial"; both keep the result sections finished so far.
+
+        When member datasets were appended to since the stored results (see
+        refresh_comparison), only the alignment rows they affect are re-indexed and only the
+        tests of pairs involving a changed dataset are rerun.
+
+        With comparison_config["preview_sample"] (a number of prompts, or true for
+        PREVIEW_SAMPLE_SIZE) a first run also stores statistical_results["preview"], computed
+        on a stratified sample of the prompts, and publishes a "preview" event before
+        computing the exact results.
+        """
         comp = self.get_comparison(comparison_id)
         if not comp:
             raise ValueError(f"Comparison {comparison_id} not found")
-        
-        if comp.status != "pending":
+
+        if comp.status == CANCELLING:
+            # Cancelled while a retry of an interrupted attempt was queued
+            if self._transition(comparison_id, (CANCELLING,), "cancelled"):
+                publish_event("comparison", comparison_id, "cancelled", status="cancelled")
             return comp
         
-        # Update status to running
-        comp.status = "running"
-        updated_results = dict(comp.statistical_results)
-        updated_results["progress"] = {"step": "statistical_analysis", "message": "Computing statistical metrics..."}
-        comp.statistical_results = updated_results
-        self.db.commit()
+        # Update status to running; compare-and-set so a concurrent cancel is not overwritten
+        allowed = ("pending", "running", "failed") if rerun else ("pending",)
+        started = self._transition(comparison_id, allowed, "running", run_task_id=task_id)
+        if not started and task_id is not None:
+            started = self._transition(comparison_id, ("running",), "running", owner=task_id)
+        if not started:
+            return comp
+        publish_event("comparison", comparison_id, "status", status="running")
+        config = comp.comparison_config or {}
+        previous_metrics = comp.statistical_results.get("metrics")
+        # Refreshes are incremental already; only a first run gets a preview
+        preview_size = self._preview_size(config) if previous_metrics is None else None
+        progress = ProgressTracker(
+            "comparison", comparison_id,
+            ["preview"] + COMPARISON_STAGES if preview_size else COMPARISON_STAGES,
+            should_cancel=lambda: self._stop_requested(comparison_id)
+        )
+        sections: Dict[str, Any] = {}
         
         try:
-            # Get the datasets
+            if preview_size:
+                # Before loading the datasets: the sample is drawn from the alignment index
+                progress.start("preview", "Computing a preview on a sample of the prompts...")
+                preview = self._run_preview(comp, config, preview_size, seed=comparison_id.int)
+                comp.statistical_results = {**comp.statistical_results, "preview": preview}
+                self.db.commit()
+                publish_event(
+                    "comparison", comparison_id, "preview", status="running",
+                    sample_size=preview["sample_size"], population=preview["population"]
+                )
+
+            progress.start("loading", "Loading datasets...")
             dataset_id = uuid.UUID(comp.datasets[0])
-            completion_dataset_ids = [uuid.UUID(id_str) for id_str in comp.datasets[1:]]
-            
-            dataset = self.db.query(Dataset).filter(Dataset.id == dataset_id).first()
-            completions = (
-                self.db.query(CompletionDataset)
-                .filter(CompletionDataset.id.in_(completion_dataset_ids))
-                .all()
-            )
-            
-            # Simulate realistic analysis timing with progress updates
-            time.sleep(1)
-            
-            # Update progress: insights generation
-            updated_results = dict(comp.statistical_results)
-            updated_results["progress"] = {"step": "insights", "message": "Generating automated insights..."}
-            comp.statistical_results = updated_results
-            self.db.commit()
-            
-            time.sleep(1)
-            
-            # Update progress: visualization prep
-            updated_results = dict(comp.statistical_results)
-            updated_results["progress"] = {"step": "visualization", "message": "Preparing visualizations..."}
-            comp.statistical_results = updated_results
-            self.db.commit()
-            
-            time.sleep(1)
+            dataset = DatasetService(self.db).load_dataset(dataset_id)
+            completions = self._load_comparison_completions(comp)
+
+            # Datasets appended to since the stored alignment and results were computed
+            current_versions = self._current_versions(dataset, completions)
+            recorded_versions = comp.dataset_versions or {}
+            changed_ids = {i for i, v in current_versions.items() if v != recorded_versions.get(i, 1)}
+            if changed_ids:
+                self._refresh_alignment_index(comp, dataset, completions, changed_ids)
             
             # Run statistical analysis
             alignment_result = comp.statistical_results.get("alignment", {})
-            statistical_results = self._run_comparison_analysis(dataset, completions, alignment_result)
+            statistical_results = self._run_comparison_analysis(
+                dataset, completions, alignment_result, progress, into=sections,
+                config=config,
+                previous_metrics=previous_metrics,
+                changed={o.name for o in completions if str(o.id) in changed_ids}
+            )
             
             # Create a new dict to ensure SQLAlchemy detects the change
             updated_results = dict(comp.statistical_results)
+            updated_results.pop("progress", None)  # written by older versions
+            updated_results.pop("missing_sections", None)
+            updated_results.pop("error", None)
+            updated_results.pop("preview", None)  # superseded by the exact results
             updated_results.update(statistical_results)
             comp.statistical_results = updated_results
             comp.automated_insights = statistical_results.get("insights", [])
+            comp.dataset_versions = current_versions
             comp.status = "completed"
+            self._store_metric_rows(comparison_id, statistical_results["metrics"])
             self.db.commit()
+            progress.finish()
+            publish_event("comparison", comparison_id, "completed", status="completed")
             
+        except JobCancelled:
+            progress.finish(success=False, message="Cancelled")
+            return self._finish_incomplete(comparison_id, "cancelled", sections)
+        except deadline_errors:
+            progress.finish(success=False, message="Stopped at the time limit")
+            return self._finish_incomplete(comparison_id, "partial", sections)
+        except transient_errors:
+            self.db.rollback()
+            raise
         except Exception as e:
-            comp.status = "failed"
-            # Create a new dict to ensure SQLAlchemy detects the change
-            updated_results = dict(comp.statistical_results)
-            updated_results["error"] = str(e)
-            comp.statistical_results = updated_results
-            self.db.commit()
+            self.db.rollback()
+            progress.finish(success=False)
+            self.mark_comparison_failed(comparison_id, str(e))
             raise
         
         return comp
 
-    def list_comparisons(self, skip: int = 0, limit: int = 100) -> List[Comparison]:
-        return (
-            self.db.query(Comparison)
-            .order_by(Comparison.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+    def cancel_comparison(self, comparison_id: uuid.UUID) -> Optional[Comparison]:
+        """
+        Ask a comparison to stop. A pending one is cancelled at once; a running one is marked
+        "cancelling" and stops at its next stage boundary. Finished comparisons are unchanged.
+        """
+        if self._transition(comparison_id, ("pending",), "cancelled"):
+            publish_event("comparison", comparison_id, "cancelled", status="cancelled")
+        elif self._transition(comparison_id, ("running",), CANCELLING):
+            publish_event("comparison", comparison_id, "status", status=CANCELLING)
+        return self.get_comparison(comparison_id, include_results=False)
+
+    def stale_datasets(self, comp: Comparison) -> List[str]:
+        """Ids of the comparison's datasets appended to since its results were computed."""
+        recorded = comp.dataset_versions or {}
+        current = DatasetService(self.db).get_versions([uuid.UUID(i) for i in comp.datasets])
+        return [i for i in comp.datasets if i in current and current[i] != recorded.get(i, 1)]
+
+    def refresh_comparison(self, comparison_id: uuid.UUID) -> Tuple[Optional[Comparison], List[str]]:
+        """
+        Queue a finished comparison to be rerun against the current versions of its datasets.
 
-    def get_comparison(self, comparison_id: uuid.UUID) -> Comparison | None:
-        return self.db.query(Comparison).filter(Comparison.id == comparison_id).first()
+        Returns (comparison, stale dataset ids). Nothing is queued when no dataset changed or
+        the comparison has not finished; the caller dispatches the run otherwise.
+        """
+        comp = self.get_comparison(comparison_id, include_results=False)
+        if not comp or comp.status not in TERMINAL_EVENTS:
+            return comp, []
+        stale = self.stale_datasets(comp)
+        if stale and self._transition(comparison_id, TERMINAL_EVENTS, "pending"):
+            publish_event("comparison", comparison_id, "status", status="pending")
+            self.db.refresh(comp)
+        return comp, stale
+
+    def _transition(
+        self, comparison_id: uuid.UUID, from_statuses: Tuple[str, ...], to_status: str,
+        owner: Optional[str] = None, **values: Any
+    ) -> bool:
+        """Compare-and-set the status; with owner, only while that task owns the run."""
+        query = self.db.query(Comparison).filter(Comparison.id == comparison_id, Comparison.status.in_(from_statuses))
+        if owner is not None:
+            query = query.filter(Comparison.run_task_id == owner)
+        updated = query.update({"status": to_status, **values}, synchronize_session=False)
+        self.db.commit()
+        return updated == 1
+
+    def _stop_requested(self, comparison_id: uuid.UUID) -> bool:
+        return self.db.query(Comparison.status).filter(Comparison.id == comparison_id).scalar() == CANCELLING
+
+    def _finish_incomplete(self, comparison_id: uuid.UUID, status: str, sections: Dict[str, Any]) -> Comparison:
+        """Store the finished result sections of an interrupted run as a cancelled/partial comparison."""
+        self.db.rollback()
+        comp = self.get_comparison(comparison_id)
+        # Create a new dict to ensure SQLAlchemy detects the change
+        updated_results = dict(comp.statistical_results or {})
+        updated_results.pop("progress", None)  # written by older versions
+        updated_results.update(sections)
+        updated_results["missing_sections"] = [s for s in RESULT_SECTIONS if s not in sections]
+        comp.statistical_results = updated_results
+        comp.automated_insights = sections.get("insights", [])
+        comp.status = status
+        if "metrics" in sections:
+            self._store_metric_rows(comparison_id, sections["metrics"])
+        self.db.commit()
+        publish_event("comparison", comparison_id, status, status=status)
+        return comp
+
+    def mark_comparison_failed(self, comparison_id: uuid.UUID, error: str) -> None:
+        """Record a failed run and notify subscribers."""
+        comp = self.get_comparison(comparison_id)
+        if not comp:
+            return
+        comp.status = "failed"
+        # Create a new dict to ensure SQLAlchemy detects the change
+        updated_results = dict(comp.statistical_results or {})
+        updated_results["error"] = error
+        comp.statistical_results = updated_results
+        self.db.commit()
+        publish_event("comparison", comparison_id, "failed", status="failed", error=error)
+
+    def mark_comparison_interrupted(self, comparison_id: uuid.UUID, error: str) -> None:
+        """
+        Settle a comparison whose run was killed before its own failure handling could run
+        (e.g. at a hard time limit): "running" becomes failed, "cancelling" cancelled.
+        Comparisons that already finished are left unchanged.
+        """
+        if self._transition(comparison_id, (CANCELLING,), "cancelled"):
+            publish_event("comparison", comparison_id, "cancelled", status="cancelled")
+        elif self._transition(comparison_id, ("running",), "failed"):
+            self.mark_comparison_failed(comparison_id, error)
+
+    def list_comparisons(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Comparison]:
+        return apply_keyset(self.db.query(Comparison), Comparison, cursor, limit).offset(skip).all()
+
+    def get_comparison(self, comparison_id: uuid.UUID, include_results: bool = True) -> Comparison | None:
+        """Without include_results the results/insights blobs are loaded lazily on access."""
+        query = self.db.query(Comparison)
+        if not include_results:
+            query = query.options(defer(Comparison.statistical_results), defer(Comparison.automated_insights))
+        return query.filter(Comparison.id == comparison_id).first()
 
     def delete_comparison(self, comparison_id: uuid.UUID) -> bool:
         comp = self.get_comparison(comparison_id)
         if not comp:
             return False
+        self.db.query(ComparisonAlignmentRow).filter(ComparisonAlignmentRow.comparison_id == comparison_id).delete(
+            synchronize_session=False
+        )
+        self.db.query(ComparisonMetric).filter(ComparisonMetric.comparison_id == comparison_id).delete(
+            synchronize_session=False
+        )
         self.db.delete(comp)
         self.db.commit()
         return True
 
-    def _compute_alignment_result(self, prompts: Dict[str, str], completions: List[CompletionDataset]) -> Dict[str, Any]:
-        input_keys = set(prompts.keys())
-        matched_intersection = input_keys.copy()
+    def get_alignment_rows(
+        self,
+        comp: Comparison,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        match: Optional[str] = None,
+        q: Optional[str] = None,
+        min_z: Optional[float] = None,
+        min_len_diff: Optional[float] = None,
+        sort: str = "prompt_id"
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Page through a comparison's aligned rows, filtered and sorted in the database.
 
-        # Build quick maps for completions by dataset
-        outputs_by_dataset: Dict[str, Dict[str, List[str]]] = {}
-        dataset_name_by_id: Dict[str, str] = {}
-        for o in completions:
-            ds_id = str(o.id)
-            outputs_by_dataset[ds_id] = o.completions or {}
-            dataset_name_by_id[ds_id] = o.name
-            matched_intersection &= set((o.completions or {}).keys())
+        match="matched" keeps prompts with completions in every dataset, "unmatched" the rest;
+        q is a case-insensitive substring of the prompt text; min_z keeps outliers (some
+        dataset's length z-score at least min_z in magnitude); min_len_diff keeps rows whose
+        first two datasets differ by at least that many characters. sort is "prompt_id", or
+        "z"/"len_diff" (largest first; rows without a length difference are left out).
+        Only the page's rows are read; outputs come from the (cached) dataset payloads.
+        Returns (rows, next_cursor).
+        """
+        self._ensure_alignment_index(comp)
+        row = ComparisonAlignmentRow
+        full_mask = (1 << (len(comp.datasets) - 1)) - 1
+        query = self.db.query(row.prompt_id, row.prompt_text, row.max_abs_z, row.len_diff, row.stats).filter(
+            row.comparison_id == comp.id
+        )
+        if match == "matched":
+            query = query.filter(row.presence == full_mask)
+        elif match == "unmatched":
+            query = query.filter(row.presence != full_mask)
+        if q:
+            escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = query.filter(row.prompt_text.ilike(f"%{escaped}%", escape="\\"))
+        if min_z is not None:
+            query = query.filter(row.max_abs_z >= min_z)
+        if min_len_diff is not None:
+            query = query.filter(row.len_diff >= min_len_diff)
 
-        total_inputs = len(input_keys)
-        matched_inputs = len(matched_intersection)
-        coverage = (matched_inputs / total_inputs * 100.0) if total_inputs else 0.0
+        sort_column = ROW_SORT_COLUMNS.get(sort)
+        if sort_column is None:
+            if cursor is not None:
+                query = query.filter(row.prompt_id > cursor)
+            query = query.order_by(row.prompt_id)
+        else:
+            column = getattr(row, sort_column)
+            query = query.filter(column.isnot(None))
+            if cursor is not None:
+                value, prompt_id = decode_sort_cursor(cursor)
+                query = query.filter(or_(column < value, and_(column == value, row.prompt_id > prompt_id)))
+            query = query.order_by(column.desc(), row.prompt_id)
+        # Fetch one extra row to learn whether another page exists
+        entries = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(entries) > limit:
+            last = entries[limit - 1]
+            next_cursor = last.prompt_id if sort_column is None else encode_sort_cursor(
+                getattr(last, sort_column), last.prompt_id
+            )
 
-        # Unmatched prompts: those missing in any selected dataset (union of differences)
-        unmatched_union = set()
-        for o in completions:
-            keys = set((o.completions or {}).keys())
-            unmatched_union |= (input_keys - keys)
-
-        # Construct aligned rows for matched intersection (cap to 200 rows to keep payload small)
-        aligned_rows = []
-        for prompt_id in list(matched_intersection)[:200]:
-            row_outputs: Dict[str, Any] = {}
-            row_meta: Dict[str, Any] = {}
-            for ds_id, ds_outputs in outputs_by_dataset.items():
-                name = dataset_name_by_id.get(ds_id, ds_id)
-                row_outputs[name] = ds_outputs.get(prompt_id, None)
-                row_meta[name] = {}
-            aligned_rows.append({
-                "inputId": prompt_id,
-                "inputText": prompts.get(prompt_id, ""),
-                "completions": row_outputs,
-                "metadata": row_meta,
-            })
+        entries = entries[:limit]
+        if not entries:
+            return [], next_cursor
+        completions = self._load_comparison_completions(comp)
+        names = [o.name for o in completions]
+        rows = []
+        for entry in entries:
+            aligned = aligned_row(entry.prompt_id, entry.prompt_text or "", completions)
+            aligned["stats"] = row_stats(entry.stats, entry.max_abs_z, entry.len_diff, names)
+            rows.append(aligned)
+        return rows, next_cursor
 
-        return {
-            "alignedRows": aligned_rows,
-            "unmatchedInputs": sorted(list(unmatched_union)),
-            "coverageStats": {
-                "totalInputs": total_inputs,
-                "matchedInputs": matched_inputs,
-                "coveragePercentage": round(coverage, 2),
-            },
-        }
+    def query_metrics(
+        self,
+        metric_name: Optional[str] = None,
+        max_p: Optional[float] = None,
+        max_q: Optional[float] = None,
+        correction: str = DEFAULT_CORRECTION,
+        min_abs_effect: Optional[float] = None,
+        dataset: Optional[str] = None,
+        comparison_id: Optional[uuid.UUID] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[Tuple[ComparisonMetric, str]], Optional[str]]:
+        """
+        Test rows of every comparison from comparison_metrics, smallest p-value first.
+
+        max_q filters on the q-value of `correction` ("holm" or "bh"); dataset matches either
+        side of the pair by completion dataset name. Returns ([(row, comparison name)], next_cursor).
+        """
+        metric = ComparisonMetric
+        query = (
+            self.db.query(metric, Comparison.name)
+            .join(Comparison, Comparison.id == metric.comparison_id)
+            .filter(metric.statistical_significance.isnot(None))
+        )
+        if metric_name is not None:
+            query = query.filter(metric.metric_name == metric_name)
+        if max_p is not None:
+            query = query.filter(metric.statistical_significance <= max_p)
+        if max_q is not None:
+            query = query.filter(getattr(metric, CORRECTIONS.get(correction, CORRECTIONS[DEFAULT_CORRECTION])) <= max_q)
+        if min_abs_effect is not None:
+            query = query.filter(or_(metric.effect_size >= min_abs_effect, metric.effect_size <= -min_abs_effect))
+        if dataset is not None:
+            query = query.filter(or_(metric.dataset_a == dataset, metric.dataset_b == dataset))
+        if comparison_id is not None:
+            query = query.filter(metric.comparison_id == comparison_id)
+        if cursor is not None:
+            value, key = decode_sort_cursor(cursor)
+            try:
+                row_id = uuid.UUID(key)
+            except ValueError:
+                raise ValueError("Invalid pagination cursor")
+            query = query.filter(or_(
+                metric.statistical_significance > value,
+                and_(metric.statistical_significance == value, metric.id > row_id)
+            ))
+        # Fetch one extra row to learn whether another page exists
+        rows = query.order_by(metric.statistical_significance, metric.id).limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1][0]
+            next_cursor = encode_sort_cursor(last.statistical_significance, str(last.id))
+        return rows[:limit], next_cursor
+
+    def _store_metric_rows(self, comparison_id: uuid.UUID, metrics: List[Dict[str, Any]]) -> None:
+        """Replace the comparison's comparison_metrics rows with its test rows in one bulk insert; does not commit."""
+        self.db.query(ComparisonMetric).filter(ComparisonMetric.comparison_id == comparison_id).delete(
+            synchronize_session=False
+        )
+        if not metrics:
+            return
+        self.db.execute(ComparisonMetric.__table__.insert(), [
+            {
+                "id": uuid.uuid4(),
+                "comparison_id": comparison_id,
+                "metric_name": m["name"],
+                "dataset_a": m.get("dataset_a"),
+                "dataset_b": m.get("dataset_b"),
+                "dataset_a_value": m.get("dataset_a_value"),
+                "dataset_b_value": m.get("dataset_b_value"),
+                "statistical_significance": m.get("statistical_significance"),
+                "q_value_holm": m.get("q_value_holm"),
+                "q_value_bh": m.get("q_value_bh"),
+                "effect_size": m.get("effect_size"),
+                "confidence_interval_lower": m.get("confidence_interval_lower"),
+                "confidence_interval_upper": m.get("confidence_interval_upper"),
+            }
+            for m in metrics
+        ])
+
+    def _load_comparison_completions(self, comp: Comparison) -> List[CompletionDataset]:
+        """The comparison's completion datasets with their payloads, in the comparison's order."""
+        completion_ids = [uuid.UUID(id_str) for id_str in comp.datasets[1:]]
+        by_id = {o.id: o for o in DatasetService(self.db).load_completion_datasets(completion_ids)}
+        return [by_id[i] for i in completion_ids]
+
+    def _ensure_alignment_index(self, comp: Comparison) -> None:
+        """(Re)build the index of comparisons created before the current alignment index version."""
+        alignment = (comp.statistical_results or {}).get("alignment", {})
+        if alignment.get("indexVersion") == ALIGNMENT_INDEX_VERSION:
+            return
+        dataset = DatasetService(self.db).load_dataset(uuid.UUID(comp.datasets[0]))
+        alignment, index = compute_alignment(dataset.prompts, self._load_comparison_completions(comp))
+        self.db.query(ComparisonAlignmentRow).filter(ComparisonAlignmentRow.comparison_id == comp.id).delete(
+            synchronize_session=False
+        )
+        self._store_alignment_index(comp.id, index)
+        comp.statistical_results = {**(comp.statistical_results or {}), "alignment": alignment}
+        self.db.commit()
+
+    def _refresh_alignment_index(
+        self, comp: Comparison, dataset: Dataset, completions: List[CompletionDataset], changed_ids: Set[str]
+    ) -> None:
+        """
+        Bring the alignment index up to date after member datasets were appended to.
+
+        Appends only add prompts and completions, so only the rows of new prompts and the rows
+        that gained completions in a changed dataset are re-indexed, with z-scores against the
+        stored length moments. Every row is rebuilt when the moments drifted by more than
+        ALIGNMENT_Z_DRIFT_TOLERANCE or the index predates them. Does not commit.
+        """
+        row = ComparisonAlignmentRow
+        alignment = (comp.statistical_results or {}).get("alignment", {})
+        reference = alignment.get("lengthMoments")
+        if (
+            alignment.get("indexVersion") != ALIGNMENT_INDEX_VERSION
+            or reference is None
+            or moments_drifted(reference, length_moments(sorted(dataset.prompts), completions), ALIGNMENT_Z_DRIFT_TOLERANCE)
+        ):
+            alignment, index = compute_alignment(dataset.prompts, completions)
+            self.db.query(row).filter(row.comparison_id == comp.id).delete(synchronize_session=False)
+            self._store_alignment_index(comp.id, index)
+            comp.statistical_results = {**(comp.statistical_results or {}), "alignment": alignment}
+            return
+
+        delta: Set[str] = set()
+        indexed = self.db.query(row.prompt_id).filter(row.comparison_id == comp.id)
+        if str(dataset.id) in changed_ids:
+            delta.update(set(dataset.prompts) - {prompt_id for (prompt_id,) in indexed})
+        for bit, o in enumerate(completions):
+            if str(o.id) in changed_ids:
+                outputs = o.completions or {}
+                lacking = indexed.filter(row.presence.op("&")(1 << bit) == 0)
+                delta.update(prompt_id for (prompt_id,) in lacking if prompt_id in outputs)
+
+        delta_ids = sorted(delta)
+        for start in range(0, len(delta_ids), ALIGNMENT_INSERT_BATCH):
+            self.db.query(row).filter(
+                row.comparison_id == comp.id, row.prompt_id.in_(delta_ids[start:start + ALIGNMENT_INSERT_BATCH])
+            ).delete(synchronize_session=False)
+        self._store_alignment_index(comp.id, index_entries(dataset.prompts, delta_ids, completions, reference))
+
+        full_mask = (1 << len(completions)) - 1
+        matched = indexed.filter(row.presence == full_mask)
+        preview_rows = [
+            aligned_row(prompt_id, dataset.prompts[prompt_id], completions)
+            for (prompt_id,) in matched.order_by(row.prompt_id).limit(ALIGNMENT_PREVIEW_ROWS)
+        ]
+        unmatched_preview = [
+            prompt_id for (prompt_id,) in
+            indexed.filter(row.presence != full_mask).order_by(row.prompt_id).limit(ALIGNMENT_PREVIEW_ROWS)
+        ]
+        alignment = alignment_summary(preview_rows, unmatched_preview, len(dataset.prompts), matched.count(), reference)
+        comp.statistical_results = {**(comp.statistical_results or {}), "alignment": alignment}
+
+    @staticmethod
+    def _current_versions(dataset: Dataset, completions: List[CompletionDataset]) -> Dict[str, int]:
+        return {str(dataset.id): dataset.version or 1, **{str(o.id): o.version or 1 for o in completions}}
+
+    def _store_alignment_index(self, comparison_id: uuid.UUID, index: List[Dict[str, Any]]) -> None:
+        # Rows a concurrent (re)build of the same index already stored are identical; keep them
+        insert = pg_insert if self.db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        stmt = insert(ComparisonAlignmentRow.__table__).on_conflict_do_nothing()
+        for start in range(0, len(index), ALIGNMENT_INSERT_BATCH):
+            self.db.execute(stmt, [
+                {"comparison_id": comparison_id, **entry}
+                for entry in index[start:start + ALIGNMENT_INSERT_BATCH]
+            ])
     
-    def _run_comparison_analysis(self, dataset: Dataset, completions: List[CompletionDataset], alignment_result: Dict[str, Any]) -> Dict[str, Any]:
-        """Run statistical analysis comparing multiple completion datasets."""
+    def _run_comparison_analysis(
+        self,
+        dataset: Dataset,
+        completions: List[CompletionDataset],
+        alignment_result: Dict[str, Any],
+        progress: Optional[ProgressTracker] = None,
+        into: Optional[Dict[str, Any]] = None,
+        config: Optional[Dict[str, Any]] = None,
+        previous_metrics: Optional[List[Dict[str, Any]]] = None,
+        changed: Optional[Set[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run statistical analysis comparing multiple completion datasets.
+
+        comparison_config options: "paired" compares datasets prompt by prompt over the
+        prompts they share instead of as independent samples; "correction" ("bh" or
+        "holm") picks the multiple-comparison correction insights are based on.
+        Sections are stored in `into` (when given) as they finish, so an interrupted caller
+        keeps them.
+
+        With previous_metrics (the test rows of an earlier run), only the pairs involving a
+        dataset named in `changed` are retested; the other rows are kept.
+        """
+        sections = into if into is not None else {}
+        config = config or {}
+        correction = config.get("correction") if config.get("correction") in CORRECTIONS else DEFAULT_CORRECTION
         # Prepare data for statistical analysis
         completions_by_dataset = {}
         for completion_dataset in completions:
             completions_by_dataset[completion_dataset.name] = completion_dataset.completions or {}
+        # Computed once per dataset version; shared by the tests and the summary statistics
+        dataset_metrics = {o.name: self._dataset_metrics(o) for o in completions}
         
         # Run statistical tests
-        metrics = run_statistical_tests(completions_by_dataset)
+        if progress:
+            progress.start("statistical_analysis", "Computing statistical metrics...")
+        only = (changed or set()) if previous_metrics is not None else None
+        if config.get("paired"):
+            # Same prompt order as the alignment index
+            metrics = run_paired_tests(completions_by_dataset, sorted(dataset.prompts), only)
+        else:
+            metrics = run_statistical_tests(completions_by_dataset, dataset_metrics, only)
+        if only is not None:
+            metrics = self._merge_metrics(previous_metrics, metrics, list(completions_by_dataset), only)
+        sections["metrics"] = add_corrected_p_values(metrics)
+        sections["pairwise"] = {
+            **pairwise_matrices(metrics, list(completions_by_dataset)),
+            "correction": correction,
+        }
+
+        # Identical completions across datasets, globally and per prompt
+        if progress:
+            progress.start("overlap", "Finding identical completions across datasets...")
+        sections["overlap"] = calculate_overlap(completions_by_dataset, sorted(dataset.prompts))
         
         # Generate automated insights
-        insights = self._generate_insights(metrics, completions_by_dataset)
+        if progress:
+            progress.start("insights", "Generating automated insights...")
+        findings = generate_insights(metrics, completions_by_dataset, sorted(dataset.prompts), correction)
+        sections["insights"] = [finding["message"] for finding in findings]
+        sections["insight_details"] = findings
+
+        # Summary statistics backing the charts and tables
+        if progress:
+            progress.start("visualization", "Preparing visualizations...")
+        sections["summary_statistics"] = calculate_summary_statistics(completions_by_dataset, dataset_metrics)
         
+        return sections
+    
+    @staticmethod
+    def _dataset_metrics(completion_dataset: CompletionDataset) -> Dict[str, List[float]]:
+        """calculate_dataset_metrics of a completion dataset, cached per content hash."""
+        key = ("dataset_metrics", completion_dataset.id, completion_dataset.content_hash)
+        cached = dataset_cache.get(key)
+        if cached is None:
+            cached = dataset_cache.put(key, calculate_dataset_metrics(completion_dataset.completions or {}))
+        return cached
+
+    @staticmethod
+    def _merge_metrics(
+        previous: List[Dict[str, Any]], fresh: List[Dict[str, Any]], dataset_names: List[str], changed: Set[str]
+    ) -> List[Dict[str, Any]]:
+        """Previous test rows of unchanged pairs plus the fresh rows, in the order a full run gives."""
+        index = {name: i for i, name in enumerate(dataset_names)}
+        kept = [
+            m for m in previous
+            if m.get("dataset_a") in index and m.get("dataset_b") in index
+            and m["dataset_a"] not in changed and m["dataset_b"] not in changed
+        ]
+        metric_rank = {name: i for i, name in enumerate(dict.fromkeys(m["name"] for m in kept + fresh))}
+
+        def order(m: Dict[str, Any]) -> Tuple[int, ...]:
+            pair = (index[m["dataset_a"]], index[m["dataset_b"]])
+            # Paired tests are run metric by metric, independent ones pair by pair
+            return (metric_rank[m["name"]], *pair) if m.get("test") == "paired" else pair
+
+        return sorted(kept + fresh, key=order)
+
+    @staticmethod
+    def _preview_size(config: Dict[str, Any]) -> Optional[int]:
+        """Prompts to sample for comparison_config["preview_sample"], or None for no preview."""
+        value = config.get("preview_sample")
+        if value is True:
+            return PREVIEW_SAMPLE_SIZE
+        if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+            return value
+        return None
+
+    def _run_preview(
+        self, comp: Comparison, config: Dict[str, Any], size: int, seed: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Tests, insights and summary statistics (with 95% CIs of the means) on a stratified
+        sample of the aligned prompts; see metrics/sampling.py.
+
+        The strata come from the first-output lengths in the alignment index, read as one
+        column; only the sampled prompts' completions are then loaded, so the preview costs
+        the sample's size rather than the datasets'.
+        """
+        self._ensure_alignment_index(comp)
+        row = ComparisonAlignmentRow
+        completion_ids = [uuid.UUID(id_str) for id_str in comp.datasets[1:]]
+        rows = self.db.query(row.prompt_id, row.stats).filter(row.comparison_id == comp.id).order_by(row.prompt_id).all()
+        lengths = np.array(
+            [stats["lengths"] for _, stats in rows], dtype=float
+        ).reshape(len(rows), len(completion_ids))
+        sample = sample_prompts([prompt_id for prompt_id, _ in rows], lengths, size, seed=seed)
+
+        names = dict(
+            self.db.query(CompletionDataset.id, CompletionDataset.name).filter(CompletionDataset.id.in_(completion_ids))
+        )
+        by_id = DatasetService(self.db).get_completions_for_prompts(completion_ids, sample["prompt_ids"])
+        sampled = {names[output_id]: by_id[output_id] for output_id in completion_ids}
+        correction = config.get("correction") if config.get("correction") in CORRECTIONS else DEFAULT_CORRECTION
+        if config.get("paired"):
+            metrics = run_paired_tests(sampled, sample["prompt_ids"])
+        else:
+            metrics = run_statistical_tests(sampled)
+        metrics = add_corrected_p_values(metrics)
         return {
+            "exact": False,
+            "sample_size": len(sample["prompt_ids"]),
+            "population": sample["population"],
+            "strata": sample["strata"],
             "metrics": metrics,
-            "summary_statistics": calculate_summary_statistics(completions_by_dataset),
-            "insights": insights
+            "insights": [f["message"] for f in generate_insights(metrics, sampled, sample["prompt_ids"], correction)],
+            "summary_statistics": add_mean_intervals(calculate_summary_statistics(sampled)),
         }
-    
-    def _generate_insights(self, metrics: List[Dict[str, Any]], completions_by_dataset: Dict[str, Dict[str, List[str]]]) -> List[str]:
-        """Generate automated insights from statistical analysis."""
-        insights = []
-        
-        # Find significant differences
-        significant_metrics = [m for m in metrics if m.get("statistical_significance", 1.0) < 0.05]
-        if significant_metrics:
-            insights.append(f"Found {len(significant_metrics)} statistically significant differences between datasets.")
-            
-            # Highlight the most significant
-            most_significant = min(significant_metrics, key=lambda x: x.get("statistical_significance", 1.0))
-            insights.append(f"Most significant difference: {most_significant['name']} (p={most_significant['statistical_significance']:.4f})")
-        
-        # Dataset size comparison
-        dataset_sizes = {name: sum(len(completions) for completions in dataset.values()) 
-                        for name, dataset in completions_by_dataset.items()}
-        if dataset_sizes:
-            largest_dataset = max(dataset_sizes.items(), key=lambda x: x[1])
-            smallest_dataset = min(dataset_sizes.items(), key=lambda x: x[1])
-            insights.append(f"Dataset sizes range from {smallest_dataset[1]} ({smallest_dataset[0]}) to {largest_dataset[1]} ({largest_dataset[0]}) completions.")
-        
-        # Effect size insights
-        large_effects = [m for m in metrics if abs(m.get("effect_size", 0)) > 0.8]
-        if large_effects:
-            insights.append(f"Found {len(large_effects)} metrics with large effect sizes (>0.8), indicating substantial practical differences.")
-        
-        return insights
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""
+Per-process cache of decoded dataset payloads.
+
+Analyses, comparisons and exports of the same datasets within a short window would
+otherwise each fetch and JSON-decode the prompts/completions blobs again. Entries are
+keyed by (kind, id, content_hash), so a changed payload is never served stale, and the
+cache is bounded by an approximate memory budget with least-recently-used eviction.
+
+Strings are interned on load: completions repeated across prompts and datasets share one
+object. Cached payloads are shared between callers and must be treated as read-only.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from ..core.config import settings
+
+
+def intern_payload(data: Any) -> Any:
+    """Copy of a decoded JSON payload with every string (keys included) interned."""
+    if isinstance(data, str):
+        return sys.intern(data)
+    if isinstance(data, dict):
+        return {sys.intern(key): intern_payload(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [intern_payload(value) for value in data]
+    return data
+
+
+def estimate_size(data: Any) -> int:
+    """Approximate memory footprint in bytes; shared (interned) strings are counted once."""
+    seen = set()
+
+    def size(obj: Any) -> int:
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        total = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            total += sum(size(key) + size(value) for key, value in obj.items())
+        elif isinstance(obj, list):
+            total += sum(size(value) for value in obj)
+        return total
+
+    return size(data)
+
+
+class DatasetCache:
+    """Thread-safe LRU cache with a byte budget and hit/miss/eviction counters."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> Any:
+        """Store an (already interned) payload and return it; oversized payloads are not kept."""
+        nbytes = estimate_size(value)
+        if nbytes > self.max_bytes:
+            return value
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# One cache per process (API, each Celery worker child, each local task process)
+dataset_cache = DatasetCache(settings.DATASET_CACHE_MAX_BYTES)
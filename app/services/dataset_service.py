@@ -1,10 +1,25 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import func, true
+from sqlalchemy.orm import Session, undefer
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import Dict, List, Optional, Tuple
 import uuid
 from ..models.dataset import Dataset
 from ..models.completion import CompletionDataset
+from ..models.search_entry import SearchEntry
 from ..schemas.dataset import DatasetCreate
 from ..schemas.completion import CompletionDatasetCreate
+from .ingest import compute_content_hash, compute_content_summary, count_completions
+from .pagination import apply_keyset
+from .dataset_cache import dataset_cache, intern_payload
+from .search_service import SearchService
+
+DATASET_SUMMARY_COLUMNS = ["id", "name", "user_id", "created_at", "user_metadata", "prompt_count", "content_hash", "version"]
+COMPLETION_DATASET_SUMMARY_COLUMNS = [
+    "id", "name", "dataset_id", "created_at", "user_metadata", "prompt_count", "completion_count", "content_hash",
+    "size_bytes", "version"
+]
+# Prompt ids per IN (...) list when reading a subset of the prompts' rows
+PROMPT_ID_BATCH = 1000
 
 
 class DatasetService:
@@ -17,31 +32,131 @@ class DatasetService:
             name=dataset_data.name,
             user_id=user_id,
             prompts=dataset_data.prompts,
-            user_metadata=dataset_data.metadata
+            user_metadata=dataset_data.metadata,
+            prompt_count=len(dataset_data.prompts),
+            content_hash=compute_content_hash(dataset_data.prompts)
         )
         self.db.add(db_dataset)
+        self.db.flush()
+        SearchService(self.db).index_prompts(db_dataset.id, dataset_data.prompts)
         self.db.commit()
-        self.db.refresh(db_dataset)
+        # Reload only the scalar columns; the prompts blob is fetched lazily if a caller reads it
+        self.db.refresh(db_dataset, attribute_names=DATASET_SUMMARY_COLUMNS)
         return db_dataset
     
-    def get_dataset(self, dataset_id: uuid.UUID) -> Optional[Dataset]:
-        """Get a dataset by ID."""
-        return self.db.query(Dataset).filter(Dataset.id == dataset_id).first()
+    def append_prompts(self, dataset_id: uuid.UUID, prompts: Dict[str, str]) -> Dataset:
+        """
+        Add prompts to a dataset, bumping its version.
+
+        Existing prompts are never changed, so comparisons of the dataset can be refreshed
+        incrementally. Raises ValueError if a prompt_id already exists.
+        """
+        dataset = (
+            self.db.query(Dataset).options(undefer(Dataset.prompts))
+            .filter(Dataset.id == dataset_id).with_for_update().first()
+        )
+        if not dataset:
+            raise ValueError(f"Dataset {dataset_id} not found")
+        existing = sorted(set(prompts) & set(dataset.prompts))
+        if existing:
+            raise ValueError(f"Prompt ids already in the dataset: {existing[:10]}")
+
+        merged = {**dataset.prompts, **prompts}
+        dataset.prompts = merged
+        dataset.prompt_count = len(merged)
+        dataset.content_hash = compute_content_hash(merged)
+        dataset.version = (dataset.version or 1) + 1
+        SearchService(self.db).index_prompts(dataset.id, prompts)
+        self.db.commit()
+        self.db.refresh(dataset, attribute_names=DATASET_SUMMARY_COLUMNS)
+        return dataset
+
+    def get_dataset(self, dataset_id: uuid.UUID, include_prompts: bool = False) -> Optional[Dataset]:
+        """Get a dataset by ID. The prompts blob is only fetched when include_prompts is set."""
+        query = self.db.query(Dataset)
+        if include_prompts:
+            query = query.options(undefer(Dataset.prompts))
+        return query.filter(Dataset.id == dataset_id).first()
     
-    def get_datasets(self, user_id: uuid.UUID, skip: int = 0, limit: int = 100) -> List[Dataset]:
-        """Get all datasets for a user."""
-        return (
-            self.db.query(Dataset)
-            .filter(Dataset.user_id == user_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
+    def get_datasets(
+        self,
+        user_id: uuid.UUID,
+        skip: int = 0,
+        limit: int = 100,
+        include_prompts: bool = False,
+        cursor: Optional[str] = None
+    ) -> List[Dataset]:
+        """Get a user's datasets newest first, continuing after `cursor` when given."""
+        query = self.db.query(Dataset)
+        if include_prompts:
+            query = query.options(undefer(Dataset.prompts))
+        query = query.filter(Dataset.user_id == user_id)
+        return apply_keyset(query, Dataset, cursor, limit).offset(skip).all()
+
+    def load_dataset(self, dataset_id: uuid.UUID) -> Optional[Dataset]:
+        """
+        Get a dataset with its prompts, served from this process's dataset cache when possible.
+
+        The prompts of the returned object are shared with other callers; do not mutate them.
+        """
+        dataset = self.get_dataset(dataset_id)
+        if dataset is not None and not self._attach_cached(dataset, "prompts"):
+            prompts = self.db.query(Dataset.prompts).filter(Dataset.id == dataset_id).scalar()
+            self._attach_loaded(dataset, "prompts", prompts)
+        return dataset
+
+    def load_completion_datasets(self, output_ids: List[uuid.UUID]) -> List[CompletionDataset]:
+        """Get completion datasets with their completions, fetching only cache misses (in one query)."""
+        outputs = self.db.query(CompletionDataset).filter(CompletionDataset.id.in_(output_ids)).all()
+        missing = [o for o in outputs if not self._attach_cached(o, "completions")]
+        if missing:
+            blobs = dict(
+                self.db.query(CompletionDataset.id, CompletionDataset.completions)
+                .filter(CompletionDataset.id.in_([o.id for o in missing]))
+                .all()
+            )
+            for output in missing:
+                self._attach_loaded(output, "completions", blobs[output.id])
+        return outputs
+
+    def _attach_cached(self, obj, attribute: str) -> bool:
+        """Populate a deferred payload from the cache; False on a miss."""
+        if attribute in obj.__dict__:
+            return True
+        if obj.content_hash is None:
+            return False
+        payload = dataset_cache.get((attribute, obj.id, obj.content_hash))
+        if payload is None:
+            return False
+        set_committed_value(obj, attribute, payload)
+        return True
+
+    def _attach_loaded(self, obj, attribute: str, payload) -> None:
+        # Rows ingested before content hashes were recorded have no version to key on
+        if obj.content_hash is not None:
+            payload = dataset_cache.put((attribute, obj.id, obj.content_hash), intern_payload(payload))
+        set_committed_value(obj, attribute, payload)
+
+    def get_prompt_page(self, dataset_id: uuid.UUID, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+        """
+        Page through a dataset's prompts ordered by prompt_id.
+
+        The prompts JSON is expanded inside the database so only the requested page is transferred.
+        Returns ([(prompt_id, prompt_text)], next_cursor).
+        """
+        entries = func.json_each_text(Dataset.prompts).table_valued("key", "value")
+        query = (
+            self.db.query(entries.c.key, entries.c.value)
+            .select_from(Dataset)
+            .join(entries, true())
+            .filter(Dataset.id == dataset_id)
         )
+        return self._page_entries(query, entries, cursor, limit)
     
     def create_completion_dataset(self, dataset_id: uuid.UUID, output_data: CompletionDatasetCreate) -> CompletionDataset:
         """Create a new completion dataset."""
         # Verify the parent dataset exists
-        dataset = self.get_dataset(dataset_id)
+        dataset = self.get_dataset(dataset_id, include_prompts=True)
         if not dataset:
             raise ValueError(f"Dataset {dataset_id} not found")
         
@@ -53,25 +168,185 @@ class DatasetService:
             missing_keys = output_keys - input_keys
             raise ValueError(f"Output keys not found in prompt dataset: {missing_keys}")
         
+        content_hash, size_bytes = compute_content_summary(output_data.completions)
         db_output = CompletionDataset(
             name=output_data.name,
             dataset_id=dataset_id,
             completions=output_data.completions,
-            user_metadata=output_data.metadata
+            user_metadata=output_data.metadata,
+            prompt_count=len(output_data.completions),
+            completion_count=count_completions(output_data.completions),
+            content_hash=content_hash,
+            size_bytes=size_bytes
         )
         self.db.add(db_output)
+        self.db.flush()
+        SearchService(self.db).index_completions(dataset_id, db_output.id, output_data.completions)
         self.db.commit()
-        self.db.refresh(db_output)
+        self.db.refresh(db_output, attribute_names=COMPLETION_DATASET_SUMMARY_COLUMNS)
         return db_output
     
-    def get_completion_dataset(self, output_id: uuid.UUID) -> Optional[CompletionDataset]:
-        """Get an completion dataset by ID."""
-        return self.db.query(CompletionDataset).filter(CompletionDataset.id == output_id).first()
+    def append_completions(self, output_id: uuid.UUID, completions: Dict[str, List[str]]) -> CompletionDataset:
+        """
+        Add completions for prompts the completion dataset does not cover yet, bumping its version.
+
+        Raises ValueError if a prompt_id already has completions or is not in the parent dataset.
+        """
+        output = (
+            self.db.query(CompletionDataset).options(undefer(CompletionDataset.completions))
+            .filter(CompletionDataset.id == output_id).with_for_update().first()
+        )
+        if not output:
+            raise ValueError(f"Completion dataset {output_id} not found")
+        existing = sorted(set(completions) & set(output.completions))
+        if existing:
+            raise ValueError(f"Prompt ids already have completions: {existing[:10]}")
+        prompt_ids = set(self.load_dataset(output.dataset_id).prompts)
+        missing_keys = set(completions) - prompt_ids
+        if missing_keys:
+            raise ValueError(f"Output keys not found in prompt dataset: {missing_keys}")
+
+        merged = {**output.completions, **completions}
+        output.completions = merged
+        output.prompt_count = len(merged)
+        output.completion_count = count_completions(merged)
+        output.content_hash, output.size_bytes = compute_content_summary(merged)
+        output.version = (output.version or 1) + 1
+        SearchService(self.db).index_completions(output.dataset_id, output.id, completions)
+        self.db.commit()
+        self.db.refresh(output, attribute_names=COMPLETION_DATASET_SUMMARY_COLUMNS)
+        return output
+
+    def get_versions(self, ids: List[uuid.UUID]) -> Dict[str, int]:
+        """Current version of each dataset or completion dataset id (as a string); unknown ids are left out."""
+        versions: Dict[str, int] = {}
+        for model in (Dataset, CompletionDataset):
+            for row_id, version in self.db.query(model.id, model.version).filter(model.id.in_(ids)):
+                versions[str(row_id)] = version or 1
+        return versions
+
+    def get_completion_dataset(self, output_id: uuid.UUID, include_completions: bool = False) -> Optional[CompletionDataset]:
+        """Get an completion dataset by ID. The completions blob is only fetched when include_completions is set."""
+        query = self.db.query(CompletionDataset)
+        if include_completions:
+            query = query.options(undefer(CompletionDataset.completions))
+        return query.filter(CompletionDataset.id == output_id).first()
     
-    def get_completion_datasets(self, dataset_id: uuid.UUID) -> List[CompletionDataset]:
-        """Get all completion datasets for a dataset."""
-        return (
-            self.db.query(CompletionDataset)
-            .filter(CompletionDataset.dataset_id == dataset_id)
-            .all()
-        )
\ No newline at end of file
+    def get_completion_datasets(
+        self,
+        dataset_id: uuid.UUID,
+        include_completions: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> List[CompletionDataset]:
+        """Get a dataset's completion datasets newest first, continuing after `cursor` when given."""
+        query = self.db.query(CompletionDataset)
+        if include_completions:
+            query = query.options(undefer(CompletionDataset.completions))
+        query = query.filter(CompletionDataset.dataset_id == dataset_id)
+        return apply_keyset(query, CompletionDataset, cursor, limit).all()
+
+    def get_completion_page(self, output_id: uuid.UUID, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[Tuple[str, List[str]]], Optional[str]]:
+        """
+        Page through a completion dataset's entries ordered by prompt_id.
+
+        Returns ([(prompt_id, [completion_text])], next_cursor).
+        """
+        entries = func.json_each(CompletionDataset.completions).table_valued("key", "value")
+        query = (
+            self.db.query(entries.c.key, entries.c.value)
+            .select_from(CompletionDataset)
+            .join(entries, true())
+            .filter(CompletionDataset.id == output_id)
+        )
+        return self._page_entries(query, entries, cursor, limit)
+
+    def get_prompt_shard_bounds(self, dataset_id: uuid.UUID, shard_size: int) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Split a dataset's prompt_ids into contiguous ranges of about shard_size ids.
+
+        Returns [(after, upto)] key ranges (exclusive, inclusive; None is unbounded) covering
+        every prompt_id; only the boundary keys leave the database.
+        """
+        numbered = (
+            self.db.query(
+                SearchEntry.prompt_id.label("key"),
+                func.row_number().over(order_by=SearchEntry.prompt_id).label("position"),
+                func.count().over().label("total")
+            )
+            .filter(SearchEntry.dataset_id == dataset_id, SearchEntry.completion_dataset_id.is_(None))
+            .subquery()
+        )
+        boundaries = [
+            row[0] for row in self.db.query(numbered.c.key)
+            .filter(numbered.c.position % shard_size == 0, numbered.c.position < numbered.c.total)
+            .order_by(numbered.c.key)
+        ]
+        edges = [None] + boundaries + [None]
+        return list(zip(edges[:-1], edges[1:]))
+
+    def get_prompt_range(self, dataset_id: uuid.UUID, after: Optional[str], upto: Optional[str]) -> Dict[str, str]:
+        """
+        Prompts with after < prompt_id <= upto (None bounds are open).
+
+        Read from the per-text rows written at ingest (search_entries) through their
+        (dataset_id, prompt_id) index, so a range costs its own size, not the whole dataset's.
+        """
+        query = self.db.query(SearchEntry.prompt_id, SearchEntry.text).filter(
+            SearchEntry.dataset_id == dataset_id, SearchEntry.completion_dataset_id.is_(None)
+        )
+        return dict(self._range_entries(query, after, upto))
+
+    def get_completion_range(self, output_id: uuid.UUID, after: Optional[str], upto: Optional[str]) -> Dict[str, List[str]]:
+        """
+        Completions with after < prompt_id <= upto (None bounds are open), read like
+        get_prompt_range. Prompt ids whose completion list is empty have no rows and are left out.
+        """
+        query = (
+            self.db.query(SearchEntry.prompt_id, SearchEntry.text)
+            .filter(SearchEntry.completion_dataset_id == output_id)
+            .order_by(SearchEntry.prompt_id, SearchEntry.position)
+        )
+        completions: Dict[str, List[str]] = {}
+        for prompt_id, text in self._range_entries(query, after, upto):
+            completions.setdefault(prompt_id, []).append(text)
+        return completions
+
+    def get_completions_for_prompts(
+        self, output_ids: List[uuid.UUID], prompt_ids: List[str]
+    ) -> Dict[uuid.UUID, Dict[str, List[str]]]:
+        """
+        Completions of prompt_ids in each of the completion datasets, read like
+        get_completion_range: a subset (e.g. a preview sample) costs its own size, not the
+        datasets'. Prompt ids without completions in a dataset are left out of its dict.
+        """
+        completions: Dict[uuid.UUID, Dict[str, List[str]]] = {output_id: {} for output_id in output_ids}
+        for start in range(0, len(prompt_ids), PROMPT_ID_BATCH):
+            rows = (
+                self.db.query(SearchEntry.completion_dataset_id, SearchEntry.prompt_id, SearchEntry.text)
+                .filter(
+                    SearchEntry.completion_dataset_id.in_(output_ids),
+                    SearchEntry.prompt_id.in_(prompt_ids[start:start + PROMPT_ID_BATCH])
+                )
+                .order_by(SearchEntry.completion_dataset_id, SearchEntry.prompt_id, SearchEntry.position)
+            )
+            for output_id, prompt_id, text in rows:
+                completions[output_id].setdefault(prompt_id, []).append(text)
+        return completions
+
+    @staticmethod
+    def _range_entries(query, after: Optional[str], upto: Optional[str]):
+        if after is not None:
+            query = query.filter(SearchEntry.prompt_id > after)
+        if upto is not None:
+            query = query.filter(SearchEntry.prompt_id <= upto)
+        return query.all()
+
+    def _page_entries(self, query, entries, cursor: Optional[str], limit: int):
+        if cursor is not None:
+            query = query.filter(entries.c.key > cursor)
+        # Fetch one extra row to learn whether another page exists
+        rows = query.order_by(entries.c.key).limit(limit + 1).all()
+        items = [(row[0], row[1]) for row in rows[:limit]]
+        next_cursor = items[-1][0] if len(rows) > limit else None
+        return items, next_cursor
\ No newline at end of file
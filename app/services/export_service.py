@@ -9,6 +9,7 @@ from ..models.comparison import Comparison
 from ..models.dataset import Dataset
 from ..models.completion import CompletionDataset
 from ..schemas.export import ExportRequest
+from .dataset_service import DatasetService
 
 # PDF generation imports
 from reportlab.lib.pagesizes import letter, A4
@@ -40,12 +41,9 @@ class ExportService:
         dataset_id = uuid.UUID(comparison.datasets[0])
         completion_dataset_ids = [uuid.UUID(id_str) for id_str in comparison.datasets[1:]]
         
-        dataset = self.db.query(Dataset).filter(Dataset.id == dataset_id).first()
-        completions = (
-            self.db.query(CompletionDataset)
-            .filter(CompletionDataset.id.in_(completion_dataset_ids))
-            .all()
-        )
+        datasets = DatasetService(self.db)
+        dataset = datasets.load_dataset(dataset_id)
+        completions = datasets.load_completion_datasets(completion_dataset_ids)
         
         # Prepare data based on format
         if request.format == 'json':
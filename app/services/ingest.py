@@ -0,0 +1,144 @@
+"""
+Bulk ingest helpers for prompt and completion payloads.
+
+These run on raw request bodies so large uploads skip per-item Pydantic validation.
+The parse_* entry points are pure functions of bytes so routes can run them in the CPU
+executor (see app.core.concurrency) instead of on the event loop.
+"""
+import csv
+import hashlib
+import io
+from typing import Dict, List, Any, Tuple
+
+import orjson
+
+
+def loads_json(raw: bytes) -> Any:
+    """Parse a JSON document from raw bytes."""
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON body: {e}")
+
+
+def compute_content_hash(data: Any) -> str:
+    """Return a sha256 hex digest of the canonical (key-sorted) JSON encoding of data."""
+    return compute_content_summary(data)[0]
+
+
+def compute_content_summary(data: Any) -> Tuple[str, int]:
+    """Return (sha256 hex digest, size in bytes) of the canonical JSON encoding of data."""
+    encoded = orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(encoded).hexdigest(), len(encoded)
+
+
+def validate_name(body: Dict[str, Any]) -> str:
+    name = body.get("name")
+    if type(name) is not str or not name.strip():
+        raise ValueError("'name' must be a non-empty string")
+    return name
+
+
+def validate_metadata(body: Dict[str, Any]) -> Dict[str, Any]:
+    metadata = body.get("metadata") or {}
+    if type(metadata) is not dict:
+        raise ValueError("'metadata' must be an object")
+    return metadata
+
+
+def validate_prompts(prompts: Any) -> Dict[str, str]:
+    """Check that prompts is a non-empty mapping prompt_id -> prompt_text."""
+    if type(prompts) is not dict or not prompts:
+        raise ValueError("'prompts' must be a non-empty object mapping prompt_id to text")
+    # JSON object keys are always strings, so only the values need checking
+    if not all(type(v) is str for v in prompts.values()):
+        raise ValueError("All prompt values must be strings")
+    return prompts
+
+
+def validate_completions(completions: Any) -> Dict[str, List[str]]:
+    """Check that completions is a non-empty mapping prompt_id -> [completion_text]."""
+    if type(completions) is not dict or not completions:
+        raise ValueError("'completions' must be a non-empty object mapping prompt_id to a list of strings")
+    values = completions.values()
+    if not all(type(v) is list for v in values):
+        raise ValueError("All completion values must be lists of strings")
+    if not all(type(s) is str for completion_list in values for s in completion_list):
+        raise ValueError("All completion values must be lists of strings")
+    return completions
+
+
+def count_completions(completions: Dict[str, List[str]]) -> int:
+    return sum(len(completion_list) for completion_list in completions.values())
+
+
+def parse_dataset_body(raw: bytes) -> Dict[str, Any]:
+    """Parse and check a raw DatasetCreate-shaped body. Returns name/prompts/metadata."""
+    body = loads_json(raw)
+    if type(body) is not dict:
+        raise ValueError("Request body must be a JSON object")
+    return {
+        "name": validate_name(body),
+        "prompts": validate_prompts(body.get("prompts")),
+        "metadata": validate_metadata(body),
+    }
+
+
+def parse_completion_dataset_body(raw: bytes) -> Dict[str, Any]:
+    """Parse and check a raw CompletionDatasetCreate-shaped body. Returns name/completions/metadata."""
+    body = loads_json(raw)
+    if type(body) is not dict:
+        raise ValueError("Request body must be a JSON object")
+    return {
+        "name": validate_name(body),
+        "completions": validate_completions(body.get("completions")),
+        "metadata": validate_metadata(body),
+    }
+
+
+def _csv_reader(content: bytes) -> csv.DictReader:
+    try:
+        return csv.DictReader(io.StringIO(content.decode("utf-8")))
+    except UnicodeDecodeError:
+        raise ValueError("File encoding error. Please ensure the CSV is UTF-8 encoded")
+
+
+def parse_prompts_csv(content: bytes) -> Dict[str, str]:
+    """Parse an uploaded CSV with prompt_id and prompt_text columns into prompt_id -> text."""
+    reader = _csv_reader(content)
+    if not reader.fieldnames or "prompt_id" not in reader.fieldnames or "prompt_text" not in reader.fieldnames:
+        raise ValueError("CSV must have 'prompt_id' and 'prompt_text' columns")
+
+    prompts = {}
+    for row in reader:
+        prompt_id = (row.get("prompt_id") or "").strip()
+        prompt_text = (row.get("prompt_text") or "").strip()
+        if not prompt_id or not prompt_text:
+            continue  # Skip empty rows
+        prompts[prompt_id] = prompt_text
+
+    if not prompts:
+        raise ValueError("No valid prompt data found in CSV")
+    return prompts
+
+
+def parse_completions_csv(content: bytes) -> Dict[str, List[str]]:
+    """Parse an uploaded CSV with prompt_id and completion_text columns into prompt_id -> [texts]."""
+    reader = _csv_reader(content)
+    if not reader.fieldnames or "prompt_id" not in reader.fieldnames:
+        raise ValueError("CSV must have 'prompt_id' column")
+    if "completion_text" not in reader.fieldnames:
+        raise ValueError("CSV must have 'completion_text' column")
+
+    completions: Dict[str, List[str]] = {}
+    for row in reader:
+        prompt_id = (row.get("prompt_id") or "").strip()
+        completion_text = (row.get("completion_text") or "").strip()
+        if not prompt_id or not completion_text:
+            continue  # Skip empty rows
+        # Multiple completions per prompt_id are kept in file order
+        completions.setdefault(prompt_id, []).append(completion_text)
+
+    if not completions:
+        raise ValueError("No valid completion data found in CSV")
+    return completions
@@ -0,0 +1,300 @@
+"""
+Rule-based automated insights for comparisons.
+
+The comparison is reduced to three column tables (dicts of equal-length numpy arrays):
+- "metrics": one row per test row (metric x dataset pair): values, p/q-values, effect sizes
+- "datasets": one row per completion dataset, with aggregates of the per-prompt table
+  (prompts without completions, per-prompt length outliers)
+- "comparison": a single row of comparison-wide aggregates
+
+Rules in INSIGHT_RULES are declarative: each names its table, a vectorized predicate
+("when") selecting the matching rows, a strength used to rank them and a message built for
+the rows that are reported. Every rule is evaluated once over whole columns, however many
+metric rows the comparison has, and reports its MAX_FINDINGS_PER_RULE strongest rows (and
+how many more matched). Findings are ranked by severity, then rule order and strength.
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .metrics.pairwise import corrected_p_value, DEFAULT_CORRECTION
+
+# q-value below which a difference is reported as significant
+ALPHA = 0.05
+LARGE_EFFECT = 0.8
+# Relative change of mean completion length reported as a length shift
+LENGTH_SHIFT = 0.2
+# A dataset whose diversity is below this fraction of the other's has collapsed diversity
+DIVERSITY_COLLAPSE_RATIO = 0.5
+# Share of prompts without completions reported as a coverage gap
+COVERAGE_GAP = 0.05
+OUTLIER_Z = 3.0
+# Outliers expected among normally distributed lengths beyond OUTLIER_Z (two-sided)
+EXPECTED_OUTLIER_SHARE = 0.0027
+MIN_OUTLIERS = 3
+MAX_FINDINGS_PER_RULE = 5
+SEVERITY_LEVELS = {"high": 3, "medium": 2, "low": 1}
+Table = Dict[str, np.ndarray]
+
+
+def _percent(value: float) -> str:
+    return f"{abs(value) * 100:.0f}%"
+
+
+def _length_shift_message(row: Dict[str, Any]) -> str:
+    direction = "longer" if row["relative_change"] > 0 else "shorter"
+    return (
+        f"{row['dataset_b']} writes {_percent(row['relative_change'])} {direction} completions than "
+        f"{row['dataset_a']} ({row['b_value']:.0f} vs {row['a_value']:.0f} characters, q={row['q']:.4f})."
+    )
+
+
+def _diversity_collapse_message(row: Dict[str, Any]) -> str:
+    low, high = (row["dataset_a"], row["dataset_b"]) if row["a_value"] < row["b_value"] else (row["dataset_b"], row["dataset_a"])
+    return (
+        f"Diversity collapse: {low} gives far fewer distinct completions per prompt than {high} "
+        f"({min(row['a_value'], row['b_value']):.2f} vs {max(row['a_value'], row['b_value']):.2f}, q={row['q']:.4f})."
+    )
+
+
+INSIGHT_RULES: List[Dict[str, Any]] = [
+    {
+        "rule": "length_shift",
+        "table": "metrics",
+        "severity": "high",
+        "when": lambda t: (t["name"] == "Completion Length") & (t["q"] < ALPHA) & (np.abs(t["relative_change"]) >= LENGTH_SHIFT),
+        "strength": lambda t: np.abs(t["relative_change"]),
+        "message": _length_shift_message,
+    },
+    {
+        "rule": "diversity_collapse",
+        "table": "metrics",
+        "severity": "high",
+        "when": lambda t: (
+            (t["name"] == "Completion Diversity") & (t["q"] < ALPHA)
+            & (np.minimum(t["a_value"], t["b_value"]) < DIVERSITY_COLLAPSE_RATIO * np.maximum(t["a_value"], t["b_value"]))
+        ),
+        "strength": lambda t: 1 - np.minimum(t["a_value"], t["b_value"]) / np.maximum(t["a_value"], t["b_value"]),
+        "message": _diversity_collapse_message,
+    },
+    {
+        "rule": "coverage_gap",
+        "table": "datasets",
+        "severity": "high",
+        "when": lambda t: t["missing_share"] >= COVERAGE_GAP,
+        "strength": lambda t: t["missing_share"],
+        "message": lambda r: (
+            f"Coverage gap: {r['name']} has no completions for {r['missing']} of {r['prompts']} prompts "
+            f"({_percent(r['missing_share'])}); tests on it only reflect the prompts it answered."
+        ),
+    },
+    {
+        "rule": "significant_differences",
+        "table": "comparison",
+        "severity": "medium",
+        "when": lambda t: t["significant"] > 0,
+        "strength": lambda t: t["significant"] / np.maximum(t["tested"], 1),
+        "message": lambda r: (
+            f"Found {r['significant']} statistically significant differences between datasets "
+            f"({r['correction_name']}-corrected)."
+        ),
+    },
+    {
+        "rule": "most_significant",
+        "table": "metrics",
+        "severity": "medium",
+        "when": lambda t: (t["q"] < ALPHA) & (t["q"] == t["q"].min(initial=np.inf)),
+        "strength": lambda t: -t["q"],
+        "message": lambda r: f"Most significant difference: {r['name']} (q={r['q']:.4f})",
+        "max_findings": 1,
+    },
+    {
+        "rule": "large_effects",
+        "table": "comparison",
+        "severity": "medium",
+        "when": lambda t: t["large_effects"] > 0,
+        "strength": lambda t: t["large_effects"] / np.maximum(t["tested"], 1),
+        "message": lambda r: (
+            f"Found {r['large_effects']} metrics with large effect sizes (>{LARGE_EFFECT}), "
+            "indicating substantial practical differences."
+        ),
+    },
+    {
+        "rule": "outlier_cluster",
+        "table": "datasets",
+        "severity": "medium",
+        "when": lambda t: (t["outliers"] >= MIN_OUTLIERS) & (t["outlier_share"] > 3 * EXPECTED_OUTLIER_SHARE),
+        "strength": lambda t: t["outlier_share"],
+        "message": lambda r: (
+            f"{r['name']} has {r['outliers']} prompts with outlying completion length (|z| >= {OUTLIER_Z:g}), "
+            f"{_percent(r['outlier_share'])} of its prompts."
+        ),
+    },
+    {
+        "rule": "shared_outlier_prompts",
+        "table": "comparison",
+        "severity": "medium",
+        "when": lambda t: t["shared_outlier_prompts"] >= MIN_OUTLIERS,
+        "strength": lambda t: t["shared_outlier_prompts"].astype(float),
+        "message": lambda r: (
+            f"{r['shared_outlier_prompts']} prompts draw outlying completion lengths from several datasets; "
+            "the prompts themselves may be unusual."
+        ),
+    },
+    {
+        "rule": "dataset_sizes",
+        "table": "comparison",
+        "severity": "low",
+        "when": lambda t: t["datasets"] > 0,
+        "strength": lambda t: np.zeros(t["datasets"].size),
+        "message": lambda r: (
+            f"Dataset sizes range from {r['smallest_size']} ({r['smallest']}) to "
+            f"{r['largest_size']} ({r['largest']}) completions."
+        ),
+    },
+]
+
+
+def metric_table(metrics: List[Dict[str, Any]], correction: str = DEFAULT_CORRECTION) -> Table:
+    """Columns of the test rows; q is the p-value corrected with `correction`."""
+    def column(key: str, default: float) -> np.ndarray:
+        return np.array([m.get(key, default) for m in metrics], dtype=float)
+
+    a_value, b_value = column("dataset_a_value", np.nan), column("dataset_b_value", np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        relative_change = np.where(a_value != 0, (b_value - a_value) / np.abs(a_value), np.nan)
+    return {
+        "name": np.array([m.get("name", "") for m in metrics], dtype=object),
+        "dataset_a": np.array([m.get("dataset_a", "") for m in metrics], dtype=object),
+        "dataset_b": np.array([m.get("dataset_b", "") for m in metrics], dtype=object),
+        "a_value": a_value,
+        "b_value": b_value,
+        "q": np.array([corrected_p_value(m, correction) for m in metrics], dtype=float),
+        "effect": column("effect_size", 0.0),
+        "relative_change": relative_change,
+    }
+
+
+def prompt_lengths(completions_by_dataset: Dict[str, Dict[str, List[str]]], prompt_ids: List[str]) -> np.ndarray:
+    """(prompt x dataset) matrix of mean completion length, NaN where a dataset has no completions."""
+    lengths = np.full((len(prompt_ids), len(completions_by_dataset)), np.nan)
+    for col, completions in enumerate(completions_by_dataset.values()):
+        for row, prompt_id in enumerate(prompt_ids):
+            outputs = completions.get(prompt_id)
+            if outputs:
+                lengths[row, col] = sum(len(o) for o in outputs) / len(outputs)
+    return lengths
+
+
+def length_outliers(lengths: np.ndarray) -> np.ndarray:
+    """Cells of the per-prompt length matrix at least OUTLIER_Z standard deviations from their dataset's mean."""
+    present = np.isfinite(lengths)
+    answered = present.sum(axis=0)
+    filled = np.where(present, lengths, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = filled.sum(axis=0) / answered
+        std = np.sqrt((np.where(present, lengths - mean, 0.0) ** 2).sum(axis=0) / answered)
+        z = (lengths - mean) / np.where(std > 0, std, np.nan)
+    return present & (np.abs(np.nan_to_num(z)) >= OUTLIER_Z)
+
+
+def dataset_table(names: List[str], sizes: np.ndarray, lengths: np.ndarray, outlying: np.ndarray) -> Table:
+    """Per-dataset coverage and length-outlier aggregates of the per-prompt tables."""
+    prompts = np.full(len(names), lengths.shape[0])
+    answered = np.isfinite(lengths).sum(axis=0)
+    outliers = outlying.sum(axis=0)
+    return {
+        "name": np.array(names, dtype=object),
+        "completions": sizes,
+        "prompts": prompts,
+        "missing": prompts - answered,
+        "missing_share": (prompts - answered) / np.maximum(prompts, 1),
+        "outliers": outliers,
+        "outlier_share": outliers / np.maximum(answered, 1),
+    }
+
+
+def comparison_table(metrics: Table, datasets: Table, outlying: np.ndarray, correction: str) -> Table:
+    """Single-row table of comparison-wide aggregates."""
+    sizes = datasets["completions"]
+    smallest = int(np.argmin(sizes)) if sizes.size else None
+    largest = int(np.argmax(sizes)) if sizes.size else None
+
+    def pick(values: np.ndarray, index: Optional[int], default: Any) -> np.ndarray:
+        return np.array([values[index] if index is not None else default], dtype=object)
+
+    return {
+        "datasets": np.array([sizes.size]),
+        "tested": np.array([metrics["q"].size]),
+        "significant": np.array([int((metrics["q"] < ALPHA).sum())]),
+        "large_effects": np.array([int((np.abs(metrics["effect"]) > LARGE_EFFECT).sum())]),
+        "shared_outlier_prompts": np.array([int((outlying.sum(axis=1) >= 2).sum())]),
+        "correction_name": np.array(["Holm" if correction == "holm" else "Benjamini-Hochberg"], dtype=object),
+        "smallest": pick(datasets["name"], smallest, ""),
+        "smallest_size": pick(sizes, smallest, 0),
+        "largest": pick(datasets["name"], largest, ""),
+        "largest_size": pick(sizes, largest, 0),
+    }
+
+
+def _row(table: Table, index: int) -> Dict[str, Any]:
+    """One row of a table as plain Python values, for message templates."""
+    row = {key: values[index] for key, values in table.items()}
+    return {key: value.item() if isinstance(value, np.generic) else value for key, value in row.items()}
+
+
+def evaluate_rules(tables: Dict[str, Table], rules: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Evaluate the rules over the tables and rank their findings.
+
+    Returns [{"rule", "severity", "strength", "message"}], most severe first.
+    """
+    findings: List[Dict[str, Any]] = []
+    for rule in rules if rules is not None else INSIGHT_RULES:
+        table = tables[rule["table"]]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            matched = np.flatnonzero(np.asarray(rule["when"](table), dtype=bool))
+            if not matched.size:
+                continue
+            strength = np.nan_to_num(np.asarray(rule["strength"](table), dtype=float)[matched], nan=0.0)
+        ranked = matched[np.argsort(-strength, kind="stable")]
+        strength = np.sort(strength)[::-1]
+        limit = rule.get("max_findings", MAX_FINDINGS_PER_RULE)
+        for index, value in zip(ranked[:limit], strength[:limit]):
+            findings.append({
+                "rule": rule["rule"],
+                "severity": rule["severity"],
+                "strength": float(value),
+                "message": rule["message"](_row(table, index)),
+            })
+        if matched.size > limit and limit > 1:
+            findings.append({
+                "rule": rule["rule"],
+                "severity": rule["severity"],
+                "strength": 0.0,
+                "message": f"...and {matched.size - limit} more {rule['rule'].replace('_', ' ')} findings.",
+            })
+    # Stable: within a severity, rules keep their order and their rows the strength order
+    findings.sort(key=lambda f: -SEVERITY_LEVELS[f["severity"]])
+    return findings
+
+
+def generate_insights(
+    metrics: List[Dict[str, Any]],
+    completions_by_dataset: Dict[str, Dict[str, List[str]]],
+    prompt_ids: List[str],
+    correction: str = DEFAULT_CORRECTION,
+    rules: Optional[List[Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """Ranked insight findings for a comparison's test rows and completions (see evaluate_rules)."""
+    sizes = np.array([sum(len(outputs) for outputs in c.values()) for c in completions_by_dataset.values()], dtype=int)
+    lengths = prompt_lengths(completions_by_dataset, prompt_ids)
+    outlying = length_outliers(lengths)
+    metric_columns = metric_table(metrics, correction)
+    datasets = dataset_table(list(completions_by_dataset), sizes, lengths, outlying)
+    tables = {
+        "metrics": metric_columns,
+        "datasets": datasets,
+        "comparison": comparison_table(metric_columns, datasets, outlying, correction),
+    }
+    return evaluate_rules(tables, rules)
@@ -0,0 +1,327 @@
+"""
+Mergeable partial state for the analysis metrics.
+
+A MetricAccumulator is filled from one shard of a job (a prompt-id range). Its state is
+counts, with texts kept as short hashes:
+- totals: counters and length histograms that merge by addition; their size depends on
+  the number of distinct lengths, not on the number of completions
+- keyed counts: per prompt text, per (prompt text, output) and per output hash; these grow
+  with the data
+
+A shard splits its keyed counts into partitions by hash (split()). reduce_partition()
+merges one partition of every shard into a few additive sums, and finalize_results() turns
+the merged totals and the partition sums into the same results dict as
+AnalysisService.compute_all_metrics. Every key falls in exactly one partition, so the
+results are exact and independent of shard and partition boundaries, while no step holds
+more than one partition of the keyed counts.
+"""
+import hashlib
+import numpy as np
+import tiktoken
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def partition_of(key: str, partitions: int) -> int:
+    """Partition of a hex digest key."""
+    return int(key[:8], 16) % partitions
+
+
+def _plogp(counts: Iterable[int]) -> float:
+    """Sum of c * log2(c) over the counts; the entropy of counts with total T is log2(T) - plogp / T."""
+    values = np.fromiter(counts, dtype=float)
+    values = values[values > 0]
+    return float((values * np.log2(values)).sum())
+
+
+def _entropy(total: float, plogp: float) -> float:
+    return max(float(np.log2(total) - plogp / total), 0.0) if total > 0 else 0.0
+
+
+def _length_stats(lengths: Counter, prefix: str) -> Dict[str, Any]:
+    """Mean/std/min/max/histogram of a value -> frequency counter (see basic_metrics)."""
+    if not lengths:
+        return {
+            f"{prefix}_mean": 0.0,
+            f"{prefix}_std": 0.0,
+            f"{prefix}_min": 0,
+            f"{prefix}_max": 0,
+            f"{prefix}_distribution": {}
+        }
+
+    values = np.array(sorted(lengths), dtype=float)
+    weights = np.array([lengths[v] for v in sorted(lengths)], dtype=float)
+    total = weights.sum()
+    mean = float((values * weights).sum() / total)
+    std = float(np.sqrt((weights * (values - mean) ** 2).sum() / total))
+
+    min_value, max_value = int(values[0]), int(values[-1])
+    if max_value > min_value:
+        bins = np.linspace(min_value, max_value, min(10, max_value - min_value + 1))
+        hist, bin_edges = np.histogram(values, bins=bins, weights=weights)
+        distribution = {
+            f"{int(bin_edges[i])}-{int(bin_edges[i+1])}": int(hist[i])
+            for i in range(len(hist))
+        }
+    else:
+        distribution = {str(min_value): int(total)}
+
+    return {
+        f"{prefix}_mean": mean,
+        f"{prefix}_std": std,
+        f"{prefix}_min": min_value,
+        f"{prefix}_max": max_value,
+        f"{prefix}_distribution": distribution
+    }
+
+
+def _get_encoding():
+    try:
+        return tiktoken.get_encoding("cl100k_base")  # GPT-4 encoding
+    except Exception:
+        return None
+
+
+class MetricAccumulator:
+    """
+    Partial metric state for a subset of prompt ids.
+
+    Prompt texts are grouped by hash across shards, so prompts sharing a text but
+    living in different shards still form one group as in the single-pass metrics.
+    """
+
+    def __init__(self):
+        self.prompt_count = 0
+        self.completion_key_count = 0
+        self.aligned_outputs = 0
+        self.aligned_lengths: Counter = Counter()
+        # Over every completion, matching basic_metrics and the summary
+        self.char_lengths: Counter = Counter()
+        self.token_lengths: Counter = Counter()
+        self.token_unit = "token"
+        # Keyed counts
+        self.prompt_texts: Counter = Counter()
+        # prompt text -> output -> count, for outputs whose prompt_id is a known prompt
+        self.groups: Dict[str, Counter] = {}
+        self.outputs: Counter = Counter()
+
+    def add(self, prompts: Dict[str, str], completions: Dict[str, List[str]]) -> "MetricAccumulator":
+        """Fold one shard of prompts and their completions into the accumulator."""
+        encoding = _get_encoding()
+        if encoding is None:
+            self.token_unit = "word"
+
+        self.prompt_count += len(prompts)
+        self.completion_key_count += len(completions)
+        prompt_hashes = {prompt_id: _digest(prompt_text) for prompt_id, prompt_text in prompts.items()}
+        self.prompt_texts.update(prompt_hashes.values())
+
+        for prompt_id, output_list in completions.items():
+            output_hashes = [_digest(output) for output in output_list]
+            self.outputs.update(output_hashes)
+            for output in output_list:
+                self.char_lengths[len(output)] += 1
+                self.token_lengths[self._count_tokens(encoding, output)] += 1
+            text_hash = prompt_hashes.get(prompt_id)
+            if text_hash is not None and output_list:
+                self.groups.setdefault(text_hash, Counter()).update(output_hashes)
+                self.aligned_lengths.update(len(output) for output in output_list)
+                self.aligned_outputs += len(output_list)
+        return self
+
+    @staticmethod
+    def _count_tokens(encoding, output: str) -> int:
+        if encoding is None:
+            return len(output.split())
+        try:
+            return len(encoding.encode(output))
+        except Exception:
+            # Fallback to word count
+            return len(output.split())
+
+    def merge(self, other: "MetricAccumulator") -> "MetricAccumulator":
+        """Add another accumulator's counts into this one."""
+        self.prompt_count += other.prompt_count
+        self.completion_key_count += other.completion_key_count
+        self.aligned_outputs += other.aligned_outputs
+        self.aligned_lengths.update(other.aligned_lengths)
+        self.char_lengths.update(other.char_lengths)
+        self.token_lengths.update(other.token_lengths)
+        if other.token_unit == "word":
+            self.token_unit = "word"
+        self.prompt_texts.update(other.prompt_texts)
+        for text_hash, group in other.groups.items():
+            self.groups.setdefault(text_hash, Counter()).update(group)
+        self.outputs.update(other.outputs)
+        return self
+
+    def totals(self) -> Dict[str, Any]:
+        """JSON-safe additive state (everything but the keyed counts)."""
+        return {
+            "prompt_count": self.prompt_count,
+            "completion_key_count": self.completion_key_count,
+            "aligned_outputs": self.aligned_outputs,
+            "aligned_lengths": {str(k): v for k, v in self.aligned_lengths.items()},
+            "char_lengths": {str(k): v for k, v in self.char_lengths.items()},
+            "token_lengths": {str(k): v for k, v in self.token_lengths.items()},
+            "token_unit": self.token_unit,
+        }
+
+    def split(self, partitions: int) -> List[Dict[str, Any]]:
+        """
+        JSON-safe keyed counts split into `partitions` parts by hash.
+
+        Prompt texts and their groups are split by prompt text hash; output counts (over
+        every completion, and over aligned outputs for H(Y)) by output hash.
+        """
+        parts = [{"prompt_texts": {}, "groups": {}, "aligned": {}, "outputs": {}} for _ in range(partitions)]
+        for text_hash, count in self.prompt_texts.items():
+            parts[partition_of(text_hash, partitions)]["prompt_texts"][text_hash] = count
+        aligned: Counter = Counter()
+        for text_hash, group in self.groups.items():
+            parts[partition_of(text_hash, partitions)]["groups"][text_hash] = dict(group)
+            aligned.update(group)
+        for name, counts in (("aligned", aligned), ("outputs", self.outputs)):
+            for output_hash, count in counts.items():
+                parts[partition_of(output_hash, partitions)][name][output_hash] = count
+        return parts
+
+    def finalize(self) -> Dict[str, Any]:
+        """Results dict in the shape produced by AnalysisService.compute_all_metrics."""
+        return finalize_results([self.totals()], [reduce_partition(self.split(1))])
+
+
+def reduce_partition(parts: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge the same partition of several shards (MetricAccumulator.split() parts) into sums.
+
+    Sums over partitions add up to the whole job's: the distinct key counts, c*log2(c) sums
+    of prompt texts and aligned outputs, and T_g * H_g of the prompt-text groups (all of them,
+    and those with 2+ outputs for empowerment).
+    """
+    prompt_texts: Counter = Counter()
+    groups: Dict[str, Counter] = {}
+    aligned: Counter = Counter()
+    outputs: Counter = Counter()
+    for part in parts:
+        prompt_texts.update(part["prompt_texts"])
+        for text_hash, group in part["groups"].items():
+            groups.setdefault(text_hash, Counter()).update(group)
+        aligned.update(part["aligned"])
+        outputs.update(part["outputs"])
+
+    conditional = 0.0
+    empowerment = 0.0
+    empowerment_weight = 0
+    for group in groups.values():
+        group_total = sum(group.values())
+        weighted_entropy = group_total * _entropy(group_total, _plogp(group.values()))
+        conditional += weighted_entropy
+        if group_total >= 2:
+            empowerment += weighted_entropy
+            empowerment_weight += group_total
+    return {
+        "unique_inputs": len(prompt_texts),
+        "input_plogp": _plogp(prompt_texts.values()),
+        "conditional_entropy": conditional,
+        "empowerment": empowerment,
+        "empowerment_weight": empowerment_weight,
+        "distinct_aligned": len(aligned),
+        "aligned_plogp": _plogp(aligned.values()),
+        "unique_outputs": len(outputs),
+    }
+
+
+def merge_totals(totals: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add MetricAccumulator.totals() of several shards."""
+    merged = {
+        "prompt_count": 0, "completion_key_count": 0, "aligned_outputs": 0,
+        "aligned_lengths": Counter(), "char_lengths": Counter(), "token_lengths": Counter(), "token_unit": "token",
+    }
+    for part in totals:
+        for key in ("prompt_count", "completion_key_count", "aligned_outputs"):
+            merged[key] += part[key]
+        for key in ("aligned_lengths", "char_lengths", "token_lengths"):
+            merged[key].update({int(k): v for k, v in part[key].items()})
+        if part["token_unit"] == "word":
+            merged["token_unit"] = "word"
+    return merged
+
+
+def finalize_results(totals: Iterable[Dict[str, Any]], reduced: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Results dict of compute_all_metrics from every shard's totals and every partition's sums."""
+    t = merge_totals(totals)
+    sums: Counter = Counter()
+    for partition in reduced:
+        sums.update(partition)
+    return {
+        "information_theory": _information_theory(t, sums),
+        "diversity": _diversity(t, sums),
+        "character_metrics": _length_stats(t["char_lengths"], "character_count"),
+        "token_metrics": _length_stats(t["token_lengths"], f"{t['token_unit']}_count"),
+        "summary": _summary(t, sums),
+    }
+
+
+def _information_theory(t: Dict[str, Any], sums: Counter) -> Dict[str, float]:
+    input_entropy = _entropy(t["prompt_count"], sums["input_plogp"])
+
+    response_entropy = 0.0
+    information_gain = 0.0
+    aligned = t["aligned_outputs"]
+    if t["prompt_count"] and t["completion_key_count"] and aligned:
+        # H(Y|X): per prompt-text entropy weighted by the group's share of outputs
+        response_entropy = sums["conditional_entropy"] / aligned
+        # I(X;Y) = H(Y) - H(Y|X)
+        information_gain = _entropy(aligned, sums["aligned_plogp"]) - response_entropy
+
+    return {
+        "input_entropy": input_entropy,
+        "response_entropy": response_entropy,
+        "information_gain": information_gain,
+        "normalized_information_gain": information_gain / input_entropy if input_entropy > 0 else 0.0
+    }
+
+
+def _diversity(t: Dict[str, Any], sums: Counter) -> Dict[str, float]:
+    if not t["prompt_count"] or not t["completion_key_count"]:
+        return {
+            "empowerment": 0.0,
+            "average_outputs_per_input": 0.0,
+            "unique_outputs_ratio": 0.0,
+            "output_length_variance": 0.0
+        }
+
+    length_variance = 0.0
+    if t["aligned_lengths"]:
+        lengths = np.array(list(t["aligned_lengths"]), dtype=float)
+        weights = np.array(list(t["aligned_lengths"].values()), dtype=float)
+        mean = (lengths * weights).sum() / weights.sum()
+        length_variance = float((weights * (lengths - mean) ** 2).sum() / weights.sum())
+
+    aligned = t["aligned_outputs"]
+    # Empowerment: output entropy of each prompt group with 2+ outputs, weighted by size
+    weight = sums["empowerment_weight"]
+    return {
+        "empowerment": sums["empowerment"] / weight if weight > 0 else 0.0,
+        "average_outputs_per_input": aligned / t["prompt_count"],
+        "unique_outputs_ratio": sums["distinct_aligned"] / aligned if aligned else 0.0,
+        "output_length_variance": length_variance
+    }
+
+
+def _summary(t: Dict[str, Any], sums: Counter) -> Dict[str, Any]:
+    total_inputs = t["prompt_count"]
+    total_outputs = sum(t["char_lengths"].values())
+    return {
+        "total_inputs": total_inputs,
+        "total_outputs": total_outputs,
+        "unique_inputs": sums["unique_inputs"],
+        "unique_outputs": sums["unique_outputs"],
+        "avg_outputs_per_input": total_outputs / total_inputs if total_inputs > 0 else 0,
+        "input_coverage": t["completion_key_count"] / total_inputs if total_inputs > 0 else 0
+    }
@@ -0,0 +1,172 @@
+"""
+Duplicate and overlap analysis of completion datasets.
+
+Every distinct completion string is hashed once (64-bit BLAKE2b), both as-is ("exact") and
+after normalization (casefolded, whitespace collapsed). Overlap between datasets is then a
+hash join done with sorted arrays: the (key, dataset) entries of all datasets are sorted
+together, and every group of entries with the same key contributes one shared key to each
+pair of datasets in it. Two kinds of keys are joined:
+- global: the completion hash alone (identical completions anywhere in the datasets)
+- per_prompt: (prompt, completion hash) (identical completions for the same prompt)
+
+Matrices are k x k in dataset order; the diagonal holds each dataset's own distinct keys.
+"""
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Significant digits kept in Jaccard matrix cells
+JACCARD_PRECISION = 4
+
+
+def normalize_completion(text: str) -> str:
+    """Casefold and collapse runs of whitespace, so formatting-only differences compare equal."""
+    return " ".join(text.casefold().split())
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def hash_completions(
+    completions_by_dataset: Dict[str, Dict[str, List[str]]], prompt_ids: List[str]
+) -> Dict[str, np.ndarray]:
+    """
+    Flat arrays with one entry per completion of every dataset.
+
+    "dataset" is the dataset's position, "prompt" the prompt's position in prompt_ids
+    (completions of other prompts are skipped), "exact"/"normalized" the uint64 hashes.
+    """
+    prompt_index = {prompt_id: i for i, prompt_id in enumerate(prompt_ids)}
+    flat: List[str] = []
+    dataset_codes: List[int] = []
+    prompt_codes: List[int] = []
+    counts: List[int] = []
+    for code, completions in enumerate(completions_by_dataset.values()):
+        for prompt_id, outputs in completions.items():
+            prompt_code = prompt_index.get(prompt_id)
+            if prompt_code is None or not isinstance(outputs, list):
+                continue
+            flat.extend(outputs)
+            dataset_codes.append(code)
+            prompt_codes.append(prompt_code)
+            counts.append(len(outputs))
+
+    # Completions repeat across prompts and datasets: hash each distinct string once
+    distinct = {text: i for i, text in enumerate(dict.fromkeys(flat))}
+    text_codes = np.fromiter(map(distinct.__getitem__, flat), np.int64, len(flat))
+    exact = np.fromiter((_hash64(text) for text in distinct), np.uint64, len(distinct))
+    normalized = np.fromiter((_hash64(normalize_completion(text)) for text in distinct), np.uint64, len(distinct))
+    return {
+        "dataset": np.repeat(np.array(dataset_codes, dtype=np.int64), counts),
+        "prompt": np.repeat(np.array(prompt_codes, dtype=np.int64), counts),
+        "exact": exact[text_codes],
+        "normalized": normalized[text_codes],
+    }
+
+
+def _group_pairs(keys: List[np.ndarray], dataset: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sort-merge self-join of (keys..., dataset) entries.
+
+    Returns (distinct, left, right): the distinct entries' sort order into the inputs, and
+    for every pair of distinct entries sharing the same keys, their positions in `distinct`
+    (left's dataset < right's dataset).
+    """
+    order = np.lexsort((dataset, *reversed(keys)))
+    same_keys = np.ones(order.size, dtype=bool)
+    same_keys[0:1] = False
+    for column in keys:
+        same_keys[1:] &= column[order][1:] == column[order][:-1]
+    duplicate = same_keys.copy()
+    duplicate[1:] &= dataset[order][1:] == dataset[order][:-1]
+    distinct = order[~duplicate]
+    same_keys = same_keys[~duplicate]
+
+    # Position of each distinct entry within its group of equal keys, and the group's size
+    starts = np.flatnonzero(~same_keys)
+    sizes = np.diff(np.append(starts, distinct.size))
+    position = np.arange(distinct.size) - np.repeat(starts, sizes)
+    later = np.repeat(sizes, sizes) - position - 1
+    left = np.repeat(np.arange(distinct.size), later)
+    # Offsets 1..later of each left entry to the entries after it in its group
+    offsets = np.arange(left.size) - np.repeat(np.cumsum(later) - later, later) + 1
+    return distinct, left, left + offsets
+
+
+def _symmetric(counts: np.ndarray, diagonal: np.ndarray) -> np.ndarray:
+    matrix = counts + counts.T
+    np.fill_diagonal(matrix, diagonal)
+    return matrix
+
+
+def _jaccard(shared: np.ndarray) -> List[List[Optional[float]]]:
+    distinct = np.diag(shared)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        jaccard = shared / (distinct[:, None] + distinct[None, :] - shared)
+    return [
+        [float(f"{value:.{JACCARD_PRECISION}g}") if np.isfinite(value) else None for value in row]
+        for row in jaccard.tolist()
+    ]
+
+
+def _overlap(hashes: np.ndarray, arrays: Dict[str, np.ndarray], k: int) -> Dict[str, Any]:
+    dataset = arrays["dataset"]
+    prompt = arrays["prompt"]
+
+    # Global: distinct completions shared by each pair of datasets
+    distinct, left, right = _group_pairs([hashes], dataset)
+    ds = dataset[distinct]
+    shared = np.bincount(ds[left] * k + ds[right], minlength=k * k).reshape(k, k)
+    global_shared = _symmetric(shared, np.bincount(ds, minlength=k))
+
+    # Per prompt: (prompt, completion) keys shared, and prompts with at least one shared completion
+    distinct, left, right = _group_pairs([prompt, hashes], dataset)
+    ds, pr = dataset[distinct], prompt[distinct]
+    pair_codes = ds[left] * k + ds[right]
+    shared = np.bincount(pair_codes, minlength=k * k).reshape(k, k)
+    prompt_shared = _symmetric(shared, np.bincount(ds, minlength=k))
+    prompt_pairs = np.unique(pr[left] * (k * k) + pair_codes)
+    prompts = np.bincount(prompt_pairs % (k * k), minlength=k * k).reshape(k, k)
+    covered = np.unique(pr * k + ds)
+    prompt_counts = _symmetric(prompts, np.bincount(covered % k, minlength=k))
+
+    return {
+        "global": {"shared": global_shared.tolist(), "jaccard": _jaccard(global_shared)},
+        "per_prompt": {
+            "shared": prompt_shared.tolist(),
+            "jaccard": _jaccard(prompt_shared),
+            "prompts": prompt_counts.tolist(),
+        },
+    }
+
+
+def calculate_overlap(
+    completions_by_dataset: Dict[str, Dict[str, List[str]]], prompt_ids: List[str]
+) -> Dict[str, Any]:
+    """
+    Duplicate and overlap statistics of the datasets' completions for prompt_ids.
+
+    For "exact" and "normalized" keys: global.shared[i][j] counts distinct completions of
+    both datasets i and j, per_prompt.shared[i][j] distinct (prompt, completion) pairs of
+    both, per_prompt.prompts[i][j] prompts where they gave at least one identical
+    completion (diagonal: prompts the dataset covers); jaccard is shared over the union.
+    "per_dataset" gives each dataset's number of completions and how many of them repeat
+    a completion it gave for the same prompt (duplicates).
+    """
+    names = list(completions_by_dataset)
+    k = len(names)
+    arrays = hash_completions(completions_by_dataset, prompt_ids)
+    totals = np.bincount(arrays["dataset"], minlength=k)
+    result: Dict[str, Any] = {"datasets": names, "normalization": "casefold, collapsed whitespace", "per_dataset": {}}
+    for kind in ("exact", "normalized"):
+        result[kind] = _overlap(arrays[kind], arrays, k)
+    for i, name in enumerate(names):
+        result["per_dataset"][name] = {
+            "completions": int(totals[i]),
+            "duplicates": {
+                kind: int(totals[i] - result[kind]["per_prompt"]["shared"][i][i]) for kind in ("exact", "normalized")
+            },
+        }
+    return result
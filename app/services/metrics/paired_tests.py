@@ -0,0 +1,181 @@
+"""
+Paired statistical tests for completion datasets aligned by prompt_id.
+
+Each dataset is reduced to one value per prompt for every metric, giving a (prompt x dataset)
+matrix per metric with NaN where a dataset has no completions for the prompt. All pairs of
+datasets are then tested at once on the prompts both of them cover:
+- paired t-test of the per-prompt differences, with Cohen's d_z and a 95% CI of the mean difference
+- Wilcoxon signed-rank test (zero differences dropped)
+- the distribution of the per-prompt differences (quantiles and win/loss/tie counts)
+
+Unlike the independent-sample tests in statistical_tests.py, the prompt-to-prompt variation
+cancels out of the differences, so real differences are detected with far fewer prompts.
+"""
+import warnings
+from itertools import chain
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from scipy import stats
+
+from .statistical_tests import _get_friendly_metric_name, _finite, select_pairs
+
+PAIRED_METRICS = ["completion_length", "completion_count", "unique_completions", "avg_word_count", "response_diversity"]
+DELTA_QUANTILES = {"p05": 0.05, "p25": 0.25, "median": 0.5, "p75": 0.75, "p95": 0.95}
+
+
+def _dataset_values(
+    completions: Dict[str, List[str]], position: Dict[str, int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rows (indices into the prompt order) of the prompts with completions in one dataset and
+    their PAIRED_METRICS values, shape (len(PAIRED_METRICS), rows).
+
+    One flat pass over the dataset's outputs: per-output lengths and word counts are mapped
+    in C and summed per prompt with np.add.reduceat.
+    """
+    prompt_ids = [prompt_id for prompt_id, outputs in completions.items() if outputs and prompt_id in position]
+    if not prompt_ids:
+        return np.empty(0, dtype=int), np.empty((len(PAIRED_METRICS), 0))
+    lists = [completions[prompt_id] for prompt_id in prompt_ids]
+    rows = np.fromiter(map(position.__getitem__, prompt_ids), dtype=int, count=len(prompt_ids))
+    counts = np.fromiter(map(len, lists), dtype=float, count=len(lists))
+    flat = list(chain.from_iterable(lists))
+    starts = np.concatenate([[0], np.cumsum(counts[:-1])]).astype(int)
+    chars = np.add.reduceat(np.fromiter(map(len, flat), dtype=float, count=len(flat)), starts)
+    words = np.add.reduceat(np.fromiter(map(len, map(str.split, flat)), dtype=float, count=len(flat)), starts)
+    unique = np.fromiter(map(len, map(set, lists)), dtype=float, count=len(lists))
+    return rows, np.stack([chars / counts, counts, unique, words / counts, unique / counts])
+
+
+def build_metric_matrices(
+    completions_by_dataset: Dict[str, Dict[str, List[str]]], prompt_ids: List[str]
+) -> Dict[str, np.ndarray]:
+    """
+    Per-prompt metric matrices of shape (len(prompt_ids), number of datasets).
+
+    Column j holds the j-th dataset of completions_by_dataset; a prompt without completions
+    in a dataset is NaN in that column. Each dataset's values are computed once for the
+    prompts it covers and scattered into its column.
+    """
+    position = {prompt_id: row for row, prompt_id in enumerate(prompt_ids)}
+    values = np.full((len(PAIRED_METRICS), len(prompt_ids), len(completions_by_dataset)), np.nan)
+    for col, completions in enumerate(completions_by_dataset.values()):
+        rows, dataset_values = _dataset_values(completions, position)
+        values[:, rows, col] = dataset_values
+    return {name: values[m] for m, name in enumerate(PAIRED_METRICS)}
+
+
+def paired_statistics(
+    matrix: np.ndarray, pairs: Optional[Tuple[np.ndarray, np.ndarray]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Paired tests between pairs of columns (default: every pair a < b) of a (prompt x dataset) matrix.
+
+    Returns arrays with one entry per pair. A pair whose differences are all equal has an
+    undefined t statistic: it is reported as 0 with p = 1 when the difference is 0 and
+    p = 0 otherwise.
+    """
+    a, b = pairs if pairs is not None else np.triu_indices(matrix.shape[1], 1)
+    deltas = matrix[:, a] - matrix[:, b]
+    valid = np.isfinite(deltas)
+    n = valid.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_a = np.where(valid, matrix[:, a], 0.0).sum(axis=0) / n
+        mean_b = np.where(valid, matrix[:, b], 0.0).sum(axis=0) / n
+        filled = np.where(valid, deltas, 0.0)
+        mean = filled.sum(axis=0) / n
+        sd = np.sqrt((np.where(valid, deltas - mean, 0.0) ** 2).sum(axis=0) / (n - 1))
+        se = sd / np.sqrt(n)
+        df = n - 1
+        t = mean / se
+        degenerate = (n >= 2) & (sd == 0)
+        t = np.where(degenerate | ~np.isfinite(t), 0.0, t)
+        p = np.where(degenerate, np.where(mean == 0, 1.0, 0.0), 2 * stats.t.sf(np.abs(t), np.maximum(df, 1)))
+        effect = np.where(sd > 0, mean / sd, 0.0)
+        margin = stats.t.ppf(0.975, np.maximum(df, 1)) * se
+
+    with warnings.catch_warnings():
+        # Pairs with too few non-zero differences come back as NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        wilcoxon = stats.wilcoxon(deltas, axis=0, nan_policy="omit", zero_method="wilcox")
+        quantiles = np.nanquantile(deltas, list(DELTA_QUANTILES.values()), axis=0)
+
+    return {
+        "a": a,
+        "b": b,
+        "n": n,
+        "mean_a": mean_a,
+        "mean_b": mean_b,
+        "mean": mean,
+        "sd": sd,
+        "t": t,
+        "p": p,
+        "df": df,
+        "effect": effect,
+        "ci_lower": mean - margin,
+        "ci_upper": mean + margin,
+        "wilcoxon_statistic": np.atleast_1d(wilcoxon.statistic),
+        "wilcoxon_p": np.atleast_1d(wilcoxon.pvalue),
+        "quantiles": quantiles,
+        "a_greater": (deltas > 0).sum(axis=0),
+        "b_greater": (deltas < 0).sum(axis=0),
+        "ties": (deltas == 0).sum(axis=0),
+    }
+
+
+def run_paired_tests(
+    completions_by_dataset: Dict[str, Dict[str, List[str]]],
+    prompt_ids: List[str],
+    only: Optional[Set[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Paired tests of every pair of completion datasets over the prompts both cover
+    (only the pairs involving a dataset in `only`, when given).
+
+    Entries have the fields of run_statistical_tests (dataset values are means over the
+    paired prompts, effect_size is Cohen's d_z) plus test="paired", n_pairs, the Wilcoxon
+    signed-rank result and the distribution of per-prompt differences (a - b).
+    """
+    dataset_names = list(completions_by_dataset.keys())
+    if len(dataset_names) < 2 or not prompt_ids:
+        return []
+
+    pairs = select_pairs(dataset_names, only)
+    if not len(pairs[0]):
+        return []
+    metrics = []
+    for metric_name, matrix in build_metric_matrices(completions_by_dataset, prompt_ids).items():
+        result = paired_statistics(matrix, pairs)
+        for i in range(len(result["a"])):
+            n_pairs = int(result["n"][i])
+            if n_pairs < 2:
+                continue
+            distribution = {
+                "mean": float(result["mean"][i]),
+                "std": float(result["sd"][i]),
+                **{key: float(result["quantiles"][q, i]) for q, key in enumerate(DELTA_QUANTILES)},
+                "a_greater": int(result["a_greater"][i]),
+                "b_greater": int(result["b_greater"][i]),
+                "ties": int(result["ties"][i]),
+            }
+            metrics.append({
+                "name": _get_friendly_metric_name(metric_name),
+                "test": "paired",
+                "dataset_a": dataset_names[result["a"][i]],
+                "dataset_b": dataset_names[result["b"][i]],
+                "dataset_a_value": float(result["mean_a"][i]),
+                "dataset_b_value": float(result["mean_b"][i]),
+                "statistical_significance": _finite(result["p"][i], 1.0),
+                "effect_size": _finite(result["effect"][i], 0.0),
+                "confidence_interval_lower": _finite(result["ci_lower"][i], 0.0),
+                "confidence_interval_upper": _finite(result["ci_upper"][i], 0.0),
+                "test_statistic": _finite(result["t"][i], 0.0),
+                "degrees_of_freedom": int(result["df"][i]),
+                "n_pairs": n_pairs,
+                "wilcoxon_statistic": _finite(result["wilcoxon_statistic"][i], 0.0),
+                "wilcoxon_p_value": _finite(result["wilcoxon_p"][i], 1.0),
+                "delta_distribution": distribution,
+            })
+    return metrics
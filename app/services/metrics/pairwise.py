@@ -0,0 +1,110 @@
+"""
+Multiple-comparison correction and k x k matrices for N-way comparisons.
+
+A comparison of k datasets runs k(k-1)/2 tests per metric, so uncorrected p-values below
+0.05 turn up by chance alone. Every test row gets adjusted p-values (q-values), using
+each metric's pairs as one family:
+- q_value_holm: Holm step-down, controlling the family-wise error rate
+- q_value_bh: Benjamini-Hochberg step-up, controlling the false discovery rate
+pairwise_matrices folds the rows into one k x k matrix per metric (p-values, both
+q-values and effect sizes), compact enough to render as heatmaps for 50+ datasets.
+"""
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+CORRECTIONS = {"holm": "q_value_holm", "bh": "q_value_bh"}
+DEFAULT_CORRECTION = "bh"
+MATRIX_FIELDS = {
+    "p_value": "statistical_significance",
+    "q_holm": "q_value_holm",
+    "q_bh": "q_value_bh",
+    "effect_size": "effect_size",
+}
+# Significant digits kept in matrix cells
+MATRIX_PRECISION = 4
+
+
+def holm_adjust(p_values: np.ndarray) -> np.ndarray:
+    """Holm-adjusted p-values, in the order of p_values."""
+    p = np.asarray(p_values, dtype=float)
+    m = p.size
+    if not m:
+        return p
+    order = np.argsort(p)
+    adjusted = np.minimum(np.maximum.accumulate((m - np.arange(m)) * p[order]), 1.0)
+    result = np.empty(m)
+    result[order] = adjusted
+    return result
+
+
+def bh_adjust(p_values: np.ndarray) -> np.ndarray:
+    """Benjamini-Hochberg adjusted p-values, in the order of p_values."""
+    p = np.asarray(p_values, dtype=float)
+    m = p.size
+    if not m:
+        return p
+    order = np.argsort(p)
+    scaled = p[order] * m / np.arange(1, m + 1)
+    adjusted = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1], 1.0)
+    result = np.empty(m)
+    result[order] = adjusted
+    return result
+
+
+def add_corrected_p_values(metrics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Set q_value_holm and q_value_bh on every test row (in place), one family per metric name."""
+    families: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for row in metrics:
+        families[row["name"]].append(row)
+    for rows in families.values():
+        p = np.array([row.get("statistical_significance", 1.0) for row in rows], dtype=float)
+        for row, holm, bh in zip(rows, holm_adjust(p), bh_adjust(p)):
+            row["q_value_holm"] = float(holm)
+            row["q_value_bh"] = float(bh)
+    return metrics
+
+
+def corrected_p_value(row: Dict[str, Any], correction: Optional[str] = None) -> float:
+    """A row's q-value under `correction` ("holm" or "bh"), falling back to its raw p-value."""
+    key = CORRECTIONS.get(correction or DEFAULT_CORRECTION, CORRECTIONS[DEFAULT_CORRECTION])
+    return row.get(key, row.get("statistical_significance", 1.0))
+
+
+def _compact(matrix: np.ndarray) -> List[List[Optional[float]]]:
+    return [
+        [float(f"{value:.{MATRIX_PRECISION}g}") if np.isfinite(value) else None for value in row]
+        for row in matrix.tolist()
+    ]
+
+
+def pairwise_matrices(metrics: List[Dict[str, Any]], dataset_names: List[str]) -> Dict[str, Any]:
+    """
+    k x k matrices per metric from corrected test rows.
+
+    Cell [i][j] compares datasets[i] (as dataset_a) with datasets[j]; p- and q-values are
+    symmetric and effect sizes change sign across the diagonal. Untested pairs and the
+    diagonal are null.
+    """
+    index = {name: i for i, name in enumerate(dataset_names)}
+    k = len(dataset_names)
+    grids: Dict[str, Dict[str, np.ndarray]] = {}
+    for row in metrics:
+        i, j = index.get(row["dataset_a"]), index.get(row["dataset_b"])
+        if i is None or j is None:
+            continue
+        grid = grids.get(row["name"])
+        if grid is None:
+            grid = grids[row["name"]] = {field: np.full((k, k), np.nan) for field in MATRIX_FIELDS}
+        for field, key in MATRIX_FIELDS.items():
+            value = row.get(key, np.nan)
+            grid[field][i, j] = value
+            grid[field][j, i] = -value if field == "effect_size" else value
+    return {
+        "datasets": dataset_names,
+        "metrics": {
+            name: {field: _compact(matrix) for field, matrix in grid.items()}
+            for name, grid in grids.items()
+        },
+    }
@@ -0,0 +1,105 @@
+"""
+Stratified prompt samples for preview comparisons.
+
+A preview runs the comparison's tests on a sample of the aligned prompts (those with
+completions in at least one dataset) before the exact run. Comparisons draw the sample from
+the first-output lengths stored in their alignment index, so only the sampled prompts'
+completions are loaded. Prompts are stratified by which
+datasets cover them and by the quartile of their mean first-output length, and each
+stratum gets its proportional share of the sample (at least one prompt while the sample
+has room), so coverage gaps and long/short answers are represented like in the full set.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import stats
+
+# comparison_config["preview_sample"] = True samples this many prompts
+PREVIEW_SAMPLE_SIZE = 1000
+LENGTH_BUCKETS = 4
+
+
+def _prompt_strata(lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aligned rows of a prompts x datasets matrix of first-output lengths (NaN where a dataset
+    has no outputs for the prompt) and their (presence mask, length quartile) strata.
+    """
+    present = ~np.isnan(lengths)
+    aligned = np.flatnonzero(present.any(axis=1))
+    if not aligned.size:
+        return aligned, np.empty((0, 2), dtype=np.int64)
+    masks = present[aligned] @ (np.int64(1) << np.arange(lengths.shape[1], dtype=np.int64))
+    means = np.nanmean(lengths[aligned], axis=1)
+    edges = np.quantile(means, np.linspace(0, 1, LENGTH_BUCKETS + 1)[1:-1])
+    buckets = np.searchsorted(edges, means, side="right")
+    return aligned, np.column_stack([masks, buckets])
+
+
+def sample_prompts(
+    prompt_ids: Sequence[str], lengths: np.ndarray, size: int, seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Stratified random sample of at most `size` aligned prompts, from the prompts' first-output
+    lengths (row i of `lengths` belongs to prompt_ids[i]; see _prompt_strata).
+
+    Returns {"prompt_ids" (sorted), "population" (aligned prompts), "strata" (non-empty
+    strata)}. Every aligned prompt is returned when there are at most `size` of them.
+    """
+    aligned, strata = _prompt_strata(lengths)
+    ids = np.asarray(prompt_ids, dtype=object)[aligned]
+    if not aligned.size:
+        return {"prompt_ids": [], "population": 0, "strata": 0}
+    keys, inverse = np.unique(strata, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    if len(ids) <= size:
+        return {"prompt_ids": ids.tolist(), "population": len(ids), "strata": len(keys)}
+
+    # Proportional allocation by largest remainder, with at least one prompt per stratum if possible
+    counts = np.bincount(inverse, minlength=len(keys))
+    quotas = size * counts / counts.sum()
+    allocation = np.floor(quotas).astype(int)
+    if size >= len(keys):
+        allocation = np.maximum(allocation, 1)
+    while allocation.sum() > size:
+        # The minimums overshot: take back from the most over-allocated stratum
+        allocation[np.argmax(np.where(allocation > 1, allocation - quotas, -np.inf))] -= 1
+    remainders = np.where(allocation < counts, quotas - allocation, -np.inf)
+    for index in np.argsort(-remainders, kind="stable")[:size - allocation.sum()]:
+        allocation[index] += 1
+
+    # Members of each stratum in prompt order, stratum after stratum
+    members = np.split(np.argsort(inverse, kind="stable"), np.cumsum(counts)[:-1])
+    rng = np.random.default_rng(seed)
+    sample: List[str] = []
+    for group, take in zip(members, allocation):
+        sample.extend(ids[group[rng.choice(len(group), size=take, replace=False)]])
+    return {"prompt_ids": sorted(sample), "population": len(ids), "strata": len(keys)}
+
+
+def stratified_sample(
+    completions_by_dataset: Dict[str, Dict[str, List[str]]],
+    prompt_ids: List[str],
+    size: int,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """sample_prompts from completions in memory: the lengths are those of each prompt's first output."""
+    outputs = list(completions_by_dataset.values())
+    lengths = np.array(
+        [[len(c[p][0]) if c.get(p) else np.nan for c in outputs] for p in prompt_ids], dtype=float
+    ).reshape(len(prompt_ids), len(outputs))
+    return sample_prompts(prompt_ids, lengths, size, seed=seed)
+
+
+def add_mean_intervals(summary: Dict[str, Dict[str, Dict[str, Any]]], confidence: float = 0.95) -> Dict[str, Any]:
+    """Add ci_lower/ci_upper of each mean to calculate_summary_statistics output (in place)."""
+    for metrics in summary.values():
+        for values in metrics.values():
+            n = values.get("count", 0)
+            if n < 2:
+                values["ci_lower"] = values["ci_upper"] = values.get("mean", 0.0)
+                continue
+            # summary std is the population std; convert to the sample std for the interval
+            margin = stats.t.ppf((1 + confidence) / 2, n - 1) * values["std"] * np.sqrt(n / (n - 1)) / np.sqrt(n)
+            values["ci_lower"] = float(values["mean"] - margin)
+            values["ci_upper"] = float(values["mean"] + margin)
+    return summary
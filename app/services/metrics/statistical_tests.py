@@ -2,7 +2,7 @@
 Statistical tests for comparing completion datasets.
 """
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Set, Tuple
 from scipy import stats
 import math
 
@@ -19,12 +19,20 @@ def _get_friendly_metric_name(metric_key: str) -> str:
     return friendly_names.get(metric_key, metric_key.replace("_", " ").title())
 
 
-def run_statistical_tests(completions_by_dataset: Dict[str, Dict[str, List[str]]]) -> List[Dict[str, Any]]:
+def run_statistical_tests(
+    completions_by_dataset: Dict[str, Dict[str, List[str]]],
+    dataset_metrics: Optional[Dict[str, Dict[str, List[float]]]] = None,
+    only: Optional[Set[str]] = None
+) -> List[Dict[str, Any]]:
     """
     Run statistical tests comparing multiple completion datasets.
     
     Args:
         completions_by_dataset: Dict mapping dataset_name -> {prompt_id -> [completions]}
+        dataset_metrics: Per-dataset metric values (calculate_dataset_metrics), when the
+            caller already has them
+        only: Test only the pairs involving one of these datasets (e.g. the changed
+            datasets of a refreshed comparison)
     
     Returns:
         List of statistical metrics comparing datasets
@@ -32,47 +40,100 @@ def run_statistical_tests(completions_by_dataset: Dict[str, Dict[str, List[str]]
     dataset_names = list(completions_by_dataset.keys())
     if len(dataset_names) < 2:
         return []
-    
+    if dataset_metrics is None:
+        dataset_metrics = {name: calculate_dataset_metrics(completions_by_dataset[name]) for name in dataset_names}
+
+    # Every pair of datasets is tested at once per metric, from each dataset's values
+    pairs = select_pairs(dataset_names, only)
+    metric_names = list(dataset_metrics[dataset_names[0]].keys())
+    results = {
+        metric_name: _independent_statistics([
+            np.asarray(dataset_metrics[name].get(metric_name, []), dtype=float) for name in dataset_names
+        ], pairs)
+        for metric_name in metric_names
+    }
+
     metrics = []
-    
-    # Compare each pair of datasets
-    for i in range(len(dataset_names)):
-        for j in range(i + 1, len(dataset_names)):
-            dataset_a = dataset_names[i]
-            dataset_b = dataset_names[j]
-            
-            # Get metrics for both datasets
-            metrics_a = _calculate_dataset_metrics(completions_by_dataset[dataset_a])
-            metrics_b = _calculate_dataset_metrics(completions_by_dataset[dataset_b])
-            
-            # Run statistical tests for each metric
-            for metric_name in metrics_a.keys():
-                if metric_name in metrics_b:
-                    values_a = metrics_a[metric_name]
-                    values_b = metrics_b[metric_name]
-                    
-                    if len(values_a) > 1 and len(values_b) > 1:
-                        stat_result = _run_t_test(values_a, values_b)
-                        
-                        friendly_name = _get_friendly_metric_name(metric_name)
-                        metrics.append({
-                            "name": friendly_name,
-                            "dataset_a": dataset_a,
-                            "dataset_b": dataset_b,
-                            "dataset_a_value": np.mean(values_a),
-                            "dataset_b_value": np.mean(values_b),
-                            "statistical_significance": stat_result["p_value"],
-                            "effect_size": stat_result["effect_size"],
-                            "confidence_interval_lower": stat_result["ci_lower"],
-                            "confidence_interval_upper": stat_result["ci_upper"],
-                            "test_statistic": stat_result["statistic"],
-                            "degrees_of_freedom": stat_result["df"]
-                        })
+    for pair, (i, j) in enumerate(zip(*pairs)):
+        for metric_name, result in results.items():
+            if result["n_a"][pair] < 2 or result["n_b"][pair] < 2:
+                continue
+            metrics.append({
+                "name": _get_friendly_metric_name(metric_name),
+                "dataset_a": dataset_names[i],
+                "dataset_b": dataset_names[j],
+                "dataset_a_value": float(result["mean_a"][pair]),
+                "dataset_b_value": float(result["mean_b"][pair]),
+                "statistical_significance": _finite(result["p"][pair], 1.0),
+                "effect_size": _finite(result["effect"][pair], 0.0),
+                "confidence_interval_lower": _finite(result["ci_lower"][pair], 0.0),
+                "confidence_interval_upper": _finite(result["ci_upper"][pair], 0.0),
+                "test_statistic": _finite(result["t"][pair], 0.0),
+                "degrees_of_freedom": int(result["df"][pair])
+            })
     
     return metrics
 
 
-def _calculate_dataset_metrics(completions: Dict[str, List[str]]) -> Dict[str, List[float]]:
+def _finite(value: float, default: float) -> float:
+    return float(value) if np.isfinite(value) else default
+
+
+def select_pairs(dataset_names: List[str], only: Optional[Set[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Index arrays (a, b), a < b, of the dataset pairs to test: all of them, or those involving `only`."""
+    a, b = np.triu_indices(len(dataset_names), 1)
+    if only is not None:
+        touched = np.array([name in only for name in dataset_names], dtype=bool)
+        keep = touched[a] | touched[b]
+        a, b = a[keep], b[keep]
+    return a, b
+
+
+def _independent_statistics(
+    samples: List[np.ndarray], pairs: Optional[Tuple[np.ndarray, np.ndarray]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Welch t-tests between pairs of samples (default: every pair a < b), from each sample's moments.
+
+    Returns arrays with one entry per pair: Welch's t and p-value, Cohen's d (pooled
+    standard deviation) and a 95% CI of the difference in means.
+    """
+    samples = [s[np.isfinite(s)] for s in samples]
+    n = np.array([s.size for s in samples], dtype=float)
+    mean = np.array([s.mean() if s.size else np.nan for s in samples])
+    var = np.array([s.var(ddof=1) if s.size > 1 else np.nan for s in samples])
+    a, b = pairs if pairs is not None else np.triu_indices(len(samples), 1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        va, vb = var[a] / n[a], var[b] / n[b]
+        se = np.sqrt(va + vb)
+        diff = mean[a] - mean[b]
+        t = diff / se
+        welch_df = (va + vb) ** 2 / (va ** 2 / (n[a] - 1) + vb ** 2 / (n[b] - 1))
+        # Both samples constant: the means differ exactly or not at all
+        degenerate = (n[a] >= 2) & (n[b] >= 2) & (se == 0)
+        t = np.where(degenerate, 0.0, t)
+        p = np.where(degenerate, np.where(diff == 0, 1.0, 0.0), 2 * stats.t.sf(np.abs(t), welch_df))
+        df = n[a] + n[b] - 2
+        pooled_std = np.sqrt(((n[a] - 1) * var[a] + (n[b] - 1) * var[b]) / df)
+        effect = np.where(pooled_std > 0, diff / pooled_std, 0.0)
+        margin = stats.t.ppf(0.975, df) * se
+
+    return {
+        "n_a": n[a],
+        "n_b": n[b],
+        "mean_a": mean[a],
+        "mean_b": mean[b],
+        "t": t,
+        "p": p,
+        "df": np.nan_to_num(df),
+        "effect": effect,
+        "ci_lower": diff - margin,
+        "ci_upper": diff + margin,
+    }
+
+
+def calculate_dataset_metrics(completions: Dict[str, List[str]]) -> Dict[str, List[float]]:
     """Calculate various metrics for a single completion dataset."""
     metrics = {
         "completion_length": [],
@@ -108,69 +169,18 @@ def _calculate_dataset_metrics(completions: Dict[str, List[str]]) -> Dict[str, L
     return metrics
 
 
-def _run_t_test(values_a: List[float], values_b: List[float]) -> Dict[str, float]:
-    """Run independent t-test between two groups of values."""
-    try:
-        # Convert to numpy arrays
-        a = np.array(values_a)
-        b = np.array(values_b)
-        
-        # Remove any NaN or infinite values
-        a = a[np.isfinite(a)]
-        b = b[np.isfinite(b)]
-        
-        if len(a) < 2 or len(b) < 2:
-            return {
-                "statistic": 0.0,
-                "p_value": 1.0,
-                "effect_size": 0.0,
-                "ci_lower": 0.0,
-                "ci_upper": 0.0,
-                "df": 0
-            }
-        
-        # Run independent t-test
-        statistic, p_value = stats.ttest_ind(a, b, equal_var=False)  # Welch's t-test
-        
-        # Calculate effect size (Cohen's d)
-        pooled_std = np.sqrt(((len(a) - 1) * np.var(a, ddof=1) + (len(b) - 1) * np.var(b, ddof=1)) / (len(a) + len(b) - 2))
-        effect_size = (np.mean(a) - np.mean(b)) / pooled_std if pooled_std > 0 else 0.0
-        
-        # Calculate confidence interval for the difference in means
-        se_diff = np.sqrt(np.var(a, ddof=1) / len(a) + np.var(b, ddof=1) / len(b))
-        df = len(a) + len(b) - 2
-        t_critical = stats.t.ppf(0.975, df)  # 95% confidence interval
-        mean_diff = np.mean(a) - np.mean(b)
-        ci_lower = mean_diff - t_critical * se_diff
-        ci_upper = mean_diff + t_critical * se_diff
-        
-        return {
-            "statistic": float(statistic) if not np.isnan(statistic) else 0.0,
-            "p_value": float(p_value) if not np.isnan(p_value) else 1.0,
-            "effect_size": float(effect_size) if not np.isnan(effect_size) else 0.0,
-            "ci_lower": float(ci_lower) if not np.isnan(ci_lower) else 0.0,
-            "ci_upper": float(ci_upper) if not np.isnan(ci_upper) else 0.0,
-            "df": int(df)
-        }
-        
-    except Exception as e:
-        # Return safe defaults if calculation fails
-        return {
-            "statistic": 0.0,
-            "p_value": 1.0,
-            "effect_size": 0.0,
-            "ci_lower": 0.0,
-            "ci_upper": 0.0,
-            "df": 0
-        }
-
-
-def calculate_summary_statistics(completions_by_dataset: Dict[str, Dict[str, List[str]]]) -> Dict[str, Any]:
+def calculate_summary_statistics(
+    completions_by_dataset: Dict[str, Dict[str, List[str]]],
+    dataset_metrics: Optional[Dict[str, Dict[str, List[float]]]] = None
+) -> Dict[str, Any]:
     """Calculate summary statistics for all datasets."""
     summary = {}
     
     for dataset_name, completions in completions_by_dataset.items():
-        metrics = _calculate_dataset_metrics(completions)
+        if dataset_metrics is not None:
+            metrics = dataset_metrics[dataset_name]
+        else:
+            metrics = calculate_dataset_metrics(completions)
         
         dataset_summary = {}
         for metric_name, values in metrics.items():
@@ -0,0 +1,63 @@
+"""
+Keyset (cursor) pagination helpers for listings ordered by (created_at DESC, id DESC),
+or by a numeric column with a string tie-breaker (encode_sort_cursor).
+
+Cursors are opaque url-safe tokens encoding the sort key of the last row on a page, so
+each page is an index range scan instead of an OFFSET that re-reads every earlier row.
+"""
+import base64
+import uuid
+from datetime import datetime
+from typing import Optional, Tuple, Sequence
+from sqlalchemy import tuple_, literal
+from sqlalchemy.orm import Query
+
+# Page size of a cursor request that does not give a limit
+DEFAULT_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def encode_sort_cursor(value: float, key: str) -> str:
+    """Cursor for listings sorted by a float column with a string tie-breaker."""
+    raw = f"{value!r}|{key}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sort_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, key = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return float(value), key
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def apply_keyset(query: Query, model, cursor: Optional[str], limit: Optional[int]) -> Query:
+    """Order newest-first and continue after `cursor` (if any), returning at most `limit` rows (all when None)."""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        # Typed literals so the row-value comparison binds like the columns it is compared with
+        bound = tuple_(literal(created_at, model.created_at.type), literal(row_id, model.id.type))
+        query = query.filter(tuple_(model.created_at, model.id) < bound)
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit)
+
+
+def next_cursor(rows: Sequence, limit: int) -> Optional[str]:
+    """Cursor for the page after `rows`, or None when the listing is exhausted."""
+    if len(rows) < limit or not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor(last.created_at, last.id)
@@ -0,0 +1,177 @@
+"""
+Staged progress reporting for analysis jobs and comparisons.
+
+Progress lives in a small Redis hash per resource (an in-process dict in local mode), never
+in the results JSON, so updates are O(1) writes instead of rewriting a result blob. Every
+update is also published as a "progress" event for SSE/WebSocket clients.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import orjson
+from ..core.redis import redis_client
+from ..core.events import publish_event, add_local_listener
+
+# Progress is only interesting while a run is active or shortly after
+PROGRESS_TTL_SECONDS = 24 * 60 * 60
+# Bound for the local-mode store; oldest entries are dropped first
+LOCAL_STORE_MAX_ENTRIES = 1000
+
+PROGRESS_FIELDS = (
+    "stage", "percent", "message", "stages", "timings", "started_at", "stage_started_at", "updated_at"
+)
+
+_local_store: Dict[str, Dict[str, Any]] = {}
+_local_counters: Dict[str, int] = {}
+_local_lock = threading.Lock()
+
+
+def _progress_key(kind: str, resource_id: Any) -> str:
+    return f"oedipus:progress:{kind}:{resource_id}"
+
+
+def _store_local_progress(channel: str, event: Dict[str, Any]) -> None:
+    if event.get("event") != "progress":
+        return
+    kind = channel.split(":")[2]  # channel is "oedipus:events:<kind>:<id>"
+    record = {field: event[field] for field in PROGRESS_FIELDS}
+    key = _progress_key(kind, event["resource_id"])
+    with _local_lock:
+        _local_store.pop(key, None)
+        _local_store[key] = record
+        while len(_local_store) > LOCAL_STORE_MAX_ENTRIES:
+            _local_store.pop(next(iter(_local_store)))
+
+
+if redis_client is None:
+    add_local_listener(_store_local_progress)
+
+
+def load_progress(kind: str, resource_id: Any) -> Optional[Dict[str, Any]]:
+    """Return the latest progress record for a resource, or None if none was recorded."""
+    key = _progress_key(kind, resource_id)
+    try:
+        if redis_client is not None:
+            raw = redis_client.hgetall(key)
+            return {field: orjson.loads(value) for field, value in raw.items()} or None
+        with _local_lock:
+            record = _local_store.get(key)
+            return dict(record) if record else None
+    except Exception as e:
+        print(f"Failed to load progress for {key}: {e}")
+        return None
+
+
+class JobCancelled(Exception):
+    """Raised at a stage boundary when the run has been asked to stop."""
+
+
+def increment_progress_counter(kind: str, resource_id: Any, name: str) -> int:
+    """Atomically count finished units of work (e.g. shards) shared by several worker processes."""
+    key = f"{_progress_key(kind, resource_id)}:{name}"
+    if redis_client is not None:
+        pipe = redis_client.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, PROGRESS_TTL_SECONDS)
+        return pipe.execute()[0]
+    with _local_lock:
+        _local_counters[key] = _local_counters.get(key, 0) + 1
+        return _local_counters[key]
+
+
+class ProgressTracker:
+    """
+    Tracks an ordered list of stages: percent done is the share of stages already finished,
+    and each finished stage records its wall-clock duration in `timings` (seconds).
+
+    A run whose stages execute in different processes continues from the stored record
+    with ProgressTracker.resume().
+
+    Stage boundaries double as cancellation checkpoints: if should_cancel() is true when a
+    stage starts, start() raises JobCancelled instead.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        resource_id: Any,
+        stages: Sequence[str],
+        should_cancel: Optional[Callable[[], bool]] = None
+    ):
+        self.kind = kind
+        self.resource_id = resource_id
+        self.stages = list(stages)
+        self.should_cancel = should_cancel
+        self.timings: Dict[str, float] = {}
+        self.started_at = time.time()
+        self._stage: Optional[str] = None
+        self._stage_started: float = 0.0
+
+    @classmethod
+    def resume(cls, kind: str, resource_id: Any, stages: Sequence[str]) -> "ProgressTracker":
+        """Tracker continuing the current stage and timings recorded by another process."""
+        tracker = cls(kind, resource_id, stages)
+        record = load_progress(kind, resource_id)
+        if record:
+            tracker.started_at = record["started_at"]
+            tracker.timings = dict(record["timings"])
+            tracker._stage = record["stage"]
+            tracker._stage_started = record.get("stage_started_at") or time.time()
+        return tracker
+
+    def start(self, stage: str, message: Optional[str] = None) -> None:
+        """Finish the current stage (if any) and begin `stage`."""
+        self._close_stage()
+        if self.should_cancel is not None and self.should_cancel():
+            raise JobCancelled(f"{self.kind} {self.resource_id} cancelled before {stage}")
+        self._stage = stage
+        self._stage_started = time.time()
+        percent = round(100 * self.stages.index(stage) / len(self.stages))
+        self._write(stage=stage, percent=percent, message=message)
+
+    def step(self, done: int, total: int, message: Optional[str] = None) -> None:
+        """Report `done` of `total` units of the current stage's work."""
+        index = self.stages.index(self._stage)
+        percent = round(100 * (index + done / total) / len(self.stages)) if total else 0
+        self._write(stage=self._stage, percent=percent, message=message)
+
+    def finish(self, success: bool = True, message: str = "Failed") -> None:
+        """Close the current stage; a successful run reports 100%, others keep stages done so far."""
+        failed_stage = self._stage
+        self._close_stage()
+        if success:
+            self._write(stage=None, percent=100, message=None)
+        else:
+            percent = round(100 * len(self.timings) / len(self.stages))
+            self._write(stage=failed_stage, percent=percent, message=message)
+
+    def _close_stage(self) -> None:
+        if self._stage is not None:
+            self.timings[self._stage] = round(time.time() - self._stage_started, 4)
+            self._stage = None
+
+    def _write(self, stage: Optional[str], percent: int, message: Optional[str]) -> None:
+        record = {
+            "stage": stage,
+            "percent": percent,
+            "message": message,
+            "stages": self.stages,
+            "timings": dict(self.timings),
+            "started_at": self.started_at,
+            "stage_started_at": self._stage_started if stage is not None else None,
+            "updated_at": time.time(),
+        }
+        key = _progress_key(self.kind, self.resource_id)
+        try:
+            # Without Redis the published event updates the local store (_store_local_progress),
+            # which also covers runs in local-mode task processes
+            if redis_client is not None:
+                pipe = redis_client.pipeline()
+                pipe.hset(key, mapping={field: orjson.dumps(value) for field, value in record.items()})
+                pipe.expire(key, PROGRESS_TTL_SECONDS)
+                pipe.execute()
+        except Exception as e:
+            # Progress is advisory; never fail the run because the store is unavailable
+            print(f"Failed to record progress for {key}: {e}")
+        publish_event(self.kind, self.resource_id, "progress", **record)
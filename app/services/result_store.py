@@ -0,0 +1,117 @@
+"""
+Compressed storage for large result sections and shard partials.
+
+Values are stored zlib-compressed in result_blobs instead of inline in a job's results
+JSON or in the Celery result backend. Result sections are content-addressed, so identical
+sections (e.g. results reused by a deduplicated job) are stored once and stay valid for
+every job referencing them; a packed section is replaced by {"$blob": key, "bytes": n}.
+Scratch values such as shard partials are stored under a caller-chosen key and deleted
+once consumed.
+"""
+import hashlib
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+import orjson
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.result_blob import ResultBlob
+
+CODEC = "zlib+json"
+BLOB_REF = "$blob"
+
+
+def encode_value(value: Any) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and BLOB_REF in value
+
+
+class ResultStore:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def put(self, value: Any, kind: str, key: Optional[str] = None) -> str:
+        """Store a JSON-serializable value and return its key (the content digest unless given)."""
+        raw = encode_value(value)
+        if key is None:
+            key = hashlib.sha256(raw).hexdigest()
+            if self.db.query(ResultBlob.key).filter(ResultBlob.key == key).first():
+                return key
+        self.db.add(ResultBlob(
+            key=key,
+            kind=kind,
+            codec=CODEC,
+            data=zlib.compress(raw, settings.RESULT_BLOB_COMPRESSION_LEVEL),
+            raw_bytes=len(raw)
+        ))
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Stored concurrently; content-addressed blobs with the same key are identical
+            self.db.rollback()
+        return key
+
+    def put_named(self, values: Dict[str, Any], kind: str) -> List[str]:
+        """Store several scratch values under their keys in one transaction; returns the keys."""
+        for key, value in values.items():
+            raw = encode_value(value)
+            self.db.add(ResultBlob(
+                key=key,
+                kind=kind,
+                codec=CODEC,
+                data=zlib.compress(raw, settings.RESULT_BLOB_COMPRESSION_LEVEL),
+                raw_bytes=len(raw)
+            ))
+        self.db.commit()
+        return list(values)
+
+    def get(self, key: str) -> Any:
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: List[str]) -> List[Any]:
+        """Decoded values in the order of keys; raises KeyError if one is missing."""
+        blobs = {
+            blob.key: blob
+            for blob in self.db.query(ResultBlob).filter(ResultBlob.key.in_(set(keys))).all()
+        }
+        missing = [key for key in keys if key not in blobs]
+        if missing:
+            raise KeyError(f"Result blobs not found: {', '.join(missing)}")
+        return [orjson.loads(zlib.decompress(blobs[key].data)) for key in keys]
+
+    def delete(self, keys: Iterable[str]) -> None:
+        self.db.query(ResultBlob).filter(ResultBlob.key.in_(list(keys))).delete(synchronize_session=False)
+        self.db.commit()
+
+    def delete_prefix(self, prefix: str) -> None:
+        """Delete named blobs by key prefix, e.g. all shard partials of a job."""
+        self.db.query(ResultBlob).filter(ResultBlob.key.startswith(prefix)).delete(synchronize_session=False)
+        self.db.commit()
+
+    def pack(self, results: Dict[str, Any], min_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """Copy of a results dict with every top-level section of min_bytes or more moved to a blob."""
+        if min_bytes is None:
+            min_bytes = settings.RESULT_BLOB_MIN_BYTES
+        packed = {}
+        for section, value in results.items():
+            size = len(encode_value(value)) if isinstance(value, (dict, list)) else 0
+            if size >= min_bytes:
+                packed[section] = {BLOB_REF: self.put(value, kind=section), "bytes": size}
+            else:
+                packed[section] = value
+        return packed
+
+    def hydrate(self, results: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Inverse of pack: the results dict with blob references replaced by their values."""
+        if not results:
+            return results
+        refs = {section: value[BLOB_REF] for section, value in results.items() if is_blob_ref(value)}
+        if not refs:
+            return results
+        values = self.get_many(list(refs.values()))
+        return {**results, **dict(zip(refs, values))}
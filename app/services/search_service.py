@@ -0,0 +1,149 @@
+"""
+Full-text search over prompt and completion texts.
+
+Every prompt and every completion output is written to search_entries when its dataset is
+ingested. On Postgres each entry carries a tsvector (settings.SEARCH_TEXT_CONFIG) with a GIN
+index, and queries use websearch syntax: words, "quoted phrases", OR and -exclusions, ranked
+with ts_rank_cd. Elsewhere (local SQLite) a query matches entries containing every word,
+case-insensitively, in ingest order.
+
+The entries are also the row-level copy of each dataset that sharded analyses read their
+prompt-id ranges from (DatasetService.get_prompt_range / get_completion_range). They are
+therefore written in the ingest transaction rather than in the background: a dataset is
+searchable and can be analysed as soon as its create returns, and a failed index write fails
+the upload instead of leaving a dataset that is silently unsearchable. The cost is upload
+latency (about one row, plus a tsvector on Postgres, per prompt and output); uploads run in
+the threadpool, so it does not block the event loop.
+"""
+import uuid
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, or_
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.search_entry import SearchEntry
+
+SEARCH_INSERT_BATCH = 10_000
+# Characters of an entry that are indexed for full-text search. Postgres rejects a tsvector
+# over 1 MB, which a long output with many distinct words can exceed; the entry's full text
+# is still stored (and read by sharded analyses), only words beyond this are not searchable
+SEARCH_VECTOR_MAX_CHARS = 100_000
+# Matches ranked per query (the earliest ingested), so a very common term costs a bounded
+# amount of ranking work
+SEARCH_CANDIDATE_LIMIT = 10_000
+
+
+class SearchService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _is_postgres(self) -> bool:
+        return self.db.get_bind().dialect.name == "postgresql"
+
+    def index_prompts(self, dataset_id: uuid.UUID, prompts: Dict[str, str]) -> None:
+        """Add a dataset's prompts to the index; the caller commits."""
+        self._insert(
+            {"dataset_id": dataset_id, "completion_dataset_id": None, "prompt_id": prompt_id,
+             "position": None, "entry_text": text}
+            for prompt_id, text in prompts.items()
+            if isinstance(text, str)
+        )
+
+    def index_completions(
+        self, dataset_id: uuid.UUID, completion_dataset_id: uuid.UUID, completions: Dict[str, List[str]]
+    ) -> None:
+        """Add every output of a completion dataset to the index; the caller commits."""
+        self._insert(
+            {"dataset_id": dataset_id, "completion_dataset_id": completion_dataset_id, "prompt_id": prompt_id,
+             "position": position, "entry_text": text}
+            for prompt_id, outputs in completions.items()
+            for position, text in enumerate(outputs or [])
+            if isinstance(text, str)
+        )
+
+    def _insert(self, entries: Iterator[Dict[str, Any]]) -> None:
+        values = {"text": bindparam("entry_text")}
+        if self._is_postgres():
+            values["search_vector"] = func.to_tsvector(
+                settings.SEARCH_TEXT_CONFIG, func.left(bindparam("entry_text"), SEARCH_VECTOR_MAX_CHARS)
+            )
+        stmt = SearchEntry.__table__.insert().values(**values)
+        while True:
+            batch = list(islice(entries, SEARCH_INSERT_BATCH))
+            if not batch:
+                break
+            self.db.execute(stmt, batch)
+
+    def search(
+        self,
+        q: str,
+        dataset_id: uuid.UUID,
+        completion_dataset_ids: Optional[Iterable[uuid.UUID]] = None,
+        kind: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Search a dataset's prompts and completions.
+
+        completion_dataset_ids restricts completions to those datasets (None searches all of
+        the dataset's completion datasets); kind is "prompt" or "completion" to search only
+        one of them. Returns (hits, next_offset).
+
+        On Postgres the first SEARCH_CANDIDATE_LIMIT matches in ingest order are ranked, so the
+        candidate set and the (rank, id) order are the same for every page of a query.
+        """
+        entry = SearchEntry
+        filters = [entry.dataset_id == dataset_id]
+        if completion_dataset_ids is not None:
+            filters.append(or_(
+                entry.completion_dataset_id.is_(None),
+                entry.completion_dataset_id.in_(list(completion_dataset_ids))
+            ))
+        if kind == "prompt":
+            filters.append(entry.completion_dataset_id.is_(None))
+        elif kind == "completion":
+            filters.append(entry.completion_dataset_id.isnot(None))
+
+        if self._is_postgres():
+            tsquery = func.websearch_to_tsquery(settings.SEARCH_TEXT_CONFIG, q)
+            candidates = (
+                self.db.query(
+                    entry.id, entry.prompt_id, entry.completion_dataset_id, entry.position, entry.text,
+                    entry.search_vector
+                )
+                .filter(*filters, entry.search_vector.op("@@")(tsquery))
+                .order_by(entry.id)
+                .limit(SEARCH_CANDIDATE_LIMIT)
+                .subquery()
+            )
+            rank = func.ts_rank_cd(candidates.c.search_vector, tsquery)
+            query = self.db.query(
+                candidates.c.prompt_id, candidates.c.completion_dataset_id, candidates.c.position,
+                candidates.c.text, rank.label("rank")
+            ).order_by(rank.desc(), candidates.c.id)
+        else:
+            for word in q.split():
+                escaped = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                filters.append(entry.text.ilike(f"%{escaped}%", escape="\\"))
+            query = self.db.query(
+                entry.prompt_id, entry.completion_dataset_id, entry.position, entry.text
+            ).filter(*filters).order_by(entry.id)
+
+        # Fetch one extra row to learn whether another page exists
+        rows = query.offset(offset).limit(limit + 1).all()
+        hits = [
+            {
+                "prompt_id": row.prompt_id,
+                "kind": "prompt" if row.completion_dataset_id is None else "completion",
+                "completion_dataset_id": row.completion_dataset_id,
+                "position": row.position,
+                "text": row.text,
+                "rank": getattr(row, "rank", None),
+            }
+            for row in rows[:limit]
+        ]
+        next_offset = offset + limit if len(rows) > limit else None
+        return hits, next_offset
@@ -1,86 +1,168 @@
-from celery import Celery
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
+from celery import chord
 import uuid
 from ..core.config import settings
 from ..services.analysis_service import AnalysisService
+from ..services.dataset_cache import dataset_cache
+from ..services.result_store import ResultStore
 from ..models import *  # Ensure all models are registered with SQLAlchemy before use
+from ..models.analysis import AnalysisJob
+from .celery_app import celery_app, broker_priority, INTERACTIVE_QUEUE, BULK_QUEUE, DEFAULT_PRIORITY
 
 # Database setup for worker
 engine = create_engine(settings.SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create Celery app (only enable Redis/Celery if not local)
-if settings.OEDIPUS_ENV == "local" or not settings.REDIS_URL:
-    celery_app = None
-else:
-    celery_app = Celery(
-        "oedipus_worker",
-        broker=settings.celery_broker_url,
-        backend=settings.celery_result_backend,
-    )
 
-    # Configure Celery
-    celery_app.conf.update(
-        task_serializer="json",
-        accept_content=["json"],
-        result_serializer="json",
-        timezone="UTC",
-        enable_utc=True,
-        task_track_started=True,
-        task_time_limit=30 * 60,  # 30 minutes
-        task_soft_time_limit=25 * 60,  # 25 minutes
-        worker_prefetch_multiplier=1,
-        worker_max_tasks_per_child=1000,
+def analysis_routing(job: AnalysisJob) -> dict:
+    """
+    Celery routing options for a job and all of its shard tasks.
+
+    Jobs over either size limit (recorded at ingest) go to the bulk queue so small
+    interactive runs never wait behind them; datasets without counts are treated as bulk.
+    """
+    dataset = job.completion_dataset
+    interactive = (
+        dataset.completion_count is not None
+        and dataset.completion_count <= settings.INTERACTIVE_MAX_COMPLETIONS
+        and (dataset.size_bytes or 0) <= settings.INTERACTIVE_MAX_BYTES
     )
+    priority = job.priority if job.priority is not None else DEFAULT_PRIORITY
+    return {
+        "queue": INTERACTIVE_QUEUE if interactive else BULK_QUEUE,
+        "priority": broker_priority(priority),
+    }
+
+
+def shard_blob_key(job_id: str, name="") -> str:
+    """result_blobs key of a job's scratch value (shard totals/partitions, partition sums); "" gives the shared prefix."""
+    return f"shard:{job_id}:{name}"
 
 
 if celery_app:
-    @celery_app.task(bind=True)
-    def run_analysis_task(self, job_id: str):
+    @celery_app.task
+    def run_analysis_task(job_id: str):
         """
         Celery task to run analysis job.
+
+        Runs the job as map, reduce and merge steps: one analyze_shard_task per prompt-id
+        range, then one reduce_partition_task per hash partition of the shards' keyed counts,
+        then merge_analysis_task. There are as many partitions as shards, so every task
+        handles about one shard's worth of data however large the dataset is.
+
+        Tasks return only a status or result_blobs keys: results live in the database, so
+        the Celery result backend never holds a second copy of them.
         """
         db = SessionLocal()
         try:
             analysis_service = AnalysisService(db)
             job_uuid = uuid.UUID(job_id)
+            bounds = analysis_service.plan_analysis_shards(job_uuid, settings.ANALYSIS_SHARD_SIZE)
+            if not bounds:
+                return {"status": "skipped"}
+            routing = analysis_routing(analysis_service.get_analysis_job(job_uuid, include_results=False))
+
+            header = [
+                analyze_shard_task.s(job_id, index, after, upto, len(bounds)).set(**routing)
+                for index, (after, upto) in enumerate(bounds)
+            ]
+            callback = reduce_shards_task.s(job_id, routing).set(**routing).on_error(analysis_failed_task.s(job_id))
+            chord(header)(callback)
 
-            # Update task progress
-            self.update_state(
-                state="PROGRESS",
-                meta={"current": 0, "total": 100, "status": "Starting analysis..."}
-            )
+            return {
+                "status": "running",
+                "job_id": job_id,
+                "shards": len(bounds)
+            }
+        finally:
+            db.close()
 
-            # Run the analysis
-            results = analysis_service.run_analysis(job_uuid)
 
-            # Update task progress
-            self.update_state(
-                state="PROGRESS",
-                meta={"current": 100, "total": 100, "status": "Analysis completed"}
-            )
+    @celery_app.task
+    def analyze_shard_task(job_id: str, index: int, after: str, upto: str, total: int):
+        """
+        Partial metric state for the job's prompt_ids in (after, upto].
 
-            return {
-                "status": "completed",
-                "results": results
-            }
+        The shard's totals and each of its `total` partitions are stored in result_blobs;
+        only the totals key goes through the result backend.
+        """
+        db = SessionLocal()
+        try:
+            analysis_service = AnalysisService(db)
+            totals, parts = analysis_service.compute_shard(uuid.UUID(job_id), after, upto, partitions=total)
+            values = {shard_blob_key(job_id, f"{index}:totals"): totals}
+            values.update({shard_blob_key(job_id, f"{index}:p{p}"): part for p, part in enumerate(parts)})
+            ResultStore(db).put_named(values, kind="shard")
+            analysis_service.record_shard_done(uuid.UUID(job_id), total)
+            return shard_blob_key(job_id, f"{index}:totals")
+        finally:
+            db.close()
 
-        except Exception as exc:
-            # Update task state to failure
-            self.update_state(
-                state="FAILURE",
-                meta={"error": str(exc)}
+
+    @celery_app.task
+    def reduce_shards_task(totals_keys: list, job_id: str, routing: dict):
+        """Chord callback of the shards: start one reduce_partition_task per partition."""
+        db = SessionLocal()
+        try:
+            partitions = len(totals_keys)
+            if not AnalysisService(db).start_reduce(uuid.UUID(job_id), partitions):
+                ResultStore(db).delete_prefix(shard_blob_key(job_id))
+                return {"status": "cancelled", "job_id": job_id}
+            header = [reduce_partition_task.s(job_id, p, partitions).set(**routing) for p in range(partitions)]
+            callback = (
+                merge_analysis_task.s(job_id, totals_keys).set(**routing).on_error(analysis_failed_task.s(job_id))
             )
-            raise
+            chord(header)(callback)
+            return {"status": "reducing", "job_id": job_id, "partitions": partitions}
+        finally:
+            db.close()
+
+
+    @celery_app.task
+    def reduce_partition_task(job_id: str, partition: int, partitions: int):
+        """Sums of one partition over every shard; the consumed partition blobs are dropped."""
+        db = SessionLocal()
+        try:
+            store = ResultStore(db)
+            keys = [shard_blob_key(job_id, f"{index}:p{partition}") for index in range(partitions)]
+            reduced = AnalysisService(db).reduce_shard_partition(uuid.UUID(job_id), store.get_many(keys), partitions)
+            key = store.put(reduced, kind="shard", key=shard_blob_key(job_id, f"reduced:{partition}"))
+            store.delete(keys)
+            return key
+        finally:
+            db.close()
+
+
+    @celery_app.task
+    def merge_analysis_task(reduced_keys: list, job_id: str, totals_keys: list):
+        """Chord callback of the partitions: finalize the metrics and complete the job."""
+        db = SessionLocal()
+        try:
+            store = ResultStore(db)
+            AnalysisService(db).merge_shards(uuid.UUID(job_id), store.get_many(totals_keys), store.get_many(reduced_keys))
+            store.delete_prefix(shard_blob_key(job_id))
+            return {"status": "completed", "job_id": job_id}
+        finally:
+            db.close()
+
+
+    @celery_app.task
+    def analysis_failed_task(request, exc, traceback, job_id: str):
+        """Chord error callback: a shard or partition failed, so the job cannot complete."""
+        db = SessionLocal()
+        try:
+            AnalysisService(db).fail_analysis(uuid.UUID(job_id), exc)
+            # Drop the scratch values of the steps that did finish
+            ResultStore(db).delete_prefix(shard_blob_key(job_id))
         finally:
             db.close()
 
 
     @celery_app.task
     def health_check():
-        """Simple health check task."""
-        return {"status": "healthy", "message": "Worker is running"}
+        """Simple health check task; reports the answering worker process's dataset cache."""
+        return {"status": "healthy", "message": "Worker is running", "dataset_cache": dataset_cache.stats()}
 
 else:
     # Local synchronous fallback
@@ -92,7 +174,11 @@ else:
         try:
             analysis_service = AnalysisService(db)
             job_uuid = uuid.UUID(job_id)
-            return analysis_service.run_analysis(job_uuid)
+            analysis_service.run_analysis(job_uuid)
+            return {
+                "status": analysis_service.get_analysis_job(job_uuid, include_results=False).status,
+                "job_id": job_id
+            }
         finally:
             db.close()
 
@@ -101,6 +187,11 @@ else:
         return {"status": "healthy", "message": "Worker is running"}
 
 
+def dispatch_analysis(job: AnalysisJob) -> None:
+    """Queue a job on the interactive or bulk Celery queue at its priority (Celery mode only)."""
+    run_analysis_task.apply_async(args=[str(job.id)], **analysis_routing(job))
+
+
 if __name__ == "__main__":
     if celery_app:
         celery_app.start()
@@ -0,0 +1,60 @@
+"""
+Celery application shared by all worker modules.
+
+Analysis jobs are routed by size to the "interactive" or "bulk" queue (see
+analysis_worker.dispatch_analysis), so run separate pools that cannot starve each other:
+    celery -A app.workers.celery_app worker -Q interactive,comparisons,celery -c 4 -n interactive@%h
+    celery -A app.workers.celery_app worker -Q bulk -c 2 -n bulk@%h
+"""
+from celery import Celery
+from kombu import Queue
+from ..core.config import settings
+
+# Default queue (health checks), the dedicated comparison queue and the analysis queues
+DEFAULT_QUEUE = "celery"
+COMPARISON_QUEUE = "comparisons"
+INTERACTIVE_QUEUE = "interactive"
+BULK_QUEUE = "bulk"
+
+# API priorities are 0-9 with 9 most urgent; jobs without one run at DEFAULT_PRIORITY
+DEFAULT_PRIORITY = 5
+
+
+def broker_priority(priority: int) -> int:
+    """Map an API priority onto the Redis transport, which serves priority 0 first."""
+    return 9 - priority
+
+# Create Celery app (only enable Redis/Celery if not local)
+if settings.OEDIPUS_ENV == "local" or not settings.REDIS_URL:
+    celery_app = None
+else:
+    celery_app = Celery(
+        "oedipus_worker",
+        broker=settings.celery_broker_url,
+        backend=settings.celery_result_backend,
+        include=["app.workers.analysis_worker", "app.workers.comparison_worker"],
+    )
+
+    # Configure Celery
+    celery_app.conf.update(
+        task_serializer="json",
+        accept_content=["json"],
+        result_serializer="json",
+        timezone="UTC",
+        enable_utc=True,
+        task_track_started=True,
+        # Tasks return only statuses and keys (results live in the database); expire them early
+        result_expires=60 * 60,  # 1 hour
+        task_time_limit=30 * 60,  # 30 minutes
+        task_soft_time_limit=25 * 60,  # 25 minutes
+        worker_prefetch_multiplier=1,
+        worker_max_tasks_per_child=1000,
+        task_default_queue=DEFAULT_QUEUE,
+        task_queues=[Queue(DEFAULT_QUEUE), Queue(COMPARISON_QUEUE), Queue(INTERACTIVE_QUEUE), Queue(BULK_QUEUE)],
+        # Redis emulates priorities with one list per step; consume the most urgent first
+        broker_transport_options={"priority_steps": list(range(10)), "queue_order_strategy": "priority"},
+        task_default_priority=broker_priority(DEFAULT_PRIORITY),
+        task_routes={
+            "app.workers.comparison_worker.run_comparison_task": {"queue": COMPARISON_QUEUE},
+        },
+    )
@@ -0,0 +1,93 @@
+import uuid
+from celery.exceptions import SoftTimeLimitExceeded
+from sqlalchemy.exc import OperationalError
+from ..core.concurrency import get_task_executor
+from ..core.database import SessionLocal
+from ..services.comparison_service import ComparisonService
+from ..models import *  # Ensure all models are registered with SQLAlchemy before use
+from .celery_app import celery_app, COMPARISON_QUEUE
+
+# Database failover / dropped connections: retried with backoff instead of failing the comparison
+TRANSIENT_ERRORS = (OperationalError,)
+
+
+def _run_comparison(comparison_id: str, rerun: bool = False, task_id=None, transient_errors=(), deadline_errors=()):
+    db = SessionLocal()
+    try:
+        comp = ComparisonService(db).run_comparison_analysis(
+            uuid.UUID(comparison_id), rerun=rerun, task_id=task_id,
+            transient_errors=transient_errors, deadline_errors=deadline_errors
+        )
+        return {"status": comp.status, "comparison_id": comparison_id}
+    finally:
+        db.close()
+
+
+if celery_app:
+    class ComparisonTask(celery_app.Task):
+        def on_failure(self, exc, task_id, args, kwargs, einfo):
+            # Transient errors skip the service's failure handling; mark failed once retries are exhausted
+            if isinstance(exc, TRANSIENT_ERRORS):
+                db = SessionLocal()
+                try:
+                    ComparisonService(db).mark_comparison_failed(uuid.UUID(args[0]), str(exc))
+                finally:
+                    db.close()
+
+    @celery_app.task(
+        bind=True,
+        base=ComparisonTask,
+        queue=COMPARISON_QUEUE,
+        acks_late=True,
+        # A worker that dies mid-run requeues the message instead of dropping it
+        reject_on_worker_lost=True,
+        autoretry_for=TRANSIENT_ERRORS,
+        retry_backoff=True,
+        retry_backoff_max=120,
+        max_retries=3,
+        time_limit=20 * 60,  # 20 minutes
+        soft_time_limit=15 * 60,  # 15 minutes; keeps the finished sections as a "partial" comparison
+    )
+    def run_comparison_task(self, comparison_id: str):
+        """
+        Celery task to run a comparison's statistical analysis.
+
+        Retries and redeliveries keep the task id, which the comparison records as the owner
+        of its run: a redelivery after the worker died takes over the "running" comparison.
+        """
+        return _run_comparison(
+            comparison_id, rerun=self.request.retries > 0, task_id=self.request.id,
+            transient_errors=TRANSIENT_ERRORS, deadline_errors=(SoftTimeLimitExceeded,)
+        )
+
+    @celery_app.task(queue=COMPARISON_QUEUE)
+    def comparison_failed_task(request, exc, traceback, comparison_id: str):
+        """Error callback: settle a comparison whose run was killed, e.g. at the hard time limit."""
+        db = SessionLocal()
+        try:
+            ComparisonService(db).mark_comparison_interrupted(uuid.UUID(comparison_id), str(exc))
+        finally:
+            db.close()
+
+else:
+    # Local fallback: runs in the local task process pool (see dispatch_comparison)
+    def run_comparison_task(comparison_id: str):
+        """
+        Run a comparison's statistical analysis outside Celery.
+        """
+        try:
+            return _run_comparison(comparison_id)
+        except Exception as e:
+            print(f"Error running comparison analysis: {e}")
+            raise
+
+
+def dispatch_comparison(comparison_id: uuid.UUID) -> None:
+    """Queue a comparison's analysis on the worker pool (Celery, or local processes)."""
+    if celery_app:
+        run_comparison_task.apply_async(
+            args=[str(comparison_id)], queue=COMPARISON_QUEUE,
+            link_error=comparison_failed_task.s(str(comparison_id))
+        )
+    else:
+        get_task_executor().submit(run_comparison_task, str(comparison_id))
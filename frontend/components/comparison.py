@@ -3,6 +3,7 @@ import requests
 import pandas as pd
 import numpy as np
 from typing import Optional, Dict, Any, List, Tuple
+from utils.http_cache import conditional_get_json
 
 API_BASE_URL = "http://localhost:8000"
 
@@ -41,11 +42,34 @@ def _list_comparisons() -> List[Dict[str, Any]]:
 
 def _get_comparison(comp_id: str) -> Optional[Dict[str, Any]]:
     try:
-        r = requests.get(f"{API_BASE_URL}/api/v1/comparisons/{comp_id}")
+        return conditional_get_json(f"{API_BASE_URL}/api/v1/comparisons/{comp_id}")
+    except Exception as e:
+        st.error(f"Failed to fetch comparison {comp_id}: {e}")
+        return None
+
+
+def _refresh_comparison(comp_id: str) -> Optional[Dict[str, Any]]:
+    """Rerun a comparison against its datasets' current versions: {"comparison_id", "status", "changed_datasets"}."""
+    try:
+        r = requests.post(f"{API_BASE_URL}/api/v1/comparisons/{comp_id}/refresh")
         r.raise_for_status()
         return r.json()
     except Exception as e:
-        st.error(f"Failed to fetch comparison {comp_id}: {e}")
+        st.error(f"Failed to refresh comparison: {e}")
+        return None
+
+
+def _get_aligned_rows(comp_id: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """One page of a comparison's aligned rows, filtered and sorted by the API: {"items", "next_cursor"}."""
+    try:
+        r = requests.get(
+            f"{API_BASE_URL}/api/v1/comparisons/{comp_id}/rows",
+            params={k: v for k, v in params.items() if v is not None}
+        )
+        r.raise_for_status()
+        return r.json()
+    except Exception as e:
+        st.error(f"Failed to fetch aligned rows: {e}")
         return None
 
 
@@ -73,8 +97,8 @@ def _extract_alignment(comp: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     return None
 
 
-def _alignment_to_dataframe(alignment: Dict[str, Any]) -> Tuple[pd.DataFrame, List[str]]:
-    rows = alignment.get("alignedRows", []) or []
+def _rows_to_dataframe(rows: List[Dict[str, Any]], z_thresh: float, char_diff: int) -> Tuple[pd.DataFrame, List[str]]:
+    """Table of one page of rows; lengths, z-scores and differences come precomputed from the API."""
     if not rows:
         return pd.DataFrame(columns=["inputId", "inputText"]), []
 
@@ -90,17 +114,24 @@ def _alignment_to_dataframe(alignment: Dict[str, Any]) -> Tuple[pd.DataFrame, Li
             "inputText": r.get("inputText", ""),
         }
         completions = r.get("completions", {}) or {}
+        stats = r.get("stats") or {}
         for ds in dataset_names:
             values = completions.get(ds)
             # Show first output text for overview; keep counts and lengths for metrics
-            first_text = (values[0] if isinstance(values, list) and values else None)
-            entry[f"{ds}__text"] = first_text
-            entry[f"{ds}__n"] = len(values) if isinstance(values, list) else 0
-            entry[f"{ds}__len"] = len(first_text) if isinstance(first_text, str) else np.nan
+            entry[f"{ds}__text"] = (values[0] if isinstance(values, list) and values else None)
+            entry[f"{ds}__n"] = (stats.get("counts") or {}).get(ds, 0)
+            length = (stats.get("lengths") or {}).get(ds)
+            z = (stats.get("zScores") or {}).get(ds)
+            entry[f"{ds}__len"] = length if length is not None else np.nan
+            entry[f"{ds}__z"] = z if z is not None else np.nan
+            entry[f"{ds}__is_outlier"] = z is not None and abs(z) >= z_thresh
+        if len(dataset_names) >= 2:
+            diff = stats.get("lenDiff")
+            entry["abs_len_diff"] = diff if diff is not None else np.nan
+            entry["diff_exceeds_threshold"] = diff is not None and diff >= char_diff
         table.append(entry)
 
-    df = pd.DataFrame(table)
-    return df, dataset_names
+    return pd.DataFrame(table), dataset_names
 
 
 # ------------ UI: Creation ------------
@@ -129,6 +160,14 @@ def render_comparison_creator() -> Optional[str]:
     )
 
     comp_name = st.text_input("Comparison Name", placeholder="e.g., GPT-4 vs Claude 3 vs Llama 3")
+    paired = st.checkbox(
+        "Paired tests (compare prompt by prompt)", value=True,
+        help="Test per-prompt differences over the prompts the datasets share instead of treating them as independent samples."
+    )
+    preview = st.checkbox(
+        "Quick preview first", value=True,
+        help="Publish approximate results from a stratified sample of 1,000 prompts while the exact comparison runs."
+    )
 
     col1, col2 = st.columns(2)
     with col1:
@@ -150,7 +189,7 @@ def render_comparison_creator() -> Optional[str]:
             "dataset_id": selected_dataset['id'],
             "completion_dataset_ids": chosen_outputs,
             "alignment_key": "prompt_id",
-            "comparison_config": {"min_aligned": 10},
+            "comparison_config": {"min_aligned": 10, "paired": paired, "preview_sample": preview},
         }
         try:
             resp = requests.post(f"{API_BASE_URL}/api/v1/comparisons/create", json=payload)
@@ -176,46 +215,6 @@ def render_comparison_creator() -> Optional[str]:
 
 # ------------ UI: Explorer ------------
 
-def _compute_outliers(df: pd.DataFrame, dataset_names: List[str], z_thresh: float, char_diff: int) -> pd.DataFrame:
-    df = df.copy()
-    # Compute per-dataset z-scores on length columns
-    for ds in dataset_names:
-        col = f"{ds}__len"
-        if col in df:
-            lengths = df[col].astype(float)
-            mu = np.nanmean(lengths)
-            sigma = np.nanstd(lengths) or 1.0
-            z = (lengths - mu) / sigma
-            df[f"{ds}__z"] = z
-            df[f"{ds}__is_outlier"] = z.abs() >= z_thresh
-    # Pairwise absolute differences between first two datasets (if available)
-    if len(dataset_names) >= 2:
-        a, b = dataset_names[0], dataset_names[1]
-        da = df.get(f"{a}__len")
-        db = df.get(f"{b}__len")
-        if da is not None and db is not None:
-            diff = (da - db).abs()
-            df["abs_len_diff"] = diff
-            df["diff_exceeds_threshold"] = diff >= char_diff
-    return df
-
-
-def _filter_df(df: pd.DataFrame, dataset_names: List[str], 
-               show_only_outliers: bool, text_query: str) -> pd.DataFrame:
-    filtered = df
-    if text_query:
-        q = text_query.lower()
-        filtered = filtered[filtered["inputText"].str.lower().str.contains(q, na=False)]
-    if show_only_outliers:
-        outlier_flags = [f"{ds}__is_outlier" for ds in dataset_names if f"{ds}__is_outlier" in filtered]
-        if outlier_flags:
-            mask = np.zeros(len(filtered), dtype=bool)
-            for col in outlier_flags:
-                mask |= filtered[col].fillna(False).to_numpy()
-            filtered = filtered[mask]
-    return filtered
-
-
 def render_comparison_explorer():
     st.subheader("🔎 Explore Comparisons")
 
@@ -257,17 +256,22 @@ def render_comparison_explorer():
     c2.metric("Matched Inputs", cov.get("matchedInputs", 0))
     c3.metric("Coverage %", cov.get("coveragePercentage", 0.0))
 
-    df, dataset_names = _alignment_to_dataframe(alignment)
-    if df.empty:
-        st.info("No aligned rows to display.")
-        return
+    # Member datasets appended to since the results were computed
+    stale = (_get_comparison(comp["id"]) or {}).get("stale_datasets") or []
+    if stale:
+        st.warning(f"{len(stale)} dataset(s) changed since this comparison ran.")
+        if st.button("Refresh comparison"):
+            refreshed = _refresh_comparison(comp["id"])
+            if refreshed:
+                st.success(f"Refresh queued ({refreshed['status']}). Only the changed datasets are recomputed.")
 
-    # Controls
+    # Controls: filtering, outlier detection and sorting run server-side over every row
     st.markdown("### Controls")
     colA, colB, colC, colD = st.columns([2, 2, 2, 2])
 
     with colA:
-        ds_to_show = st.multiselect("Datasets to show", options=dataset_names, default=dataset_names)
+        sort_label = st.selectbox("Sort by", options=["Prompt id", "Largest z-score", "Largest length difference"])
+        page_size = st.selectbox("Rows per page", options=[100, 500, 1000], index=1)
     with colB:
         sig_level = st.selectbox("Significance level", options=[0.05, 0.01, 0.001], index=0)
         z_map = {0.05: 1.96, 0.01: 2.58, 0.001: 3.29}
@@ -277,11 +281,35 @@ def render_comparison_explorer():
         view_mode = st.radio("View", options=["Text", "Lengths"], horizontal=True)
     with colD:
         only_outliers = st.checkbox("Show only outliers", value=False)
+        only_large_diffs = st.checkbox("Only rows over the char difference", value=False)
         text_query = st.text_input("Filter text")
 
-    # Compute outliers and filters
-    df_calc = _compute_outliers(df, dataset_names, z_thresh=z_thresh, char_diff=char_diff)
-    df_filtered = _filter_df(df_calc, dataset_names, show_only_outliers=only_outliers, text_query=text_query)
+    params = {
+        "limit": page_size,
+        "sort": {"Prompt id": "prompt_id", "Largest z-score": "z", "Largest length difference": "len_diff"}[sort_label],
+        "q": text_query or None,
+        "min_z": z_thresh if only_outliers else None,
+        "min_len_diff": char_diff if only_large_diffs else None,
+    }
+    # One cursor stack per comparison and filter combination
+    cursors = st.session_state.setdefault(f"rows_cursors_{comp['id']}_{sorted(params.items())}", [None])
+    page = _get_aligned_rows(comp["id"], {**params, "cursor": cursors[-1]})
+    if page is None:
+        return
+    nav_prev, nav_label, nav_next = st.columns([1, 2, 1])
+    if nav_prev.button("◀ Previous", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    nav_label.caption(f"Page {len(cursors)}")
+    if nav_next.button("Next ▶", disabled=not page.get("next_cursor")):
+        cursors.append(page["next_cursor"])
+        st.rerun()
+
+    df_filtered, dataset_names = _rows_to_dataframe(page.get("items", []), z_thresh=z_thresh, char_diff=char_diff)
+    if df_filtered.empty:
+        st.info("No aligned rows match the current filters.")
+        return
+    ds_to_show = st.multiselect("Datasets to show", options=dataset_names, default=dataset_names)
 
     # Build display frame with selected datasets
     cols = ["inputId", "inputText"]
@@ -1,7 +1,9 @@
 import streamlit as st
 import requests
+import json
 import time
 from typing import Dict, Any, Optional
+from utils.http_cache import conditional_get_json
 from .visualizations import (
     render_metrics_overview,
     render_entropy_chart,
@@ -12,6 +14,8 @@ from .visualizations import (
 )
 
 API_BASE_URL = "http://localhost:8000"
+# Job statuses after which the event stream ends; partial/cancelled jobs keep finished metrics
+TERMINAL_STATUSES = ("completed", "partial", "cancelled", "failed")
 
 
 def render_analysis_dashboard(completion_dataset_id: str):
@@ -60,81 +64,115 @@ def run_analysis_job(completion_dataset_id: str):
 
 
 def monitor_job_progress(job_id: str):
-    """Monitor job progress with real-time updates."""
+    """Monitor job progress with real-time updates pushed over Server-Sent Events."""
     progress_bar = st.progress(0)
     status_text = st.empty()
     
-    max_attempts = 60  # 5 minutes with 5-second intervals
-    attempt = 0
+    try:
+        final_status = _follow_job_events(job_id, progress_bar, status_text)
+    except requests.RequestException:
+        # Event stream unavailable (e.g. proxy without streaming support); fall back to polling
+        final_status = _poll_job_status(job_id, progress_bar, status_text)
     
-    while attempt < max_attempts:
+    if final_status == "completed":
+        progress_bar.progress(100)
+        status_text.text("✅ Analysis completed!")
+        st.session_state.job_status = "completed"
+        st.session_state.current_job_id = job_id
+        
+        # Fetch and display results
+        fetch_and_display_results(job_id)
+    elif final_status in ("partial", "cancelled"):
+        progress_bar.progress(100)
+        status_text.text(f"⚠️ Analysis {final_status}")
+        st.session_state.job_status = final_status
+        st.session_state.current_job_id = job_id
+        fetch_and_display_results(job_id)
+    elif final_status == "failed":
+        progress_bar.progress(0)
+        status_text.text("❌ Analysis failed!")
+        st.error("Analysis job failed. Please try again.")
+    elif final_status is None:
+        st.warning("Analysis is taking longer than expected. Please check back later.")
+
+
+def _render_job_event(event: Dict[str, Any], progress_bar, status_text):
+    status = event.get("status")
+    if event.get("event") == "progress":
+        progress_bar.progress(max(10, min(95, int(event.get("percent", 50)))))
+        status_text.text(f"🔄 Computing {event.get('stage', 'metrics').replace('_', ' ')}...")
+    elif status == "pending":
+        progress_bar.progress(10)
+        status_text.text("⏳ Analysis job is pending...")
+    elif status == "running":
+        progress_bar.progress(15)
+        status_text.text("🔄 Analysis is running...")
+
+
+def _follow_job_events(job_id: str, progress_bar, status_text, max_seconds: int = 300) -> Optional[str]:
+    """Consume the job's SSE stream until a terminal event; returns the final status or None on timeout."""
+    deadline = time.monotonic() + max_seconds
+    # Read timeout above the server's 15s keepalive interval
+    with requests.get(
+        f"{API_BASE_URL}/api/v1/analysis/{job_id}/events", stream=True, timeout=(5, 30)
+    ) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if time.monotonic() > deadline:
+                return None
+            if not line or not line.startswith("data:"):
+                continue  # event names, keepalive comments and separators
+            event = json.loads(line[len("data:"):])
+            if event.get("event") in TERMINAL_STATUSES:
+                return event["event"]
+            _render_job_event(event, progress_bar, status_text)
+    return None
+
+
+def _poll_job_status(job_id: str, progress_bar, status_text) -> Optional[str]:
+    """Polling fallback: check the job status every 5 seconds for up to 5 minutes."""
+    for _attempt in range(60):
         try:
             response = requests.get(f"{API_BASE_URL}/api/v1/analysis/{job_id}/status")
-            
-            if response.status_code == 200:
-                job_info = response.json()
-                status = job_info["status"]
-                
-                if status == "pending":
-                    progress_bar.progress(10)
-                    status_text.text("⏳ Analysis job is pending...")
-                elif status == "running":
-                    progress_bar.progress(50)
-                    status_text.text("🔄 Analysis is running...")
-                elif status == "completed":
-                    progress_bar.progress(100)
-                    status_text.text("✅ Analysis completed!")
-                    st.session_state.job_status = "completed"
-                    st.session_state.current_job_id = job_id
-                    
-                    # Fetch and display results
-                    fetch_and_display_results(job_id)
-                    break
-                elif status == "failed":
-                    progress_bar.progress(0)
-                    status_text.text("❌ Analysis failed!")
-                    st.error("Analysis job failed. Please try again.")
-                    break
-                
-                time.sleep(5)
-                attempt += 1
-            else:
+            if response.status_code != 200:
                 st.error(f"Error checking job status: {response.text}")
-                break
-                
+                return "error"
+            status = response.json()["status"]
+            if status in TERMINAL_STATUSES:
+                return status
+            _render_job_event({"status": status}, progress_bar, status_text)
+            time.sleep(5)
         except Exception as e:
             st.error(f"Error monitoring job: {str(e)}")
-            break
-    
-    if attempt >= max_attempts:
-        st.warning("Analysis is taking longer than expected. Please check back later.")
+            return "error"
+    return None
 
 
 def fetch_and_display_results(job_id: str):
     """Fetch and display analysis results."""
     try:
-        response = requests.get(f"{API_BASE_URL}/api/v1/analysis/{job_id}/results")
+        result_data = conditional_get_json(f"{API_BASE_URL}/api/v1/analysis/{job_id}/results")
+        results = result_data["results"]
         
-        if response.status_code == 200:
-            result_data = response.json()
-            results = result_data["results"]
-            
-            # Store results in session state
-            st.session_state.analysis_results = results
-            
-            # Display results
-            display_analysis_results(results)
-            
-        else:
-            st.error(f"Failed to fetch results: {response.text}")
-            
+        # Store results in session state
+        st.session_state.analysis_results = results
+        
+        # Display results
+        display_analysis_results(results)
+        
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch results: {e.response.text}")
     except Exception as e:
         st.error(f"Error fetching results: {str(e)}")
 
 
 def display_analysis_results(results: Dict[str, Any]):
     """Display comprehensive analysis results."""
-    st.success("🎉 Analysis completed successfully!")
+    missing = results.get("missing_sections")
+    if missing:
+        st.warning(f"Analysis stopped early; not computed: {', '.join(missing)}")
+    else:
+        st.success("🎉 Analysis completed successfully!")
     
     # Render all visualization components
     render_metrics_overview(results)
@@ -85,15 +85,23 @@ def render_output_upload(dataset_id: str) -> Optional[str]:
     
     # Get dataset info
     try:
-        response = requests.get(f"{API_BASE_URL}/api/v1/datasets/{dataset_id}")
+        response = requests.get(
+            f"{API_BASE_URL}/api/v1/datasets/{dataset_id}",
+            params={"fields": "name,prompt_count"}
+        )
         if response.status_code == 200:
             dataset_info = response.json()
             st.info(f"Uploading completions for dataset: **{dataset_info['name']}**")
             
-            # Show input keys for reference
-            input_keys = list(dataset_info['prompts'].keys())
-            st.write(f"Available input IDs: {', '.join(input_keys[:10])}" + 
-                    (f" ... and {len(input_keys)-10} more" if len(input_keys) > 10 else ""))
+            # Show the first input keys for reference without downloading every prompt
+            page = requests.get(
+                f"{API_BASE_URL}/api/v1/datasets/{dataset_id}/prompts",
+                params={"limit": 10}
+            ).json()
+            input_keys = [item['prompt_id'] for item in page.get('items', [])]
+            total_inputs = dataset_info.get('prompt_count') or len(input_keys)
+            st.write(f"Available input IDs: {', '.join(input_keys)}" + 
+                    (f" ... and {total_inputs-len(input_keys)} more" if total_inputs > len(input_keys) else ""))
             
         else:
             st.error("Could not fetch dataset information")
@@ -270,10 +270,10 @@ elif page == "📈 Dashboard":
                     datasets = response.json()
                     if datasets:
                         st.subheader("Recent Datasets")
-                        for ds in datasets[-3:]:  # Show last 3 datasets
+                        for ds in datasets[:3]:  # Listing is newest first
                             with st.expander(f"📊 {ds['name']} ({ds['id'][:8]}...)"):
                                 st.write(f"**Created:** {ds['created_at']}")
-                                st.write(f"**Inputs:** {len(ds['prompts'])}")
+                                st.write(f"**Inputs:** {ds['prompt_count']}")
                                 st.json(ds['metadata'])
             except:
                 pass
@@ -0,0 +1,28 @@
+import streamlit as st
+import requests
+from typing import Any, Dict, Optional
+
+
+def conditional_get_json(url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 30) -> Any:
+    """
+    GET a JSON resource, revalidating a session-cached copy with If-None-Match.
+
+    Streamlit re-runs the whole script on every interaction; with this helper repeat views
+    of immutable artifacts (datasets, finished comparisons, completed results) cost a 304.
+    Raises requests.HTTPError for error responses like requests.get(...).raise_for_status().
+    """
+    cache = st.session_state.setdefault("_etag_cache", {})
+    key = (url, tuple(sorted((params or {}).items())))
+    cached = cache.get(key)
+
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    response = requests.get(url, params=params, headers=headers, timeout=timeout)
+    if response.status_code == 304 and cached:
+        return cached[1]
+    response.raise_for_status()
+
+    data = response.json()
+    etag = response.headers.get("ETag")
+    if etag:
+        cache[key] = (etag, data)
+    return data
@@ -337,7 +337,7 @@ function App() {
                         <div className="flex-1">
                           <div className="font-medium">{dataset.name} <span className="text-xs bg-blue-100 text-blue-800 px-1 rounded">PROMPTS</span></div>
                           <div className="text-sm text-gray-500">
-                            {Object.keys(dataset.prompts).length} prompts • Created {formatTimestamp(dataset.created_at)}
+                            {dataset.prompt_count} prompts • Created {formatTimestamp(dataset.created_at)}
                           </div>
                         </div>
                       </div>
@@ -371,7 +371,7 @@ function App() {
                         <div className="flex-1">
                           <div className="font-medium">{completionDataset.name} <span className="text-xs bg-green-100 text-green-800 px-1 rounded">COMPLETIONS</span></div>
                           <div className="text-sm text-gray-500">
-                            {completionDataset.metadata?.total_completions || 0} completions across {completionDataset.metadata?.unique_inputs || 0} unique prompts • Created {formatTimestamp(completionDataset.created_at)}
+                            {completionDataset.completion_count} completions across {completionDataset.prompt_count} unique prompts • Created {formatTimestamp(completionDataset.created_at)}
                           </div>
                         </div>
                       </div>
@@ -460,7 +460,7 @@ function App() {
       );
     }
 
-    if (comparison.status === 'pending' || comparison.status === 'running') {
+    if (comparison.status === 'pending' || comparison.status === 'running' || comparison.status === 'cancelling') {
       return (
         <div className="space-y-8">
           <div className="text-center">
@@ -473,7 +473,7 @@ function App() {
           <div className="max-w-2xl mx-auto">
             <AnalysisProgress 
               status={comparison.status} 
-              progress={comparison.statistical_results?.progress}
+              progress={comparison.progress}
             />
           </div>
           
@@ -499,7 +499,7 @@ function App() {
           <div className="max-w-2xl mx-auto">
             <AnalysisProgress 
               status={comparison.status} 
-              progress={comparison.statistical_results?.progress}
+              progress={comparison.progress}
             />
           </div>
           
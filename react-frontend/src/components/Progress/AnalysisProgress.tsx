@@ -1,6 +1,7 @@
 import React from 'react';
 import { CheckCircle, Clock, AlertCircle, RefreshCw } from 'lucide-react';
 import { clsx } from 'clsx';
+import { Comparison, ProgressInfo } from '../../types/comparison';
 
 interface AnalysisStep {
   id: string;
@@ -10,18 +11,18 @@ interface AnalysisStep {
 }
 
 interface AnalysisProgressProps {
-  status: 'pending' | 'running' | 'completed' | 'failed';
-  progress?: {
-    step: string;
-    message: string;
-  };
+  status: Comparison['status'];
+  progress?: ProgressInfo | null;
   className?: string;
 }
 
 export const AnalysisProgress: React.FC<AnalysisProgressProps> = ({ status, progress, className }) => {
   const getCurrentStep = () => {
     if (status === 'pending') return 'alignment';
-    if (status === 'running' && progress?.step) return progress.step;
+    if ((status === 'running' || status === 'cancelling') && progress?.stage) {
+      // Dataset loading and the sampled preview are part of the statistical analysis step in this view
+      return progress.stage === 'loading' || progress.stage === 'preview' ? 'statistical_analysis' : progress.stage;
+    }
     if (status === 'completed') return 'completed';
     if (status === 'failed') return 'failed';
     return 'alignment';
@@ -41,6 +42,14 @@ export const AnalysisProgress: React.FC<AnalysisProgressProps> = ({ status, prog
       label: 'Statistical Analysis',
       description: 'Computing metrics and running statistical tests',
       status: currentStep === 'statistical_analysis' ? 'running' : 
+              ['overlap', 'insights', 'visualization', 'completed'].includes(currentStep) ? 'completed' :
+              status === 'failed' ? 'failed' : 'pending'
+    },
+    {
+      id: 'overlap',
+      label: 'Overlap Analysis',
+      description: 'Finding identical completions across datasets',
+      status: currentStep === 'overlap' ? 'running' :
               ['insights', 'visualization', 'completed'].includes(currentStep) ? 'completed' :
               status === 'failed' ? 'failed' : 'pending'
     },
@@ -76,6 +85,7 @@ export const AnalysisProgress: React.FC<AnalysisProgressProps> = ({ status, prog
   };
 
   const getProgressPercentage = () => {
+    if (status === 'running' && progress) return progress.percent;
     const completedSteps = steps.filter(step => step.status === 'completed').length;
     return (completedSteps / steps.length) * 100;
   };
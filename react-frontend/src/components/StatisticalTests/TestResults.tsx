@@ -23,7 +23,8 @@ export const TestResults: React.FC<TestResultsProps> = ({
   className 
 }) => {
   const statisticalTests: StatisticalTest[] = metrics.map(metric => {
-    const isSignificant = metric.statistical_significance < significanceLevel;
+    // Judge on the corrected p-value when the backend provides one
+    const isSignificant = (metric.q_value_bh ?? metric.statistical_significance) < significanceLevel;
     const effectSize = Math.abs(metric.effect_size);
     const effectCategory = 
       effectSize < 0.2 ? 'negligible' :
@@ -64,7 +65,9 @@ export const TestResults: React.FC<TestResultsProps> = ({
     };
   });
 
-  const significantTests = statisticalTests.filter(t => t.metric.statistical_significance < significanceLevel);
+  const significantTests = statisticalTests.filter(
+    t => (t.metric.q_value_bh ?? t.metric.statistical_significance) < significanceLevel
+  );
   const largeEffectTests = statisticalTests.filter(t => Math.abs(t.metric.effect_size) >= 0.8);
 
   if (metrics.length === 0) {
@@ -1,6 +1,7 @@
+import { useEffect, useState } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { apiClient } from '../utils/api';
-import { Dataset, CompletionDataset, Comparison, ComparisonCreate } from '../types/comparison';
+import { Dataset, CompletionDataset, Comparison, ComparisonCreate, ProgressInfo } from '../types/comparison';
 
 export const useDatasets = () => {
   return useQuery({
@@ -26,16 +27,69 @@ export const useComparisons = () => {
   });
 };
 
+const isActive = (status?: Comparison['status']) =>
+  status === 'pending' || status === 'running' || status === 'cancelling';
+
 export const useComparison = (comparisonId: string) => {
-  return useQuery({
+  const queryClient = useQueryClient();
+  // Fall back to polling if the event stream cannot be opened
+  const [streamFailed, setStreamFailed] = useState(false);
+
+  const query = useQuery({
     queryKey: ['comparison', comparisonId],
     queryFn: () => apiClient.get<Comparison>(`/api/v1/comparisons/${comparisonId}`),
     enabled: !!comparisonId,
     refetchInterval: (data) => {
-      // Poll while status is pending or running
-      return data?.status === 'pending' || data?.status === 'running' ? 2000 : false;
+      // Poll while the comparison is still active and no event stream is available
+      const active = isActive(data?.status);
+      return active && streamFailed ? 2000 : false;
     },
   });
+
+  const status = query.data?.status;
+
+  useEffect(() => {
+    if (!comparisonId || streamFailed || !isActive(status)) {
+      return;
+    }
+
+    const source = new EventSource(apiClient.url(`/api/v1/comparisons/${comparisonId}/events`));
+    const refresh = () => {
+      source.close();
+      queryClient.invalidateQueries({ queryKey: ['comparison', comparisonId] });
+    };
+
+    const setProgress = (status: Comparison['status'], progress: ProgressInfo | null | undefined) => {
+      queryClient.setQueryData<Comparison>(['comparison', comparisonId], (old) =>
+        old && { ...old, status, progress: progress ?? old.progress }
+      );
+    };
+
+    // The first event is a snapshot carrying the stored progress, later ones are live updates
+    source.addEventListener('status', (e) => {
+      const event = JSON.parse((e as MessageEvent).data);
+      setProgress(event.status, event.progress);
+    });
+    source.addEventListener('progress', (e) => {
+      setProgress('running', JSON.parse((e as MessageEvent).data));
+    });
+    // An approximate result from a sample of the prompts (comparison_config.preview_sample)
+    source.addEventListener('preview', () => {
+      queryClient.invalidateQueries({ queryKey: ['comparison', comparisonId] });
+    });
+    source.addEventListener('completed', refresh);
+    source.addEventListener('partial', refresh);
+    source.addEventListener('cancelled', refresh);
+    source.addEventListener('failed', refresh);
+    source.onerror = () => {
+      source.close();
+      setStreamFailed(true);
+    };
+
+    return () => source.close();
+  }, [comparisonId, status, streamFailed, queryClient]);
+
+  return query;
 };
 
 export const useCreateComparison = () => {
@@ -3,8 +3,11 @@ export interface Dataset {
   name: string;
   user_id: string;
   created_at: string;
-  prompts: Record<string, string>; // mapping prompt_id -> prompt_text
+  prompts?: Record<string, string>; // only present when requested via ?fields=prompts
   metadata: Record<string, any>;
+  prompt_count: number;
+  content_hash: string;
+  version?: number; // incremented by every append
   description?: string;
   input_count?: number; // computed field
 }
@@ -14,8 +17,12 @@ export interface CompletionDataset {
   name: string;
   dataset_id: string;
   created_at: string;
-  completions: Record<string, string[]>; // mapping prompt_id -> output_texts
+  completions?: Record<string, string[]>; // only present when requested via ?fields=completions
   metadata: Record<string, any>;
+  prompt_count: number;
+  completion_count: number;
+  content_hash: string;
+  version?: number; // incremented by every append
   output_count?: number; // computed field
 }
 
@@ -36,12 +43,29 @@ export interface Comparison {
   comparison_config: Record<string, any>;
   statistical_results: Record<string, any>;
   automated_insights: string[];
-  status: 'pending' | 'running' | 'completed' | 'failed';
+  // partial/cancelled comparisons keep the sections they finished (see statistical_results.missing_sections)
+  status: 'pending' | 'running' | 'cancelling' | 'completed' | 'partial' | 'cancelled' | 'failed';
+  // Dataset id -> version the results were computed from; refresh with POST /comparisons/{id}/refresh
+  dataset_versions?: Record<string, number>;
+  stale_datasets?: string[];
+  // Client-side only: latest progress pushed over the comparison's event stream
+  progress?: ProgressInfo | null;
+}
+
+export interface ProgressInfo {
+  stage: string | null;
+  percent: number;
+  message?: string | null;
+  stages?: string[];
+  timings?: Record<string, number>;
 }
 
 export interface AlignmentResult {
+  // Previews (first 200 by prompt id); page every row with GET /api/v1/comparisons/{id}/rows
   alignedRows: AlignedRow[];
   unmatchedInputs: string[];
+  unmatchedCount?: number;
+  indexed?: boolean;
   coverageStats: {
     totalInputs: number;
     matchedInputs: number;
@@ -77,4 +101,64 @@ export interface StatisticalMetric {
   effect_size: number;
   confidence_interval_lower: number;
   confidence_interval_upper: number;
-}
\ No newline at end of file
+  dataset_a?: string;
+  dataset_b?: string;
+  // p-values adjusted across the metric's dataset pairs
+  q_value_holm?: number;
+  q_value_bh?: number;
+}
+
+// statistical_results.pairwise: one k x k matrix per metric name, rows/columns in `datasets` order.
+// Cell [i][j] compares datasets[i] with datasets[j]; null on the diagonal and for untested pairs.
+export interface PairwiseMatrices {
+  datasets: string[];
+  correction: 'bh' | 'holm';
+  metrics: Record<string, {
+    p_value: (number | null)[][];
+    q_holm: (number | null)[][];
+    q_bh: (number | null)[][];
+    effect_size: (number | null)[][];
+  }>;
+}
+// statistical_results.overlap: identical completions across datasets, rows/columns in `datasets` order.
+// Diagonal cells hold the dataset's own distinct completions (or prompts covered, for `prompts`).
+export interface OverlapMatrices {
+  shared: number[][];
+  jaccard: (number | null)[][];
+  prompts?: number[][]; // per_prompt only: prompts with at least one identical completion
+}
+
+export interface OverlapResults {
+  datasets: string[];
+  normalization: string;
+  exact: { global: OverlapMatrices; per_prompt: OverlapMatrices };
+  normalized: { global: OverlapMatrices; per_prompt: OverlapMatrices };
+  per_dataset: Record<string, {
+    completions: number;
+    duplicates: { exact: number; normalized: number };
+  }>;
+}
+
+// statistical_results.insight_details: automated_insights with the rule that produced each one,
+// most severe first (same order as automated_insights).
+export interface InsightFinding {
+  rule: string;
+  severity: 'high' | 'medium' | 'low';
+  strength: number; // ranks findings of the same rule
+  message: string;
+}
+
+// statistical_results.preview: written before the exact run when comparison_config.preview_sample
+// is set; the tests are computed on a stratified sample of the prompts. Dropped on completion.
+export interface PreviewResult {
+  exact: false;
+  sample_size: number;
+  population: number;
+  strata: number;
+  metrics: StatisticalMetric[];
+  insights: string[];
+  // Per dataset and metric: mean, std, min, max, count and a 95% CI of the mean
+  summary_statistics: Record<string, Record<string, {
+    mean: number; std: number; min: number; max: number; count: number; ci_lower: number; ci_upper: number;
+  }>>;
+}
@@ -7,6 +7,10 @@ export class ApiClient {
     this.baseUrl = baseUrl;
   }
 
+  url(endpoint: string): string {
+    return `${this.baseUrl}${endpoint}`;
+  }
+
   private async request<T>(
     endpoint: string,
     options: RequestInit = {}
@@ -1,14 +1,28 @@
 #!/usr/bin/env python3
 """
 Start the Celery worker
+
+Usage: python scripts/start_worker.py [interactive|bulk]
 """
 import subprocess
 import sys
 import os
 
+# Worker pools: queues consumed and concurrency. Run one of each so bulk analyses never
+# hold up interactive ones.
+POOLS = {
+    "interactive": ("interactive,comparisons,celery", 4),
+    "bulk": ("bulk", 2),
+}
+
 def main():
     """Start the Celery worker."""
-    print("🔄 Starting Oedipus MVP Celery Worker...")
+    pool = sys.argv[1] if len(sys.argv) > 1 else "interactive"
+    if pool not in POOLS:
+        print(f"❌ Unknown worker pool '{pool}' (expected one of: {', '.join(POOLS)})")
+        sys.exit(1)
+    queues, concurrency = POOLS[pool]
+    print(f"🔄 Starting Oedipus MVP Celery Worker ({pool} pool)...")
     
     try:
         # Change to project root
@@ -17,10 +31,12 @@ def main():
         # Start the worker
         subprocess.run([
             "celery", 
-            "-A", "app.workers.analysis_worker",
+            "-A", "app.workers.celery_app",
             "worker",
+            "-Q", queues,
+            "-n", f"{pool}@%h",
             "--loglevel=info",
-            "--concurrency=2"
+            f"--concurrency={concurrency}"
         ], check=True)
         
     except KeyboardInterrupt:
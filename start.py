@@ -77,8 +77,10 @@ def main():
     print("   # Terminal 1:")
     print("   uvicorn app.api.main:app --reload")
     print("   # Terminal 2:")
-    print("   celery -A app.workers.analysis_worker worker --loglevel=info")
+    print("   celery -A app.workers.celery_app worker -Q interactive,comparisons,celery -n interactive@%h --loglevel=info")
     print("   # Terminal 3:")
+    print("   celery -A app.workers.celery_app worker -Q bulk -c 2 -n bulk@%h --loglevel=info")
+    print("   # Terminal 4:")
     print("   streamlit run frontend/streamlit_app.py")
     print("\n4. Open your browser:")
     print("   Frontend: http://localhost:8501")
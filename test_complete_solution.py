@@ -90,10 +90,10 @@ def test_complete_solution():
         status = current_comparison['status']
         
         # Check for progress information
-        progress_info = current_comparison.get('statistical_results', {}).get('progress')
+        progress_info = requests.get(f"{BASE_URL}/api/v1/comparisons/{comparison_id}/progress").json().get('progress')
         if progress_info:
-            step = progress_info.get('step', 'unknown')
-            message = progress_info.get('message', 'Processing...')
+            step = progress_info.get('stage') or 'done'
+            message = progress_info.get('message') or 'Processing...'
             progress_steps_seen.add(step)
             print(f"  Poll {poll_count}: Status = {status}, Step = {step}")
             print(f"    Message: {message}")
@@ -1,16 +1,20 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.api.main import app
-from app.core.database import get_db, Base
+from app.core.database import get_db, get_async_db, Base
 import tempfile
 import os
+import uuid
 
 # Create test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db")
+TestingAsyncSessionLocal = sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
 
 Base.metadata.create_all(bind=engine)
 
@@ -21,7 +25,12 @@ def override_get_db():
     finally:
         db.close()
 
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
 
 client = TestClient(app)
 
@@ -126,6 +135,741 @@ def test_analysis_job_creation():
     assert "id" in data
     assert data["status"] == "pending"
 
+def test_bulk_create_dataset_returns_summary():
+    """Test the raw-body fast path for dataset and completion creation."""
+    dataset_data = {
+        "name": "Bulk Dataset",
+        "prompts": {"input_1": "What is AI?", "input_2": "Explain ML"}
+    }
+
+    response = client.post("/api/v1/datasets/bulk", json=dataset_data)
+    assert response.status_code == 201
+
+    data = response.json()
+    assert data["prompt_count"] == 2
+    assert len(data["content_hash"]) == 64
+    assert "prompts" not in data
+
+    output_data = {
+        "name": "Bulk Outputs",
+        "completions": {"input_1": ["AI is artificial intelligence", "AI mimics humans"]}
+    }
+    response = client.post(f"/api/v1/datasets/{data['id']}/completions/bulk", json=output_data)
+    assert response.status_code == 201
+    assert response.json()["completion_count"] == 2
+
+    # Structural errors are rejected without per-item validation errors
+    response = client.post("/api/v1/datasets/bulk", json={"name": "Bad", "prompts": {"input_1": 1}})
+    assert response.status_code == 422
+
+def test_dataset_listing_projection_and_prompt_pages():
+    """Test that listings omit payloads by default and prompts can be paged."""
+    dataset_data = {
+        "name": "Projection Dataset",
+        "prompts": {"input_1": "What is AI?", "input_2": "Explain ML", "input_3": "Define DL"}
+    }
+    dataset_id = client.post("/api/v1/datasets/", json=dataset_data).json()["id"]
+
+    listing = client.get("/api/v1/datasets/").json()
+    assert all("prompts" not in d for d in listing)
+    assert all("prompt_count" in d for d in listing)
+
+    projected = client.get("/api/v1/datasets/", params={"fields": "name,prompts"}).json()
+    assert all(set(d) == {"id", "name", "prompts"} for d in projected)
+
+    assert client.get("/api/v1/datasets/", params={"fields": "bogus"}).status_code == 400
+
+    first = client.get(f"/api/v1/datasets/{dataset_id}/prompts", params={"limit": 2}).json()
+    assert [i["prompt_id"] for i in first["items"]] == ["input_1", "input_2"]
+    assert first["next_cursor"] == "input_2"
+
+    second = client.get(
+        f"/api/v1/datasets/{dataset_id}/prompts",
+        params={"limit": 2, "cursor": first["next_cursor"]}
+    ).json()
+    assert [i["prompt_id"] for i in second["items"]] == ["input_3"]
+    assert second["next_cursor"] is None
+
+def test_dataset_listing_keyset_pagination():
+    """Test that cursor pages are disjoint and newest first."""
+    for i in range(3):
+        client.post("/api/v1/datasets/", json={"name": f"Keyset {i}", "prompts": {"input_1": "Hi"}})
+
+    first = client.get("/api/v1/datasets/", params={"limit": 2})
+    assert first.status_code == 200
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get("/api/v1/datasets/", params={"limit": 2, "cursor": cursor})
+    assert second.status_code == 200
+
+    first_ids = {d["id"] for d in first.json()}
+    second_ids = {d["id"] for d in second.json()}
+    assert first_ids.isdisjoint(second_ids)
+
+    assert client.get("/api/v1/datasets/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+def test_completion_listing_unpaged_by_default():
+    """Test that the completion dataset listing returns every dataset unless a page is asked for."""
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "Many outputs", "prompts": {"input_1": "Hi"}}).json()["id"]
+    for i in range(105):
+        client.post(f"/api/v1/datasets/{dataset_id}/completions", json={"name": f"Run {i}", "completions": {"input_1": ["Hello"]}})
+
+    full = client.get(f"/api/v1/datasets/{dataset_id}/completions")
+    assert full.status_code == 200
+    assert len(full.json()) == 105
+    assert "X-Next-Cursor" not in full.headers
+
+    first = client.get(f"/api/v1/datasets/{dataset_id}/completions", params={"limit": 100})
+    assert len(first.json()) == 100
+    rest = client.get(f"/api/v1/datasets/{dataset_id}/completions", params={"cursor": first.headers["X-Next-Cursor"]})
+    assert len(rest.json()) == 5
+    assert {o["id"] for o in first.json()} | {o["id"] for o in rest.json()} == {o["id"] for o in full.json()}
+
+def test_dataset_content_negotiation():
+    """Test msgpack responses and Arrow rejection for non-tabular payloads."""
+    msgpack = pytest.importorskip("msgpack")
+    dataset_id = client.post(
+        "/api/v1/datasets/", json={"name": "Negotiation", "prompts": {"input_1": "Hi"}}
+    ).json()["id"]
+
+    response = client.get(f"/api/v1/datasets/{dataset_id}", headers={"Accept": "application/msgpack"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content)["prompts"] == {"input_1": "Hi"}
+
+    response = client.get(
+        f"/api/v1/datasets/{dataset_id}", headers={"Accept": "application/vnd.apache.arrow.stream"}
+    )
+    assert response.status_code == 406
+
+def test_arrow_listing_with_mixed_type_metadata():
+    """Test that Arrow listings send metadata with differing value types as JSON text."""
+    pa = pytest.importorskip("pyarrow")
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "Arrow metadata", "prompts": {"input_1": "Hi"}}).json()["id"]
+    for run in (1, "baseline"):
+        client.post(
+            f"/api/v1/datasets/{dataset_id}/completions",
+            json={"name": f"Run {run}", "completions": {"input_1": ["Hello"]}, "metadata": {"run": run}}
+        )
+
+    response = client.get(
+        f"/api/v1/datasets/{dataset_id}/completions", headers={"Accept": "application/vnd.apache.arrow.stream"}
+    )
+    assert response.status_code == 200
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert sorted(table.column("metadata").to_pylist()) == ['{"run":"baseline"}', '{"run":1}']
+
+def test_dataset_conditional_get():
+    """Test ETag revalidation of datasets."""
+    dataset_id = client.post(
+        "/api/v1/datasets/", json={"name": "Conditional", "prompts": {"input_1": "Hi"}}
+    ).json()["id"]
+
+    response = client.get(f"/api/v1/datasets/{dataset_id}")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    # Datasets can be appended to, so caches revalidate with the ETag
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    response = client.get(f"/api/v1/datasets/{dataset_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # A different projection is a different representation
+    response = client.get(
+        f"/api/v1/datasets/{dataset_id}", params={"fields": "name"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_analysis_event_stream_for_finished_job():
+    """Test that SSE and WebSocket streams send the final status and close."""
+    dataset_id = client.post(
+        "/api/v1/datasets/", json={"name": "Events Dataset", "prompts": {"input_1": "Hi"}}
+    ).json()["id"]
+    output_id = client.post(
+        f"/api/v1/datasets/{dataset_id}/completions",
+        json={"name": "Events Outputs", "completions": {"input_1": ["Hello", "Hey"]}}
+    ).json()["id"]
+    job_id = client.post("/api/v1/analysis/run-sync", json={"completion_dataset_id": output_id}).json()["job_id"]
+
+    response = client.get(f"/api/v1/analysis/{job_id}/events")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("event: completed\n")
+
+    with client.websocket_connect(f"/api/v1/analysis/{job_id}/ws") as websocket:
+        event = websocket.receive_json()
+    assert event["event"] == "completed"
+    assert event["status"] == "completed"
+
+def test_comparison_progress_stages():
+    """Test that a finished comparison reports per-stage timings outside its results."""
+    dataset_id = client.post(
+        "/api/v1/datasets/", json={"name": "Progress Dataset", "prompts": {"input_1": "Hi", "input_2": "Bye"}}
+    ).json()["id"]
+    output_ids = [
+        client.post(
+            f"/api/v1/datasets/{dataset_id}/completions",
+            json={"name": f"Progress Outputs {i}", "completions": {"input_1": ["Hello"], "input_2": ["See you" * (i + 1)]}}
+        ).json()["id"]
+        for i in range(2)
+    ]
+    comparison_id = client.post(
+        "/api/v1/comparisons/create",
+        json={"name": "Progress", "dataset_id": dataset_id, "completion_dataset_ids": output_ids}
+    ).json()["id"]
+
+    # The analysis runs on the worker pool; the event stream ends once it finishes
+    events = client.get(f"/api/v1/comparisons/{comparison_id}/events")
+    assert "event: completed" in events.text
+
+    response = client.get(f"/api/v1/comparisons/{comparison_id}/progress")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "completed"
+    assert data["progress"]["percent"] == 100
+    assert set(data["progress"]["timings"]) == {"loading", "statistical_analysis", "overlap", "insights", "visualization"}
+
+    comparison = client.get(f"/api/v1/comparisons/{comparison_id}").json()
+    assert "progress" not in comparison["statistical_results"]
+    # Both datasets answer input_1 with "Hello"
+    assert comparison["statistical_results"]["overlap"]["exact"]["per_prompt"]["shared"][0][1] == 1
+
+def test_redelivered_comparison_task_takes_over_its_run():
+    """Test that the task that started a run can run it again after its worker died, and no other task can."""
+    from app.models.comparison import Comparison
+    from app.services.comparison_service import ComparisonService
+    from app.workers.comparison_worker import _run_comparison
+
+    dataset_id = client.post(
+        "/api/v1/datasets/", json={"name": "Redelivery Dataset", "prompts": {"input_1": "Hi", "input_2": "Bye"}}
+    ).json()["id"]
+    output_ids = [
+        client.post(
+            f"/api/v1/datasets/{dataset_id}/completions",
+            json={"name": f"Redelivery Outputs {i}", "completions": {"input_1": ["Hello"], "input_2": ["Later" * (i + 1)]}}
+        ).json()["id"]
+        for i in range(2)
+    ]
+    comparison_id = client.post(
+        "/api/v1/comparisons/create",
+        json={"name": "Redelivery", "dataset_id": dataset_id, "completion_dataset_ids": output_ids}
+    ).json()["id"]
+    assert "event: completed" in client.get(f"/api/v1/comparisons/{comparison_id}/events").text
+
+    def interrupt(task_id):
+        # What a worker killed mid-run by task_id leaves behind
+        db = TestingSessionLocal()
+        try:
+            db.query(Comparison).filter(Comparison.id == uuid.UUID(comparison_id)).update(
+                {"status": "running", "run_task_id": task_id}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    interrupt("task-1")
+    assert _run_comparison(comparison_id, task_id="task-2")["status"] == "running"
+    assert _run_comparison(comparison_id, task_id="task-1")["status"] == "completed"
+    # Delivered again after it finished: nothing left to do
+    assert _run_comparison(comparison_id, task_id="task-1")["status"] == "completed"
+
+    # Killed without a redelivery (hard time limit): the error callback fails it
+    interrupt("task-1")
+    db = TestingSessionLocal()
+    try:
+        ComparisonService(db).mark_comparison_interrupted(uuid.UUID(comparison_id), "TimeLimitExceeded")
+    finally:
+        db.close()
+    comparison = client.get(f"/api/v1/comparisons/{comparison_id}").json()
+    assert comparison["status"] == "failed"
+    assert comparison["statistical_results"]["error"] == "TimeLimitExceeded"
+
+def test_analysis_job_priority_and_dataset_size():
+    """Test that ingest records the payload size and jobs accept a bounded priority."""
+    dataset_id = client.post(
+        "/api/v1/datasets/", json={"name": "Routing Dataset", "prompts": {"input_1": "Hi"}}
+    ).json()["id"]
+    output = client.post(
+        f"/api/v1/datasets/{dataset_id}/completions/bulk",
+        json={"name": "Routing Outputs", "completions": {"input_1": ["Hello"]}}
+    ).json()
+    assert output["size_bytes"] == len('{"input_1":["Hello"]}')
+
+    response = client.post("/api/v1/analysis/run", json={"completion_dataset_id": output["id"], "priority": 9})
+    assert response.status_code == 201
+    assert response.json()["priority"] == 9
+
+    response = client.post("/api/v1/analysis/run", json={"completion_dataset_id": output["id"], "priority": 10})
+    assert response.status_code == 422
+
+def test_repeated_analysis_hits_dataset_cache():
+    """Test that re-analysing a dataset reuses the decoded payloads from the process cache."""
+    dataset_id = client.post(
+        "/api/v1/datasets/", json={"name": "Cache Dataset", "prompts": {"input_1": "Cache me"}}
+    ).json()["id"]
+    output_id = client.post(
+        f"/api/v1/datasets/{dataset_id}/completions",
+        json={"name": "Cache Outputs", "completions": {"input_1": ["Cached", "Kept"]}}
+    ).json()["id"]
+
+    client.post("/api/v1/analysis/run-sync", json={"completion_dataset_id": output_id})
+    before = client.get("/health").json()["dataset_cache"]
+    client.post("/api/v1/analysis/run-sync", json={"completion_dataset_id": output_id, "force": True})
+    after = client.get("/health").json()["dataset_cache"]
+
+    assert after["hits"] - before["hits"] == 2
+    assert after["misses"] == before["misses"]
+
+def test_identical_analysis_reuses_results():
+    """Test that analysing identical content returns the stored results instead of rerunning."""
+    dataset_id = client.post(
+        "/api/v1/datasets/", json={"name": "Dedupe Dataset", "prompts": {"input_1": "Dedupe me"}}
+    ).json()["id"]
+    output_ids = [
+        client.post(
+            f"/api/v1/datasets/{dataset_id}/completions",
+            json={"name": f"Dedupe Outputs {i}", "completions": {"input_1": ["Same", "Content"]}}
+        ).json()["id"]
+        for i in range(2)
+    ]
+
+    first = client.post("/api/v1/analysis/run-sync", json={"completion_dataset_id": output_ids[0]}).json()
+
+    # Same completion dataset: the finished job itself
+    again = client.post("/api/v1/analysis/run", json={"completion_dataset_id": output_ids[0]})
+    assert again.status_code == 201
+    assert again.json()["id"] == str(first["job_id"])
+
+    # Identical content elsewhere: a completed job for that dataset with the same results
+    other = client.post("/api/v1/analysis/run", json={"completion_dataset_id": output_ids[1]}).json()
+    assert other["status"] == "completed"
+    assert other["completion_dataset_id"] == output_ids[1]
+    assert other["results"] == first["results"]
+
+    forced = client.post("/api/v1/analysis/run", json={"completion_dataset_id": output_ids[0], "force": True}).json()
+    assert forced["status"] == "pending"
+
+def test_analysis_of_identical_content_in_flight_waits_for_it():
+    """Test that a job matching another dataset's in-flight job is linked to it and ends with its results."""
+    from app.services.analysis_service import AnalysisService
+    from app.schemas.analysis import AnalysisJobCreate
+
+    dataset_id = client.post(
+        "/api/v1/datasets/", json={"name": "Linked Dataset", "prompts": {"input_1": "Link me"}}
+    ).json()["id"]
+    output_ids = [
+        client.post(
+            f"/api/v1/datasets/{dataset_id}/completions",
+            json={"name": f"Linked Outputs {i}", "completions": {"input_1": ["Shared", "Answer"]}}
+        ).json()["id"]
+        for i in range(2)
+    ]
+
+    # Created without dispatching, so it is still pending
+    db = TestingSessionLocal()
+    try:
+        service = AnalysisService(db)
+        source, _ = service.get_or_create_analysis_job(AnalysisJobCreate(completion_dataset_id=output_ids[0]))
+
+        linked = client.post("/api/v1/analysis/run", json={"completion_dataset_id": output_ids[1]}).json()
+        assert linked["id"] != str(source.id)
+        assert linked["completion_dataset_id"] == output_ids[1]
+        assert linked["source_job_id"] == str(source.id)
+        assert linked["status"] == "pending"
+
+        again = client.post("/api/v1/analysis/run", json={"completion_dataset_id": output_ids[1]}).json()
+        assert again["id"] == linked["id"]
+
+        results = service.run_analysis(source.id)
+    finally:
+        db.close()
+
+    finished = client.get(f"/api/v1/analysis/{linked['id']}/results").json()
+    assert finished["status"] == "completed"
+    assert finished["results"]["summary"] == results["summary"]
+
+def test_cancel_analysis_job():
+    """Test that a pending job is cancelled at once and never runs, and finished jobs cannot be cancelled."""
+    from app.services.analysis_service import AnalysisService
+    from app.schemas.analysis import AnalysisJobCreate
+
+    dataset_id = client.post(
+        "/api/v1/datasets/", json={"name": "Cancel Dataset", "prompts": {"input_1": "Cancel me"}}
+    ).json()["id"]
+    output_id = client.post(
+        f"/api/v1/datasets/{dataset_id}/completions",
+        json={"name": "Cancel Outputs", "completions": {"input_1": ["Stop"]}}
+    ).json()["id"]
+
+    # Created without dispatching, so it is still pending
+    db = TestingSessionLocal()
+    try:
+        service = AnalysisService(db)
+        job, _ = service.get_or_create_analysis_job(AnalysisJobCreate(completion_dataset_id=output_id))
+
+        response = client.post(f"/api/v1/analysis/{job.id}/cancel")
+        assert response.status_code == 202
+        assert response.json()["status"] == "cancelled"
+
+        service.run_analysis(job.id)
+        db.expire_all()
+        assert service.get_analysis_job(job.id).status == "cancelled"
+    finally:
+        db.close()
+
+    response = client.post(f"/api/v1/analysis/{job.id}/cancel")
+    assert response.status_code == 409
+
+    response = client.post("/api/v1/analysis/00000000-0000-0000-0000-000000000000/cancel")
+    assert response.status_code == 404
+
+def test_large_result_sections_are_stored_compressed():
+    """Test that large result sections move to result_blobs, deduplicated by content, and load back."""
+    from app.services.result_store import ResultStore, is_blob_ref
+    from app.models.result_blob import ResultBlob
+
+    histogram = {f"{i}-{i + 1}": i for i in range(2000)}
+    results = {"character_metrics": {"character_count_distribution": histogram}, "summary": {"total_inputs": 1}}
+
+    db = TestingSessionLocal()
+    try:
+        store = ResultStore(db)
+        packed = store.pack(results, min_bytes=1024)
+        assert is_blob_ref(packed["character_metrics"])
+        assert packed["summary"] == results["summary"]
+        assert store.pack(results, min_bytes=1024) == packed
+
+        blob = db.query(ResultBlob).filter(ResultBlob.key == packed["character_metrics"]["$blob"]).one()
+        assert len(blob.data) < blob.raw_bytes
+        assert store.hydrate(packed) == results
+    finally:
+        db.close()
+
+def test_comparison_rows_page_through_full_alignment():
+    """Test that /rows pages every aligned row, beyond the preview kept with the comparison."""
+    prompts = {f"input_{i:03d}": f"Prompt {i}" for i in range(250)}
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "Rows Dataset", "prompts": prompts}).json()["id"]
+    output_ids = [
+        client.post(
+            f"/api/v1/datasets/{dataset_id}/completions",
+            json={"name": f"Rows Outputs {i}", "completions": {
+                key: [f"Answer {key}"] for n, key in enumerate(sorted(prompts)) if i == 0 or n % 5
+            }}
+        ).json()["id"]
+        for i in range(2)
+    ]
+    comparison = client.post(
+        "/api/v1/comparisons/create",
+        json={"name": "Rows", "dataset_id": dataset_id, "completion_dataset_ids": output_ids}
+    ).json()
+    alignment = comparison["statistical_results"]["alignment"]
+    assert alignment["coverageStats"]["matchedInputs"] == 200
+    assert alignment["unmatchedCount"] == 50
+
+    rows, cursor = [], None
+    while True:
+        params = {"limit": 100, **({"cursor": cursor} if cursor else {})}
+        page = client.get(f"/api/v1/comparisons/{comparison['id']}/rows", params=params).json()
+        rows.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert [row["inputId"] for row in rows] == sorted(prompts)
+    assert rows[0]["completions"] == {"Rows Outputs 0": ["Answer input_000"], "Rows Outputs 1": None}
+
+    unmatched = client.get(
+        f"/api/v1/comparisons/{comparison['id']}/rows", params={"match": "unmatched", "limit": 1000}
+    ).json()
+    assert len(unmatched["items"]) == 50
+    assert unmatched["next_cursor"] is None
+
+def test_comparison_dataset_cap_and_concurrent_index_build():
+    """Test that comparisons take at most 63 completion datasets and a repeated index build keeps one row per prompt."""
+    from app.models.comparison_alignment import ComparisonAlignmentRow
+    from app.services.comparison_service import ComparisonService
+
+    prompts = {f"input_{i}": f"Prompt {i}" for i in range(5)}
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "Cap Dataset", "prompts": prompts}).json()["id"]
+    response = client.post(
+        "/api/v1/comparisons/create",
+        json={"name": "Cap", "dataset_id": dataset_id, "completion_dataset_ids": [str(uuid.uuid4()) for _ in range(64)]}
+    )
+    assert response.status_code == 422
+
+    output_ids = [
+        client.post(
+            f"/api/v1/datasets/{dataset_id}/completions",
+            json={"name": f"Cap Outputs {i}", "completions": {key: [f"Answer {i}"] for key in prompts}}
+        ).json()["id"]
+        for i in range(2)
+    ]
+    comparison_id = client.post(
+        "/api/v1/comparisons/create",
+        json={"name": "Cap", "dataset_id": dataset_id, "completion_dataset_ids": output_ids}
+    ).json()["id"]
+
+    # A second build of the same index, as a concurrent lazy rebuild would store it
+    db = TestingSessionLocal()
+    try:
+        row = ComparisonAlignmentRow
+        stored = db.query(row).filter(row.comparison_id == uuid.UUID(comparison_id)).all()
+        index = [
+            {column.name: getattr(r, column.name) for column in row.__table__.columns if column.name != "comparison_id"}
+            for r in stored
+        ]
+        ComparisonService(db)._store_alignment_index(uuid.UUID(comparison_id), index)
+        db.commit()
+        assert db.query(row).filter(row.comparison_id == uuid.UUID(comparison_id)).count() == len(prompts)
+    finally:
+        db.close()
+
+def test_comparison_rows_server_side_filters():
+    """Test text search, outlier/length-difference filters and sorting on /rows."""
+    prompts = {f"input_{i}": f"Question {i}" for i in range(20)}
+    prompts["input_odd"] = "An UNUSUAL question"
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "Filter Dataset", "prompts": prompts}).json()["id"]
+    output_ids = [
+        client.post(
+            f"/api/v1/datasets/{dataset_id}/completions",
+            json={"name": f"Filter Outputs {i}", "completions": {
+                key: ["x" * (400 if key == "input_odd" and i == 0 else 10 + i)] for key in prompts
+            }}
+        ).json()["id"]
+        for i in range(2)
+    ]
+    comparison_id = client.post(
+        "/api/v1/comparisons/create",
+        json={"name": "Filters", "dataset_id": dataset_id, "completion_dataset_ids": output_ids}
+    ).json()["id"]
+    rows_url = f"/api/v1/comparisons/{comparison_id}/rows"
+
+    found = client.get(rows_url, params={"q": "unusual"}).json()["items"]
+    assert [row["inputId"] for row in found] == ["input_odd"]
+    assert found[0]["stats"]["lenDiff"] == 389
+    assert client.get(rows_url, params={"q": "100%"}).json()["items"] == []
+
+    outliers = client.get(rows_url, params={"min_z": 3}).json()["items"]
+    assert [row["inputId"] for row in outliers] == ["input_odd"]
+    assert outliers[0]["stats"]["zScores"]["Filter Outputs 0"] > 3
+
+    first = client.get(rows_url, params={"sort": "len_diff", "limit": 1}).json()
+    assert first["items"][0]["inputId"] == "input_odd"
+    second = client.get(rows_url, params={"sort": "len_diff", "limit": 1, "cursor": first["next_cursor"]}).json()
+    assert second["items"][0]["stats"]["lenDiff"] == 1
+
+    assert client.get(rows_url, params={"sort": "size"}).status_code == 422
+    assert client.get(rows_url, params={"sort": "z", "cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_search_prompts_and_completions():
+    """Test full-text search of a dataset and of a comparison's completion datasets."""
+    prompts = {"input_1": "Describe a giraffe", "input_2": "Describe a lion", "input_3": "Name a color"}
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "Search Dataset", "prompts": prompts}).json()["id"]
+    output_ids = [
+        client.post(
+            f"/api/v1/datasets/{dataset_id}/completions",
+            json={"name": f"Search Outputs {i}", "completions": {
+                "input_1": ["A tall animal", "The giraffe has a long neck"] if i == 0 else ["Tall"],
+                "input_2": ["A big cat"],
+            }}
+        ).json()["id"]
+        for i in range(3)
+    ]
+    # A giraffe outside the comparison's completion datasets
+    client.post(
+        f"/api/v1/datasets/{dataset_id}/completions",
+        json={"name": "Other Outputs", "completions": {"input_3": ["giraffe yellow"]}}
+    )
+
+    search_url = f"/api/v1/datasets/{dataset_id}/search"
+    hits = client.get(search_url, params={"q": "giraffe"}).json()["items"]
+    assert {(hit["kind"], hit["prompt_id"]) for hit in hits} == {
+        ("prompt", "input_1"), ("completion", "input_1"), ("completion", "input_3")
+    }
+    neck = [hit for hit in hits if hit["text"] == "The giraffe has a long neck"][0]
+    assert neck["completion_dataset_id"] == output_ids[0]
+    assert neck["position"] == 1
+
+    prompt_hits = client.get(search_url, params={"q": "giraffe", "kind": "prompt"}).json()["items"]
+    assert [hit["prompt_id"] for hit in prompt_hits] == ["input_1"]
+    page = client.get(search_url, params={"q": "giraffe", "limit": 2}).json()
+    assert len(page["items"]) == 2 and page["next_offset"] == 2
+
+    comparison_id = client.post(
+        "/api/v1/comparisons/create",
+        json={"name": "Search", "dataset_id": dataset_id, "completion_dataset_ids": output_ids}
+    ).json()["id"]
+    scoped = client.get(f"/api/v1/comparisons/{comparison_id}/search", params={"q": "giraffe"}).json()["items"]
+    assert {(hit["kind"], hit["prompt_id"]) for hit in scoped} == {("prompt", "input_1"), ("completion", "input_1")}
+
+    assert client.get(search_url, params={"q": ""}).status_code == 422
+    assert client.get(f"/api/v1/datasets/{uuid.uuid4()}/search", params={"q": "giraffe"}).status_code == 404
+
+def test_oversized_output_is_stored_and_searchable():
+    """Test that an output too long to vectorize in full is ingested whole and its opening words are searchable."""
+    from app.services.dataset_service import DatasetService
+
+    # ~1.5 MB of distinct words: well over Postgres's 1 MB tsvector limit if vectorized whole
+    long_output = "zebra " + " ".join(f"w{i:07d}" for i in range(170_000))
+    dataset_id = client.post(
+        "/api/v1/datasets/", json={"name": "Oversized Dataset", "prompts": {"input_1": "Write a lot"}}
+    ).json()["id"]
+    response = client.post(
+        f"/api/v1/datasets/{dataset_id}/completions",
+        json={"name": "Oversized Outputs", "completions": {"input_1": [long_output]}}
+    )
+    assert response.status_code == 201
+
+    hits = client.get(f"/api/v1/datasets/{dataset_id}/search", params={"q": "zebra", "kind": "completion"}).json()["items"]
+    assert [hit["prompt_id"] for hit in hits] == ["input_1"]
+
+    # Sharded analyses still read the full text
+    db = TestingSessionLocal()
+    try:
+        completions = DatasetService(db).get_completion_range(uuid.UUID(response.json()["id"]), None, None)
+    finally:
+        db.close()
+    assert completions == {"input_1": [long_output]}
+
+def test_refresh_comparison_after_append():
+    """Test that appending to a member dataset marks a comparison stale and a refresh updates it."""
+    prompts = {f"input_{i}": f"Prompt {i}" for i in range(6)}
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "Refresh Dataset", "prompts": prompts}).json()["id"]
+    output_ids = [
+        client.post(
+            f"/api/v1/datasets/{dataset_id}/completions",
+            json={"name": f"Refresh Outputs {i}", "completions": {
+                key: ["Answer", "x" * (n * (i + 1) + 1)] for n, key in enumerate(sorted(prompts)) if i == 0 or n < 4
+            }}
+        ).json()["id"]
+        for i in range(2)
+    ]
+    comparison_id = client.post(
+        "/api/v1/comparisons/create",
+        json={"name": "Refresh", "dataset_id": dataset_id, "completion_dataset_ids": output_ids}
+    ).json()["id"]
+    assert "event: completed" in client.get(f"/api/v1/comparisons/{comparison_id}/events").text
+    comparison = client.get(f"/api/v1/comparisons/{comparison_id}").json()
+    assert comparison["stale_datasets"] == []
+    assert comparison["statistical_results"]["alignment"]["coverageStats"]["matchedInputs"] == 4
+    etag = client.get(f"/api/v1/comparisons/{comparison_id}").headers["ETag"]
+
+    # Nothing changed yet
+    response = client.post(f"/api/v1/comparisons/{comparison_id}/refresh")
+    assert response.status_code == 200
+    assert response.json()["changed_datasets"] == []
+
+    appended = client.post(
+        f"/api/v1/datasets/{dataset_id}/completions/{output_ids[1]}/append",
+        json={"completions": {"input_4": ["Answer", "x" * 9], "input_5": ["Answer", "x" * 11]}}
+    )
+    assert appended.status_code == 200
+    assert appended.json()["version"] == 2
+    assert appended.json()["prompt_count"] == 6
+    assert client.post(
+        f"/api/v1/datasets/{dataset_id}/completions/{output_ids[1]}/append",
+        json={"completions": {"input_5": ["again"]}}
+    ).status_code == 400
+
+    response = client.get(f"/api/v1/comparisons/{comparison_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["stale_datasets"] == [output_ids[1]]
+
+    response = client.post(f"/api/v1/comparisons/{comparison_id}/refresh")
+    assert response.status_code == 202
+    assert response.json()["changed_datasets"] == [output_ids[1]]
+    assert "event: completed" in client.get(f"/api/v1/comparisons/{comparison_id}/events").text
+
+    comparison = client.get(f"/api/v1/comparisons/{comparison_id}").json()
+    assert comparison["stale_datasets"] == []
+    assert comparison["dataset_versions"][output_ids[1]] == 2
+    alignment = comparison["statistical_results"]["alignment"]
+    assert alignment["coverageStats"]["matchedInputs"] == 6
+    assert alignment["unmatchedCount"] == 0
+    length = next(m for m in comparison["statistical_results"]["metrics"] if m["name"] == "Completion Length")
+    assert length["dataset_b_value"] == pytest.approx(6.0)
+
+    # First-output lengths did not move, so only the two new rows were indexed
+    rows = client.get(f"/api/v1/comparisons/{comparison_id}/rows", params={"match": "matched"}).json()["items"]
+    assert [row["inputId"] for row in rows] == sorted(prompts)
+    assert rows[-1]["stats"]["lengths"] == {"Refresh Outputs 0": 6, "Refresh Outputs 1": 6}
+
+def test_query_metrics_across_comparisons():
+    """Test filtering comparison test rows by metric and p-value without loading the results."""
+    prompts = {f"input_{i}": f"Prompt {i}" for i in range(12)}
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "Metrics Dataset", "prompts": prompts}).json()["id"]
+    output_ids = [
+        client.post(
+            f"/api/v1/datasets/{dataset_id}/completions",
+            json={"name": f"Metrics Outputs {i}", "completions": {
+                key: ["x" * (n + 10 + 40 * i)] for n, key in enumerate(sorted(prompts))
+            }}
+        ).json()["id"]
+        for i in range(3)
+    ]
+    comparison_id = client.post(
+        "/api/v1/comparisons/create",
+        json={"name": "Metrics", "dataset_id": dataset_id, "completion_dataset_ids": output_ids}
+    ).json()["id"]
+    assert "event: completed" in client.get(f"/api/v1/comparisons/{comparison_id}/events").text
+
+    params = {"metric_name": "Completion Length", "max_p": 0.01, "comparison_id": comparison_id}
+    page = client.get("/api/v1/comparisons/metrics", params=params).json()
+    assert len(page["items"]) == 3
+    assert {(row["dataset_a"], row["dataset_b"]) for row in page["items"]} == {
+        ("Metrics Outputs 0", "Metrics Outputs 1"),
+        ("Metrics Outputs 0", "Metrics Outputs 2"),
+        ("Metrics Outputs 1", "Metrics Outputs 2"),
+    }
+    assert all(row["comparison_name"] == "Metrics" and row["q_value_bh"] <= 0.01 for row in page["items"])
+    p_values = [row["statistical_significance"] for row in page["items"]]
+    assert p_values == sorted(p_values)
+
+    first = client.get("/api/v1/comparisons/metrics", params={**params, "limit": 2}).json()
+    second = client.get("/api/v1/comparisons/metrics", params={**params, "limit": 2, "cursor": first["next_cursor"]}).json()
+    assert first["items"] + second["items"] == page["items"]
+    assert second["next_cursor"] is None
+
+    assert client.get("/api/v1/comparisons/metrics", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.delete(f"/api/v1/comparisons/{comparison_id}").status_code == 204
+    assert client.get("/api/v1/comparisons/metrics", params={"comparison_id": comparison_id}).json()["items"] == []
+
+def test_comparison_preview_sample():
+    """Test that preview_sample publishes a sampled preview before the exact results."""
+    prompts = {f"input_{i:03d}": f"Prompt {i}" for i in range(300)}
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "Preview Dataset", "prompts": prompts}).json()["id"]
+    output_ids = [
+        client.post(
+            f"/api/v1/datasets/{dataset_id}/completions",
+            json={"name": f"Preview Outputs {i}", "completions": {
+                key: ["x" * (n % 40 + 10 * i + 1)] for n, key in enumerate(sorted(prompts))
+            }}
+        ).json()["id"]
+        for i in range(2)
+    ]
+    comparison_id = client.post(
+        "/api/v1/comparisons/create",
+        json={
+            "name": "Preview", "dataset_id": dataset_id, "completion_dataset_ids": output_ids,
+            "comparison_config": {"preview_sample": 50}
+        }
+    ).json()["id"]
+
+    events = client.get(f"/api/v1/comparisons/{comparison_id}/events").text
+    assert "event: preview" in events
+    assert events.index("event: preview") < events.index("event: completed")
+    # Sampled from the alignment index
+    assert '"sample_size":50,"population":300' in events
+
+    progress = client.get(f"/api/v1/comparisons/{comparison_id}/progress").json()["progress"]
+    assert "preview" in progress["timings"]
+    # The exact results replace the preview
+    results = client.get(f"/api/v1/comparisons/{comparison_id}").json()["statistical_results"]
+    assert "preview" not in results
+    assert results["summary_statistics"]["Preview Outputs 0"]["completion_length"]["count"] == 300
+
 # Cleanup
 def teardown_module():
     """Clean up test database."""
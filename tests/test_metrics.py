@@ -174,4 +174,239 @@ def test_empty_inputs():
     assert calculate_input_entropy(empty_inputs) == 0.0
     assert calculate_response_entropy(empty_inputs, empty_outputs) == 0.0
     assert calculate_information_gain(empty_inputs, empty_outputs) == 0.0
-    assert calculate_empowerment(empty_inputs, empty_outputs) == 0.0
\ No newline at end of file
+    assert calculate_empowerment(empty_inputs, empty_outputs) == 0.0
+def test_sharded_accumulators_match_single_pass():
+    """Test that merged shard accumulators reproduce the single-pass analysis results."""
+    from app.services.analysis_service import AnalysisService
+    from app.services.metrics.accumulators import MetricAccumulator, reduce_partition, finalize_results, partition_of
+
+    prompts = {f"input_{i:02d}": f"Question {i % 4}" for i in range(12)}
+    completions = {
+        prompt_id: [f"Answer {j} to {prompt_id[-1]}" * (j + 1) for j in range(i % 3 + 1)] + ["Same answer"]
+        for i, prompt_id in enumerate(sorted(prompts))
+        if i != 5
+    }
+    expected = AnalysisService(None).compute_all_metrics(prompts, completions)
+
+    ids = sorted(prompts)
+    totals, parts = [], []
+    for shard in (ids[:5], ids[5:6], ids[6:]):
+        acc = MetricAccumulator().add(
+            {pid: prompts[pid] for pid in shard},
+            {pid: completions[pid] for pid in shard if pid in completions}
+        )
+        totals.append(acc.totals())
+        parts.append(acc.split(3))
+    # Each partition only holds its own keys
+    for shard_parts in parts:
+        for partition, part in enumerate(shard_parts):
+            assert all(partition_of(key, 3) == partition for key in part["outputs"])
+    reduced = [reduce_partition(shard_parts[p] for shard_parts in parts) for p in range(3)]
+
+    for sharded in (finalize_results(totals, reduced), MetricAccumulator().add(prompts, completions).finalize()):
+        assert sharded.keys() == expected.keys()
+        for group, values in expected.items():
+            assert sharded[group].keys() == values.keys()
+            for key, value in values.items():
+                if isinstance(value, dict):
+                    assert sharded[group][key] == value
+                else:
+                    assert sharded[group][key] == pytest.approx(value)
+
+def test_paired_tests_match_scipy_and_use_shared_prompts():
+    """Test that the vectorized paired tests agree with scipy on the prompts both datasets cover."""
+    from scipy import stats
+    from app.services.metrics.paired_tests import run_paired_tests
+    from app.services.metrics.statistical_tests import run_statistical_tests
+
+    prompt_ids = [f"input_{i:02d}" for i in range(30)]
+    base = {pid: "word " * (5 + (i * 7) % 40) for i, pid in enumerate(prompt_ids)}
+    completions_by_dataset = {
+        "A": {pid: [text] for pid, text in base.items()},
+        # Three characters longer on every prompt but one, which B lacks
+        "B": {pid: [text + "abc"] for pid, text in base.items() if pid != "input_00"},
+        "C": {pid: [text[: len(text) // 2]] for pid, text in base.items()},
+    }
+
+    paired = run_paired_tests(completions_by_dataset, prompt_ids)
+    lengths = {m["dataset_a"] + m["dataset_b"]: m for m in paired if m["name"] == "Completion Length"}
+    assert set(lengths) == {"AB", "AC", "BC"}
+
+    ab = lengths["AB"]
+    assert ab["n_pairs"] == 29
+    assert ab["statistical_significance"] == 0.0  # constant shift
+    assert ab["delta_distribution"]["median"] == -3
+    assert ab["delta_distribution"]["b_greater"] == 29
+
+    a = [len(base[pid]) for pid in prompt_ids]
+    c = [len(base[pid][: len(base[pid]) // 2]) for pid in prompt_ids]
+    expected = stats.ttest_rel(a, c)
+    ac = lengths["AC"]
+    assert ac["test_statistic"] == pytest.approx(expected.statistic)
+    assert ac["statistical_significance"] == pytest.approx(expected.pvalue)
+    assert ac["wilcoxon_p_value"] == pytest.approx(stats.wilcoxon(a, c).pvalue)
+
+    # The independent test cannot see the 3-character shift behind the prompt-to-prompt spread
+    independent = [
+        m for m in run_statistical_tests(completions_by_dataset)
+        if m["name"] == "Completion Length" and (m["dataset_a"], m["dataset_b"]) == ("A", "B")
+    ]
+    assert independent[0]["statistical_significance"] > 0.5
+
+    assert run_paired_tests({"A": completions_by_dataset["A"]}, prompt_ids) == []
+
+def test_independent_tests_with_constant_samples():
+    """Test that two constant samples are significant exactly when their means differ."""
+    from app.services.metrics.statistical_tests import run_statistical_tests
+
+    prompt_ids = [f"input_{i}" for i in range(10)]
+    completions_by_dataset = {
+        "A": {pid: ["four"] for pid in prompt_ids},
+        "B": {pid: ["eight ch"] for pid in prompt_ids},
+        "C": {pid: ["same"] for pid in prompt_ids},
+    }
+
+    lengths = {
+        m["dataset_a"] + m["dataset_b"]: m for m in run_statistical_tests(completions_by_dataset)
+        if m["name"] == "Completion Length"
+    }
+    assert lengths["AB"]["statistical_significance"] == 0.0
+    assert lengths["AC"]["statistical_significance"] == 1.0
+    assert lengths["AB"]["test_statistic"] == 0.0
+
+def test_multiple_comparison_correction_and_pairwise_matrices():
+    """Test Holm/BH adjusted p-values and the k x k matrices of an N-way comparison."""
+    from app.services.metrics.pairwise import holm_adjust, bh_adjust, add_corrected_p_values, pairwise_matrices
+    from app.services.metrics.statistical_tests import run_statistical_tests
+
+    p = [0.01, 0.04, 0.03, 0.005]
+    assert holm_adjust(p).tolist() == pytest.approx([0.03, 0.06, 0.06, 0.02])
+    assert bh_adjust(p).tolist() == pytest.approx([0.02, 0.04, 0.04, 0.02])
+
+    names = [f"model_{i}" for i in range(50)]
+    completions_by_dataset = {
+        name: {f"input_{j}": ["word " * (5 + (i * j) % 13)] for j in range(20)}
+        for i, name in enumerate(names)
+    }
+    metrics = add_corrected_p_values(run_statistical_tests(completions_by_dataset))
+    lengths = [m for m in metrics if m["name"] == "Completion Length"]
+    assert len(lengths) == 50 * 49 // 2
+    assert all(m["q_value_bh"] <= m["q_value_holm"] for m in lengths)
+    assert all(m["q_value_bh"] >= m["statistical_significance"] for m in lengths)
+
+    matrices = pairwise_matrices(metrics, names)
+    assert matrices["datasets"] == names
+    grid = matrices["metrics"]["Completion Length"]
+    assert len(grid["p_value"]) == 50 and all(len(row) == 50 for row in grid["p_value"])
+    assert grid["p_value"][3][3] is None
+    row = next(m for m in lengths if (m["dataset_a"], m["dataset_b"]) == ("model_1", "model_7"))
+    assert grid["q_holm"][1][7] == grid["q_holm"][7][1] == pytest.approx(row["q_value_holm"], rel=1e-3)
+    assert grid["effect_size"][7][1] == pytest.approx(-row["effect_size"], rel=1e-3)
+
+def test_overlap_matrices_exact_and_normalized():
+    """Test global and per-prompt overlap of identical completions across datasets."""
+    from app.services.metrics.overlap import calculate_overlap
+
+    completions_by_dataset = {
+        "A": {"input_1": ["Yes", "Yes"], "input_2": ["No thanks"]},
+        "B": {"input_1": ["yes "], "input_2": ["Yes"], "input_3": ["No  thanks"]},
+        "C": {"input_1": ["Yes"], "input_3": ["Maybe"]},
+    }
+    overlap = calculate_overlap(completions_by_dataset, ["input_1", "input_2", "input_3"])
+    assert overlap["datasets"] == ["A", "B", "C"]
+
+    exact = overlap["exact"]
+    # All three give "Yes", but only A and C for the same prompt
+    assert exact["global"]["shared"] == [[2, 1, 1], [1, 3, 1], [1, 1, 2]]
+    assert exact["per_prompt"]["shared"] == [[2, 0, 1], [0, 3, 0], [1, 0, 2]]
+    assert exact["per_prompt"]["prompts"][0][2] == 1
+    assert exact["global"]["jaccard"][0][1] == pytest.approx(0.25)
+
+    normalized = overlap["normalized"]
+    # "yes " and "No  thanks" match A's completions once case and whitespace are normalized
+    assert normalized["global"]["shared"][0][1] == 2
+    assert normalized["per_prompt"]["shared"][0][1] == 1
+    assert normalized["per_prompt"]["prompts"] == [[2, 1, 1], [1, 3, 1], [1, 1, 2]]
+
+    assert overlap["per_dataset"]["A"] == {"completions": 3, "duplicates": {"exact": 1, "normalized": 1}}
+
+def test_stratified_preview_sample():
+    """Test that preview samples keep every coverage/length stratum in proportion."""
+    from app.services.metrics.sampling import stratified_sample, add_mean_intervals
+
+    prompt_ids = [f"input_{i:04d}" for i in range(2000)]
+    completions_by_dataset = {
+        "A": {p: ["x" * (i % 200 + 1)] for i, p in enumerate(prompt_ids) if i % 100},
+        "B": {p: ["y" * 50] for i, p in enumerate(prompt_ids) if i % 10 or i % 100 == 0},
+    }
+    sample = stratified_sample(completions_by_dataset, prompt_ids, 200, seed=7)
+    assert sample["population"] == 2000
+    assert len(sample["prompt_ids"]) == 200
+    assert sample["prompt_ids"] == sorted(set(sample["prompt_ids"]))
+    # Prompts only A covers are 9% of the population (180 of 2000), and of the sample
+    only_a = [p for p in sample["prompt_ids"] if p not in completions_by_dataset["B"]]
+    assert 17 <= len(only_a) <= 19
+    # The 20 prompts only B covers form small strata that are still represented
+    assert any(p not in completions_by_dataset["A"] for p in sample["prompt_ids"])
+    assert stratified_sample(completions_by_dataset, prompt_ids, 200, seed=7) == sample
+
+    small = stratified_sample(completions_by_dataset, prompt_ids[:10], 200)
+    assert small["prompt_ids"] == prompt_ids[:10]
+
+    summary = add_mean_intervals({"A": {"completion_length": {"mean": 10.0, "std": 2.0, "count": 5}}})
+    interval = summary["A"]["completion_length"]
+    assert interval["ci_lower"] < 10.0 < interval["ci_upper"]
+    assert interval["ci_upper"] - 10.0 == pytest.approx(2.776 * 2.0 * (5 / 4) ** 0.5 / 5 ** 0.5, rel=1e-3)
+
+def test_insight_rules_rank_findings_over_many_datasets():
+    """Test that the insight rules flag length shifts, diversity collapse, coverage gaps and outliers."""
+    import numpy as np
+    from app.services.insights import generate_insights, evaluate_rules, MAX_FINDINGS_PER_RULE
+    from app.services.metrics.pairwise import add_corrected_p_values
+    from app.services.metrics.statistical_tests import run_statistical_tests
+
+    prompt_ids = [f"input_{i:03d}" for i in range(60)]
+
+    def outputs(i, length):
+        return [f"{k} " + "w" * (length + (i * 7 + k * 3) % 11) for k in range(3)]
+
+    completions_by_dataset = {
+        f"model_{d:02d}": {p: outputs(i, 40 + d % 3) for i, p in enumerate(prompt_ids)} for d in range(36)
+    }
+    completions_by_dataset["terse"] = {p: outputs(i, 15) for i, p in enumerate(prompt_ids)}
+    completions_by_dataset["repetitive"] = {p: ["same answer " + "w" * 30] * 3 for p in prompt_ids}
+    completions_by_dataset["sparse"] = {p: outputs(i, 40) for i, p in enumerate(prompt_ids) if i % 5}
+    completions_by_dataset["spiky"] = {p: outputs(i, 400 if i < 3 else 40) for i, p in enumerate(prompt_ids)}
+
+    metrics = add_corrected_p_values(run_statistical_tests(completions_by_dataset))
+    assert len(metrics) > 3000
+    findings = generate_insights(metrics, completions_by_dataset, prompt_ids)
+    by_rule = {}
+    for finding in findings:
+        by_rule.setdefault(finding["rule"], []).append(finding["message"])
+
+    severities = [f["severity"] for f in findings]
+    assert severities == sorted(severities, key=["high", "medium", "low"].index)
+    assert any("terse" in m and "shorter" in m for m in by_rule["length_shift"])
+    # Every model_xx pair with terse matches; only the strongest are reported
+    assert len(by_rule["length_shift"]) == MAX_FINDINGS_PER_RULE + 1
+    assert by_rule["length_shift"][-1].startswith("...and ")
+    assert all(m.startswith("Diversity collapse: repetitive") for m in by_rule["diversity_collapse"][:MAX_FINDINGS_PER_RULE])
+    assert by_rule["coverage_gap"] == [
+        "Coverage gap: sparse has no completions for 12 of 60 prompts (20%); "
+        "tests on it only reflect the prompts it answered."
+    ]
+    assert [m.split()[0] for m in by_rule["outlier_cluster"]] == ["spiky"]
+    assert by_rule["dataset_sizes"] == ["Dataset sizes range from 144 (sparse) to 180 (model_00) completions."]
+    assert findings[-1]["rule"] == "dataset_sizes"
+
+    # Rules are plain data: a custom rule set is evaluated the same way
+    custom = [{
+        "rule": "many_datasets", "table": "comparison", "severity": "low",
+        "when": lambda t: t["datasets"] > 10, "strength": lambda t: t["datasets"].astype(float),
+        "message": lambda row: f"{row['datasets']} datasets compared.",
+    }]
+    assert [f["message"] for f in generate_insights(metrics, completions_by_dataset, prompt_ids, rules=custom)] == [
+        "40 datasets compared."
+    ]
+    assert evaluate_rules({"comparison": {"datasets": np.array([0])}}, custom) == []